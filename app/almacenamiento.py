@@ -0,0 +1,230 @@
+"""Verificación de los buckets de storage fuera del arranque del proceso.
+
+La comprobación (listar/crear buckets y, opcionalmente, una prueba de
+escritura) se ejecuta una sola vez, en segundo plano o en el primer uso,
+y su resultado queda cacheado para el endpoint de readiness.
+
+`registro_buckets` recuerda qué buckets se confirmaron para que las subidas
+no consulten storage en cada petición; solo se vuelve a comprobar un bucket
+cuando una subida falla con "bucket not found".
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime
+from urllib.parse import unquote, urlsplit
+import logging
+
+# "background": verificar al arrancar sin bloquear; "lazy": en el primer uso
+STORAGE_INICIO = os.getenv("STORAGE_INICIO", "background").lower()
+# En producción se puede desactivar la subida/borrado del archivo de prueba
+STORAGE_PRUEBA_ESCRITURA = os.getenv("STORAGE_PRUEBA_ESCRITURA", "true").lower() == "true"
+
+BUCKETS = ["buses-imagenes", "estaciones-imagenes"]
+# Rutas por llamada a storage.remove (Supabase admite hasta 1000)
+STORAGE_LOTE_BORRADO = int(os.getenv("STORAGE_LOTE_BORRADO", "1000"))
+# "true": los archivos se borran después de enviar la respuesta
+STORAGE_BORRADO_EN_SEGUNDO_PLANO = os.getenv("STORAGE_BORRADO_EN_SEGUNDO_PLANO", "false").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+
+def _nombre_bucket(bucket):
+    if hasattr(bucket, "name"):
+        return bucket.name
+    if isinstance(bucket, dict) and "name" in bucket:
+        return bucket["name"]
+    return str(bucket)
+
+
+def ruta_en_bucket(url, bucket_name):
+    """Ruta del objeto dentro del bucket a partir de su URL pública.
+
+    `.../object/public/buses-imagenes/12/abc.jpg?` -> `12/abc.jpg`
+    """
+    if not url:
+        return None
+    ruta = unquote(urlsplit(url).path)
+    marcador = f"/{bucket_name}/"
+    if marcador not in ruta:
+        return None
+    return ruta.split(marcador, 1)[1] or None
+
+
+def rutas_de_imagenes(filas, bucket_name):
+    """Rutas en storage del original y las variantes de cada fila de `imagenes`"""
+    rutas = []
+    for fila in filas:
+        for columna in ("url", "miniatura_url", "webp_url"):
+            ruta = ruta_en_bucket(fila.get(columna), bucket_name)
+            if ruta and ruta not in rutas:
+                rutas.append(ruta)
+    return rutas
+
+
+def es_bucket_no_encontrado(error):
+    """True si el error de storage indica que el bucket no existe"""
+    mensaje = str(error).lower()
+    return "bucket not found" in mensaje or "bucket_not_found" in mensaje
+
+
+class RegistroBuckets:
+    """Buckets confirmados una vez y reutilizados por todos los routers"""
+
+    def __init__(self):
+        self.confirmados = set()
+        self.verificaciones = 0
+        self.refrescos = 0
+        self._lock = None
+
+    def confirmar(self, *nombres):
+        self.confirmados.update(nombres)
+
+    def descartar(self, bucket_name):
+        self.confirmados.discard(bucket_name)
+
+    def sincronizar(self, existentes):
+        """Sustituye los confirmados por los buckets que realmente existen"""
+        self.confirmados = set(existentes)
+
+    async def asegurar(self, cliente, bucket_name):
+        """Comprueba (o crea) el bucket solo si aún no está confirmado"""
+        if bucket_name in self.confirmados:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if bucket_name in self.confirmados:
+                return
+            self.verificaciones += 1
+            try:
+                await cliente.storage.get_bucket(bucket_name)
+            except Exception as e:
+                logger.info("Bucket '%s' no encontrado (%s), creándolo", bucket_name, e)
+                try:
+                    await cliente.storage.create_bucket(bucket_name, options={"public": True})
+                except Exception as create_error:
+                    if "already exists" not in str(create_error).lower():
+                        raise
+            self.confirmados.add(bucket_name)
+
+    async def refrescar(self, cliente, bucket_name):
+        """Olvida el bucket y lo vuelve a comprobar tras un error de bucket inexistente"""
+        self.refrescos += 1
+        self.descartar(bucket_name)
+        await self.asegurar(cliente, bucket_name)
+
+    def asegurar_sync(self, cliente, bucket_name):
+        """Igual que `asegurar` para los endpoints que usan el cliente síncrono"""
+        if bucket_name in self.confirmados:
+            return
+        self.verificaciones += 1
+        try:
+            cliente.storage.get_bucket(bucket_name)
+        except Exception:
+            try:
+                cliente.storage.create_bucket(bucket_name, options={"public": True})
+            except Exception as create_error:
+                if "already exists" not in str(create_error).lower():
+                    raise
+        self.confirmados.add(bucket_name)
+
+    def resumen(self):
+        return {
+            "confirmados": sorted(self.confirmados),
+            "verificaciones": self.verificaciones,
+            "refrescos": self.refrescos,
+        }
+
+
+registro_buckets = RegistroBuckets()
+
+
+class EstadoStorage:
+    """Resultado cacheado de la verificación de buckets"""
+
+    def __init__(self, buckets=BUCKETS, probar_escritura=STORAGE_PRUEBA_ESCRITURA):
+        self.buckets = list(buckets)
+        self.probar_escritura = probar_escritura
+        self.estado = "pendiente"
+        self.buckets_ok = []
+        self.errores = []
+        self.verificado_en = None
+        self.duracion_ms = None
+        self._tarea = None
+
+    async def _verificar(self, obtener_cliente):
+        self.estado = "verificando"
+        self.errores = []
+        inicio = asyncio.get_running_loop().time()
+        try:
+            cliente = await obtener_cliente()
+            existentes = [_nombre_bucket(b) for b in await cliente.storage.list_buckets()]
+            buckets_ok = []
+            for bucket_name in self.buckets:
+                if bucket_name not in existentes:
+                    try:
+                        await cliente.storage.create_bucket(bucket_name, options={"public": True})
+                        logger.info("Bucket '%s' creado correctamente", bucket_name)
+                    except Exception as e:
+                        if "already exists" not in str(e).lower():
+                            self.errores.append(f"{bucket_name}: {e}")
+                            continue
+                buckets_ok.append(bucket_name)
+
+            if self.probar_escritura and buckets_ok:
+                bucket_name = buckets_ok[0]
+                test_file = f"test-{uuid.uuid4()}.txt"
+                try:
+                    await cliente.storage.from_(bucket_name).upload(
+                        test_file, b"Prueba de storage", {"content-type": "text/plain"}
+                    )
+                    await cliente.storage.from_(bucket_name).remove([test_file])
+                except Exception as e:
+                    self.errores.append(f"prueba de escritura en {bucket_name}: {e}")
+
+            self.buckets_ok = buckets_ok
+            registro_buckets.confirmar(*buckets_ok)
+            self.estado = "listo" if not self.errores else "error"
+        except Exception as e:
+            self.errores.append(str(e))
+            self.estado = "error"
+        finally:
+            self.verificado_en = datetime.utcnow().isoformat()
+            self.duracion_ms = round((asyncio.get_running_loop().time() - inicio) * 1000, 1)
+
+        if self.estado == "listo":
+            logger.info("Storage verificado en %s ms: %s", self.duracion_ms, self.buckets_ok)
+        else:
+            logger.warning("Verificación de storage con errores: %s", self.errores)
+        return self.estado
+
+    def iniciar_en_segundo_plano(self, obtener_cliente):
+        """Lanza la verificación sin esperar su resultado"""
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._verificar(obtener_cliente))
+        return self._tarea
+
+    async def asegurar(self, obtener_cliente):
+        """Espera la verificación, lanzándola si nadie lo hizo todavía"""
+        await self.iniciar_en_segundo_plano(obtener_cliente)
+        return self.estado
+
+    async def reintentar(self, obtener_cliente):
+        """Descarta el resultado cacheado y vuelve a verificar"""
+        self._tarea = None
+        return await self.asegurar(obtener_cliente)
+
+    def resumen(self):
+        return {
+            "estado": self.estado,
+            "buckets": self.buckets_ok,
+            "prueba_escritura": self.probar_escritura,
+            "errores": self.errores,
+            "verificado_en": self.verificado_en,
+            "duracion_ms": self.duracion_ms,
+            "registro": registro_buckets.resumen(),
+        }
+
+
+estado_storage = EstadoStorage()
@@ -0,0 +1,224 @@
+"""Configuración de logging estructurado, asíncrono y con muestreo.
+
+- Los registros se encolan con `put_nowait` (QueueHandler) y un hilo aparte
+  (QueueListener) los formatea y escribe, así que escribir en stdout no
+  bloquea el event loop. Si la cola se llena, se descartan y se cuentan.
+- Formato JSON por línea (LOG_FORMATO=json) o texto (LOG_FORMATO=texto).
+- Nivel global con LOG_NIVEL y por logger con LOG_NIVELES
+  ("httpx=WARNING,app.routers.buses=DEBUG").
+- Los registros DEBUG se muestrean (LOG_MUESTREO_DEBUG, fracción que se
+  conserva); un registro puede fijar su propia tasa con extra={"muestreo": x}.
+- Cada registro lleva el id de la petición en curso (cabecera X-Request-ID,
+  o uno generado), que también se devuelve en la respuesta.
+
+Los datos estructurados se pasan con extra={"datos": {...}}. Con `%s` y
+argumentos (en lugar de f-strings) el mensaje solo se arma si el nivel
+está habilitado, así que un `logger.debug` desactivado casi no cuesta.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO").upper()
+LOG_NIVELES = os.getenv("LOG_NIVELES", "httpx=WARNING,uvicorn.access=WARNING")
+LOG_FORMATO = os.getenv("LOG_FORMATO", "json").lower()
+LOG_MUESTREO_DEBUG = float(os.getenv("LOG_MUESTREO_DEBUG", "0.01"))
+LOG_COLA_TAMANO = int(os.getenv("LOG_COLA_TAMANO", "10000"))
+
+# Loggers que uvicorn configura con sus propios handlers
+LOGGERS_UVICORN = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+id_peticion = ContextVar("id_peticion", default=None)
+
+
+class FiltroContexto(logging.Filter):
+    """Agrega el id de la petición en curso (se ejecuta en el hilo que registra)"""
+
+    def filter(self, record):
+        record.id_peticion = id_peticion.get()
+        return True
+
+
+class FiltroMuestreo(logging.Filter):
+    """Conserva solo una fracción de los registros DEBUG"""
+
+    def __init__(self, tasa=LOG_MUESTREO_DEBUG):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        return random.random() < getattr(record, "muestreo", self.tasa)
+
+
+class FormateadorJSON(logging.Formatter):
+    def format(self, record):
+        linea = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        if getattr(record, "id_peticion", None):
+            linea["id_peticion"] = record.id_peticion
+        datos = getattr(record, "datos", None)
+        if datos:
+            linea.update(datos)
+        if record.exc_text or record.exc_info:
+            linea["excepcion"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(id_peticion)s] %(message)s")
+
+    def formatMessage(self, record):
+        if not getattr(record, "id_peticion", None):
+            record.id_peticion = "-"
+        texto = super().formatMessage(record)
+        datos = getattr(record, "datos", None)
+        return f"{texto} {json.dumps(datos, ensure_ascii=False, default=str)}" if datos else texto
+
+
+_formateador_base = logging.Formatter()
+
+
+class ColaNoBloqueante(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloquea y deja el formateo al hilo del listener"""
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # El QueueHandler estándar formatea el registro completo aquí, en el
+        # hilo que registra. Solo se resuelven el mensaje (los argumentos
+        # podrían cambiar antes de que el listener los lea) y la excepción;
+        # el JSON y la escritura quedan para el hilo del listener.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _formateador_base.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+def parsear_niveles(texto):
+    """"httpx=WARNING,app=DEBUG" -> {"httpx": "WARNING", "app": "DEBUG"}"""
+    niveles = {}
+    for parte in (texto or "").split(","):
+        nombre, _, nivel = parte.partition("=")
+        if nombre.strip() and nivel.strip():
+            niveles[nombre.strip()] = nivel.strip().upper()
+    return niveles
+
+
+class Bitacora:
+    def __init__(self):
+        self.cola = None
+        self.manejador = None
+        self.listener = None
+
+    def configurar(self):
+        """Instala el handler con cola en el logger raíz (idempotente).
+
+        Se puede volver a llamar tras el arranque de uvicorn para que sus
+        loggers también pasen por la cola.
+        """
+        raiz = logging.getLogger()
+        if self.manejador is None:
+            self.cola = queue.Queue(maxsize=LOG_COLA_TAMANO)
+            self.manejador = ColaNoBloqueante(self.cola)
+            self.manejador.addFilter(FiltroContexto())
+            self.manejador.addFilter(FiltroMuestreo())
+
+            salida = logging.StreamHandler(sys.stdout)
+            salida.setFormatter(FormateadorJSON() if LOG_FORMATO == "json" else FormateadorTexto())
+            self.listener = logging.handlers.QueueListener(self.cola, salida)
+            self.listener.start()
+            atexit.register(self.detener)
+
+        for handler in list(raiz.handlers):
+            if handler is not self.manejador:
+                raiz.removeHandler(handler)
+        if self.manejador not in raiz.handlers:
+            raiz.addHandler(self.manejador)
+        raiz.setLevel(LOG_NIVEL)
+
+        for nombre in LOGGERS_UVICORN:
+            logger_uvicorn = logging.getLogger(nombre)
+            logger_uvicorn.handlers = []
+            logger_uvicorn.propagate = True
+        for nombre, nivel in parsear_niveles(LOG_NIVELES).items():
+            logging.getLogger(nombre).setLevel(nivel)
+
+    def detener(self):
+        """Escribe lo que quede en la cola y detiene el hilo del listener"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def estadisticas(self):
+        return {
+            "formato": LOG_FORMATO,
+            "nivel": LOG_NIVEL,
+            "niveles": parsear_niveles(LOG_NIVELES),
+            "muestreo_debug": LOG_MUESTREO_DEBUG,
+            "en_cola": self.cola.qsize() if self.cola is not None else 0,
+            "capacidad_cola": LOG_COLA_TAMANO,
+            "descartados": self.manejador.descartados if self.manejador is not None else 0,
+        }
+
+
+bitacora = Bitacora()
+
+
+def _id_valido(valor):
+    return valor and len(valor) <= 64 and all(c.isalnum() or c in "-_.:" for c in valor)
+
+
+class MiddlewareIdPeticion:
+    """Middleware ASGI que asigna un id a cada petición y lo devuelve en X-Request-ID"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recibido = None
+        for nombre, valor in scope["headers"]:
+            if nombre == b"x-request-id":
+                recibido = valor.decode("latin-1")
+                break
+        identificador = recibido if _id_valido(recibido) else uuid.uuid4().hex[:16]
+        token = id_peticion.set(identificador)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                mensaje["headers"] = [*mensaje.get("headers", []), (b"x-request-id", identificador.encode())]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            id_peticion.reset(token)
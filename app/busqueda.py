@@ -0,0 +1,235 @@
+"""Índice de búsqueda en memoria sobre nombres de buses y estaciones.
+
+Cada documento (un bus o una estación) se normaliza (minúsculas, sin
+tildes) y se descompone en trigramas al estilo de pg_trgm: cada palabra se
+rellena con dos espacios delante y uno detrás. Un índice invertido
+trigrama -> documentos permite:
+
+- búsqueda difusa: se cuentan los trigramas de la consulta que tiene cada
+  documento; sobreviven los que cubren al menos BUSQUEDA_UMBRAL de ellos,
+  lo que tolera errores de tipeo ("nrte" encuentra "Portal Norte").
+- modo prefijo (autocompletado): cada palabra de la consulta debe ser
+  prefijo de alguna palabra del documento, resuelto con búsqueda binaria
+  sobre la lista ordenada de palabras.
+
+Como los otros índices en memoria, se carga completo la primera vez, se
+actualiza documento a documento en las escrituras y se recarga cada
+BUSQUEDA_TTL segundos.
+"""
+import asyncio
+import bisect
+import heapq
+import os
+import time
+import unicodedata
+from collections import Counter
+
+BUSQUEDA_TTL = float(os.getenv("BUSQUEDA_TTL", "300"))
+BUSQUEDA_UMBRAL = float(os.getenv("BUSQUEDA_UMBRAL", "0.5"))
+
+# entidad -> campos de texto indexados
+CAMPOS_BUSQUEDA = {
+    "buses": ["nombre"],
+    "estaciones": ["nombre", "localidad"],
+}
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con los signos de puntuación como espacios"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return " ".join("".join(c if c.isalnum() else " " for c in texto).split())
+
+
+def trigramas(texto):
+    resultado = set()
+    for palabra in texto.split():
+        relleno = f"  {palabra} "
+        for i in range(len(relleno) - 2):
+            resultado.add(relleno[i:i + 3])
+    return resultado
+
+
+class IndiceBusqueda:
+    def __init__(self, ttl=BUSQUEDA_TTL, umbral=BUSQUEDA_UMBRAL):
+        self.ttl = ttl
+        self.umbral = umbral
+        self.cargado_en = None
+        self.cargas = 0
+        self._lock = asyncio.Lock()
+        self._vaciar()
+
+    def _vaciar(self):
+        self._docs = []           # posición -> documento (None si se eliminó)
+        self._posiciones = {}     # (entidad, id) -> posición
+        self._trigramas = []      # posición -> set de trigramas
+        self._por_trigrama = {}   # trigrama -> set de posiciones
+        self._por_palabra = {}    # palabra -> set de posiciones
+        self._palabras = []       # palabras ordenadas (para el modo prefijo)
+        self._palabras_al_dia = True
+
+    # --- Carga y actualizaciones ---
+
+    def _vigente(self):
+        return self.cargado_en is not None and time.monotonic() - self.cargado_en < self.ttl
+
+    async def asegurar(self, cargar):
+        """Carga el índice si aún no existe o si venció el TTL.
+
+        `cargar` es una corrutina sin argumentos que devuelve
+        {"buses": [filas], "estaciones": [filas]}.
+        """
+        if self._vigente():
+            return
+        async with self._lock:
+            if self._vigente():
+                return
+            filas = await cargar()
+            self._vaciar()
+            for entidad, filas_entidad in filas.items():
+                for fila in filas_entidad:
+                    self._agregar(entidad, fila)
+            self.cargado_en = time.monotonic()
+            self.cargas += 1
+
+    def invalidar(self):
+        self.cargado_en = None
+
+    def _agregar(self, entidad, fila):
+        texto = normalizar(" ".join(str(fila.get(c) or "") for c in CAMPOS_BUSQUEDA[entidad]))
+        documento = {
+            "entidad": entidad,
+            "id": fila["id"],
+            **{c: fila.get(c) for c in CAMPOS_BUSQUEDA[entidad]},
+            "esta_activo": fila.get("esta_activo", True),
+            "_texto": texto,
+            "_nombre": normalizar(fila.get("nombre")),
+        }
+        posicion = len(self._docs)
+        self._docs.append(documento)
+        self._posiciones[(entidad, fila["id"])] = posicion
+        tris = trigramas(texto)
+        self._trigramas.append(tris)
+        for t in tris:
+            self._por_trigrama.setdefault(t, set()).add(posicion)
+        for palabra in set(texto.split()):
+            if palabra not in self._por_palabra:
+                self._por_palabra[palabra] = set()
+                self._palabras_al_dia = False
+            self._por_palabra[palabra].add(posicion)
+
+    def _quitar(self, entidad, doc_id):
+        posicion = self._posiciones.pop((entidad, doc_id), None)
+        if posicion is None:
+            return
+        for t in self._trigramas[posicion]:
+            self._por_trigrama[t].discard(posicion)
+        for palabra in set(self._docs[posicion]["_texto"].split()):
+            self._por_palabra[palabra].discard(posicion)
+        self._docs[posicion] = None
+        self._trigramas[posicion] = set()
+
+    async def actualizar(self, entidad, fila):
+        """Agrega o reemplaza un bus o estación (fila con id y campos de texto)"""
+        async with self._lock:
+            # Si aún no se cargó, la primera carga ya lo incluirá
+            if self.cargado_en is None:
+                return
+            self._quitar(entidad, fila["id"])
+            self._agregar(entidad, fila)
+
+    async def eliminar(self, entidad, doc_id):
+        async with self._lock:
+            self._quitar(entidad, doc_id)
+
+    # --- Consultas ---
+
+    def _candidatos_difusos(self, consulta):
+        tris = trigramas(consulta)
+        if not tris:
+            return []
+        conteo = Counter()
+        for t in tris:
+            conteo.update(self._por_trigrama.get(t, ()))
+        minimo = self.umbral * len(tris)
+        resultado = []
+        for posicion, comunes in conteo.items():
+            if comunes < minimo:
+                continue
+            documento = self._docs[posicion]
+            # Cobertura de la consulta y, para desempatar, similitud con el nombre
+            puntaje = comunes / len(tris)
+            puntaje += 0.1 * comunes / (len(tris) + len(self._trigramas[posicion]) - comunes)
+            if consulta in documento["_texto"]:
+                puntaje += 1
+            if consulta == documento["_nombre"]:
+                puntaje += 1
+            resultado.append((puntaje, posicion))
+        return resultado
+
+    def _candidatos_prefijo(self, consulta):
+        if not self._palabras_al_dia:
+            self._palabras = sorted(p for p, docs in self._por_palabra.items() if docs)
+            self._palabras_al_dia = True
+        posiciones = None
+        for prefijo in consulta.split():
+            coincidentes = set()
+            i = bisect.bisect_left(self._palabras, prefijo)
+            while i < len(self._palabras) and self._palabras[i].startswith(prefijo):
+                coincidentes |= self._por_palabra[self._palabras[i]]
+                i += 1
+            posiciones = coincidentes if posiciones is None else posiciones & coincidentes
+            if not posiciones:
+                return []
+        # Cuanto más del nombre cubre lo escrito, antes aparece
+        return [
+            (len(consulta) / max(len(self._docs[p]["_nombre"]), len(consulta)), p)
+            for p in posiciones or ()
+        ]
+
+    def buscar(self, texto, entidad=None, esta_activo=None, prefijo=False,
+               desplazamiento=0, limite=50):
+        """Devuelve (total, página) con los resultados ordenados por relevancia.
+
+        Solo se ordenan los `desplazamiento + limite` mejores (con un heap),
+        así el costo de una consulta muy común no depende de ordenar todas
+        las coincidencias.
+        """
+        consulta = normalizar(texto)
+        if not consulta:
+            return 0, []
+        candidatos = self._candidatos_prefijo(consulta) if prefijo else self._candidatos_difusos(consulta)
+        if entidad or esta_activo is not None:
+            candidatos = [
+                (puntaje, posicion) for puntaje, posicion in candidatos
+                if (not entidad or self._docs[posicion]["entidad"] == entidad)
+                and (esta_activo is None or self._docs[posicion]["esta_activo"] == esta_activo)
+            ]
+        mejores = heapq.nsmallest(
+            desplazamiento + limite,
+            candidatos,
+            key=lambda c: (-c[0], self._docs[c[1]]["_nombre"], self._docs[c[1]]["id"])
+        )
+        pagina = [
+            {
+                **{c: v for c, v in self._docs[posicion].items() if not c.startswith("_")},
+                "puntaje": round(puntaje, 3),
+            }
+            for puntaje, posicion in mejores[desplazamiento:]
+        ]
+        return len(candidatos), pagina
+
+    def estado(self):
+        return {
+            "documentos": len(self._posiciones),
+            "trigramas": len(self._por_trigrama),
+            "palabras": len(self._por_palabra),
+            "cargas": self.cargas,
+            "edad_segundos": (
+                round(time.monotonic() - self.cargado_en, 1) if self.cargado_en is not None else None
+            ),
+            "ttl": self.ttl,
+        }
+
+
+indice_busqueda = IndiceBusqueda()
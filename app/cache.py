@@ -0,0 +1,156 @@
+"""Caché de lectura en proceso para buses y estaciones.
+
+Cada entidad tiene su propia caché con TTL y tamaño máximo (LRU). Las
+lecturas concurrentes de una misma clave que fallan en caché comparten una
+única llamada a Supabase. Los endpoints de escritura invalidan las claves
+afectadas. El backend se elige con CACHE_BACKEND ("memoria" o "ninguno").
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria").lower()
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "1000"))
+
+# TTL en segundos por entidad
+CACHE_TTL = {
+    "buses": float(os.getenv("CACHE_TTL_BUSES", "30")),
+    "estaciones": float(os.getenv("CACHE_TTL_ESTACIONES", "60")),
+}
+
+
+class CacheMemoria:
+    """Caché TTL + LRU con coalescencia de peticiones concurrentes"""
+
+    def __init__(self, nombre, ttl, max_entradas=CACHE_MAX_ENTRADAS):
+        self.nombre = nombre
+        self.ttl = ttl
+        self.max_entradas = max(1, max_entradas)
+        self._entradas = OrderedDict()
+        self._en_vuelo = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.coalescidas = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+        # Aumenta con cada invalidación; lo usan los ETag de app/validadores.py
+        self.version = 0
+
+    def _leer(self, clave):
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        expira, valor = entrada
+        if expira < time.monotonic():
+            del self._entradas[clave]
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada
+
+    def _guardar(self, clave, valor):
+        self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.expulsiones += 1
+
+    async def obtener_o_cargar(self, clave, cargar):
+        """Devuelve el valor cacheado o ejecuta `cargar()` una sola vez por clave"""
+        entrada = self._leer(clave)
+        if entrada is not None:
+            self.aciertos += 1
+            return entrada[1]
+
+        en_vuelo = self._en_vuelo.get(clave)
+        if en_vuelo is not None:
+            self.coalescidas += 1
+            return await asyncio.shield(en_vuelo)
+
+        self.fallos += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        try:
+            valor = await cargar()
+        except BaseException as e:
+            futuro.set_exception(e)
+            # Evita el aviso de excepción no recuperada si nadie más esperaba
+            futuro.exception()
+            raise
+        else:
+            # Si hubo una invalidación mientras cargábamos, no se guarda el valor
+            if self._en_vuelo.get(clave) is futuro:
+                self._guardar(clave, valor)
+            futuro.set_result(valor)
+            return valor
+        finally:
+            if self._en_vuelo.get(clave) is futuro:
+                del self._en_vuelo[clave]
+
+    def invalidar(self, *prefijo):
+        """Elimina las claves (tuplas) que empiezan por `prefijo`; sin prefijo, todas"""
+        n = len(prefijo)
+        for clave in [c for c in self._entradas if c[:n] == prefijo]:
+            del self._entradas[clave]
+        for clave in [c for c in self._en_vuelo if c[:n] == prefijo]:
+            del self._en_vuelo[clave]
+        self.invalidaciones += 1
+        self.version += 1
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            "backend": "memoria",
+            "ttl_segundos": self.ttl,
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "coalescidas": self.coalescidas,
+            "expulsiones": self.expulsiones,
+            "invalidaciones": self.invalidaciones,
+            "version": self.version,
+            "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+        }
+
+
+class CacheNula:
+    """Backend sin caché: siempre consulta a Supabase"""
+
+    def __init__(self, nombre, ttl=0, max_entradas=0):
+        self.nombre = nombre
+        self.ttl = 0
+        self.fallos = 0
+        self.version = 0
+
+    async def obtener_o_cargar(self, clave, cargar):
+        self.fallos += 1
+        return await cargar()
+
+    def invalidar(self, *prefijo):
+        self.version += 1
+
+    def estadisticas(self):
+        return {"backend": "ninguno", "fallos": self.fallos}
+
+
+BACKENDS = {
+    "memoria": CacheMemoria,
+    "ninguno": CacheNula,
+}
+
+
+def crear_cache(nombre):
+    backend = BACKENDS.get(CACHE_BACKEND, CacheMemoria)
+    return backend(nombre, CACHE_TTL.get(nombre, 30.0))
+
+
+cache_buses = crear_cache("buses")
+cache_estaciones = crear_cache("estaciones")
+
+
+def estadisticas_cache():
+    return {
+        "buses": cache_buses.estadisticas(),
+        "estaciones": cache_estaciones.estadisticas(),
+    }
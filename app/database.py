@@ -1,28 +1,235 @@
 import os
-from supabase import create_client
+import asyncio
+import threading
+from supabase import create_client, acreate_client
+from supabase.lib.client_options import ClientOptions, AsyncClientOptions
 from dotenv import load_dotenv
 import logging
+from .instrumentacion import instrumentar_cliente
 
 load_dotenv()
 
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_KEY")
 
+# Tamaño del pool de clientes y timeouts (segundos) configurables por entorno
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "4"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+class RegistroClientes:
+    """Clientes Supabase compartidos por todo el proceso.
+
+    Las peticiones de la API usan un único cliente asíncrono (`obtener_async`).
+    El pool acotado de clientes síncronos (`obtener`) solo lo usan los
+    scripts y las utilidades de mantenimiento, y se crea la primera vez que
+    se pide. Cada cliente mantiene sus propias sesiones HTTP (PostgREST y
+    storage) con conexiones keep-alive, por lo que reutilizarlos evita
+    repetir el handshake TLS y la construcción de sub-clientes.
+    """
+
+    def __init__(self, url, key, tamano=SUPABASE_POOL_SIZE, timeout=SUPABASE_TIMEOUT):
+        self.url = url
+        self.key = key
+        self.tamano = max(1, tamano)
+        self.timeout = timeout
+        self._clientes = []
+        self._siguiente = 0
+        self._lock = threading.Lock()
+        self._cliente_async = None
+        self._lock_async = None
+        # Clientes asíncronos reemplazados que se cierran tras un margen
+        self._cierres_pendientes = {}
+
+    def _crear_cliente(self):
+        opciones = ClientOptions(
+            postgrest_client_timeout=self.timeout,
+            storage_client_timeout=int(self.timeout),
+        )
+        return instrumentar_cliente(create_client(self.url, self.key, options=opciones))
+
+    def _opciones_async(self):
+        return AsyncClientOptions(
+            postgrest_client_timeout=self.timeout,
+            storage_client_timeout=int(self.timeout),
+        )
+
+    def iniciar(self):
+        """Construye los clientes del pool si todavía no existen"""
+        with self._lock:
+            if self._clientes:
+                return
+            self._clientes = [self._crear_cliente() for _ in range(self.tamano)]
+            self._siguiente = 0
+        logger.info("Pool de clientes Supabase iniciado (%s clientes)", self.tamano)
+
+    @property
+    def pool_iniciado(self):
+        return bool(self._clientes)
+
+    def obtener(self):
+        """Devuelve el siguiente cliente del pool (round-robin)"""
+        if not self._clientes:
+            self.iniciar()
+        with self._lock:
+            cliente = self._clientes[self._siguiente % len(self._clientes)]
+            self._siguiente = (self._siguiente + 1) % len(self._clientes)
+        return cliente
+
+    async def _crear_cliente_async(self):
+        return instrumentar_cliente(await acreate_client(
+            self.url, self.key, options=self._opciones_async()
+        ))
+
+    def _lock_cliente_async(self):
+        if self._lock_async is None:
+            self._lock_async = asyncio.Lock()
+        return self._lock_async
+
+    async def obtener_async(self):
+        """Devuelve el cliente asíncrono compartido, creándolo la primera vez"""
+        if self._cliente_async is None:
+            async with self._lock_cliente_async():
+                if self._cliente_async is None:
+                    self._cliente_async = await self._crear_cliente_async()
+                    logger.info("Cliente asíncrono de Supabase iniciado")
+        return self._cliente_async
+
+    async def _reemplazar_async(self, anterior):
+        """Sustituye el cliente asíncrono que falló por uno nuevo.
+
+        El anterior se cierra después de SUPABASE_TIMEOUT segundos para no
+        cortar las peticiones que todavía lo estén usando.
+        """
+        async with self._lock_cliente_async():
+            # Otra verificación concurrente pudo haberlo reemplazado ya
+            if self._cliente_async is not anterior:
+                return
+            self._cliente_async = await self._crear_cliente_async()
+        if anterior is not None:
+            tarea = asyncio.create_task(self._cerrar_cliente_async(anterior, espera=self.timeout))
+            self._cierres_pendientes[tarea] = anterior
+            tarea.add_done_callback(lambda t: self._cierres_pendientes.pop(t, None))
+        logger.warning("Cliente asíncrono de Supabase reemplazado")
+
+    async def verificar_salud_async(self):
+        """Hace una consulta mínima con el cliente asíncrono y lo reemplaza si falla.
+
+        Es el cliente que atiende las peticiones de la API. El resultado
+        tiene la misma forma que el de `verificar_salud`.
+        """
+        resultado = {"clientes": 1, "saludables": 0, "reemplazados": 0, "errores": []}
+        cliente = self._cliente_async
+        try:
+            cliente = await self.obtener_async()
+            await cliente.table("buses").select("id").limit(1).execute()
+            resultado["saludables"] = 1
+        except Exception as e:
+            resultado["errores"].append(str(e))
+            try:
+                await self._reemplazar_async(cliente)
+                resultado["reemplazados"] = 1
+            except Exception as crear_error:
+                resultado["errores"].append(str(crear_error))
+
+        resultado["estado"] = "ok" if resultado["saludables"] else "degradado"
+        return resultado
+
+    def verificar_salud(self):
+        """Hace una consulta mínima con cada cliente del pool síncrono y reemplaza los que fallen"""
+        if not self._clientes:
+            self.iniciar()
+
+        resultado = {"clientes": len(self._clientes), "saludables": 0, "reemplazados": 0, "errores": []}
+        for indice, cliente in enumerate(list(self._clientes)):
+            try:
+                cliente.table("buses").select("id").limit(1).execute()
+                resultado["saludables"] += 1
+            except Exception as e:
+                resultado["errores"].append(str(e))
+                try:
+                    nuevo = self._crear_cliente()
+                    with self._lock:
+                        self._clientes[indice] = nuevo
+                    self._cerrar_cliente(cliente)
+                    resultado["reemplazados"] += 1
+                except Exception as crear_error:
+                    resultado["errores"].append(str(crear_error))
+
+        resultado["estado"] = "ok" if resultado["saludables"] == resultado["clientes"] else "degradado"
+        return resultado
+
+    @staticmethod
+    def _cerrar_cliente(cliente):
+        # Solo se cierran las sesiones que llegaron a crearse
+        for sub_cliente in (cliente._postgrest, cliente._storage):
+            if sub_cliente is None:
+                continue
+            try:
+                sub_cliente.session.close()
+            except Exception as e:
+                logger.warning("Error al cerrar sesión HTTP de Supabase: %s", e)
+
+    @staticmethod
+    async def _cerrar_cliente_async(cliente, espera=0):
+        if espera:
+            await asyncio.sleep(espera)
+        for sub_cliente in (cliente._postgrest, cliente._storage):
+            if sub_cliente is None:
+                continue
+            try:
+                await sub_cliente.aclose()
+            except Exception as e:
+                logger.warning("Error al cerrar sesión HTTP asíncrona de Supabase: %s", e)
+
+    async def cerrar_async(self):
+        """Cierra las sesiones HTTP del cliente asíncrono (y de los ya reemplazados)"""
+        pendientes = list(self._cierres_pendientes.items())
+        self._cierres_pendientes.clear()
+        for tarea, anterior in pendientes:
+            tarea.cancel()
+            await self._cerrar_cliente_async(anterior)
+        cliente, self._cliente_async = self._cliente_async, None
+        if cliente is not None:
+            await self._cerrar_cliente_async(cliente)
+
+    def cerrar(self):
+        """Cierra las conexiones de todos los clientes del pool"""
+        with self._lock:
+            clientes, self._clientes = self._clientes, []
+        for cliente in clientes:
+            self._cerrar_cliente(cliente)
+        if clientes:
+            logger.info("Pool de clientes Supabase cerrado")
+
+
+registro_clientes = RegistroClientes(supabase_url, supabase_key)
+
+
 def get_db():
-    return create_client(supabase_url, supabase_key)
+    return registro_clientes.obtener()
+
 
-def inicializar_storage():
+async def get_async_db():
+    return await registro_clientes.obtener_async()
+
+def inicializar_storage(probar_escritura=None):
     """Inicializa los buckets de storage necesarios para la aplicación"""
+    if probar_escritura is None:
+        probar_escritura = os.getenv("STORAGE_PRUEBA_ESCRITURA", "true").lower() == "true"
+
     try:
-        print("🔄 Iniciando inicialización de storage...")
+        logger.info("Iniciando inicialización de storage...")
         supabase = get_db()
 
         # Verificar si la URL comienza con https://
         if not supabase_url or not supabase_url.startswith("https://"):
-            print(f"❌ URL de Supabase inválida: {supabase_url}")
+            logger.warning("URL de Supabase inválida: %s", supabase_url)
             return False, supabase_url, supabase_key
 
-        print(f"ℹ️ Usando Supabase URL: {supabase_url}")
+        logger.info("Usando Supabase URL: %s", supabase_url)
 
         # Verificar que el cliente se inicializó correctamente
         try:
@@ -35,9 +242,9 @@ def inicializar_storage():
                     bucket_names.append(bucket_name)
                 except:
                     bucket_names.append(str(bucket))
-            print(f"Buckets existentes: {bucket_names}")
+            logger.info("Buckets existentes: %s", bucket_names)
         except Exception as conn_error:
-            print(f"Error al listar buckets existentes: {str(conn_error)}")
+            logger.warning("Error al listar buckets existentes: %s", conn_error)
 
         # Definir los buckets necesarios
         buckets_to_create = [
@@ -56,27 +263,30 @@ def inicializar_storage():
             try:
                 # Comprobar si el bucket existe
                 supabase.storage.get_bucket(bucket["name"])
-                print(f"✓ Bucket '{bucket['name']}' ya existe")
+                logger.info("Bucket '%s' ya existe", bucket['name'])
             except Exception as e:
-                print(f"✗ Bucket '{bucket['name']}' no existe: {str(e)}")
+                logger.warning("Bucket '%s' no existe: %s", bucket['name'], e)
                 # Crear bucket si no existe
                 try:
                     # Intentamos con opciones simplificadas
                     supabase.storage.create_bucket(bucket["name"], {"public": True})
-                    print(f"✓ Bucket '{bucket['name']}' creado correctamente")
+                    logger.info("Bucket '%s' creado correctamente", bucket['name'])
                 except Exception as create_error:
-                    print(f"✗ Error al crear bucket '{bucket['name']}': {str(create_error)}")
+                    logger.warning("Error al crear bucket '%s': %s", bucket['name'], create_error)
                     # Intentar método alternativo
                     try:
                         supabase.storage.create_bucket(bucket["name"])
-                        print(f"✓ Bucket creado con método alternativo")
+                        logger.info("Bucket creado con método alternativo")
                     except Exception as alt_error:
                         if "already exists" in str(alt_error).lower():
-                            print(f"✓ El bucket ya existe pero no era visible")
+                            logger.info("El bucket ya existe pero no era visible")
                         else:
-                            print(f"✗ También falló el método alternativo: {str(alt_error)}")
+                            logger.warning("También falló el método alternativo: %s", alt_error)
 
         # Probar funcionamiento del storage con un archivo pequeño
+        if not probar_escritura:
+            logger.info("Prueba de escritura en storage desactivada")
+            return True, supabase_url, supabase_key
         try:
             import uuid
             test_bucket = "buses-imagenes"
@@ -91,23 +301,23 @@ def inicializar_storage():
                     file=test_content,
                     file_options={"content-type": "text/plain"}
                 )
-                print(f"✓ Archivo de prueba subido correctamente")
+                logger.info("Archivo de prueba subido correctamente")
             except Exception as e1:
-                print(f"✗ Error con método 1: {str(e1)}")
+                logger.warning("Error con método 1: %s", e1)
                 # Método 2
                 try:
                     result = supabase.storage.from_(test_bucket).upload(test_file, test_content)
-                    print(f"✓ Archivo subido con método alternativo")
+                    logger.info("Archivo subido con método alternativo")
                 except Exception as e2:
-                    print(f"✗ Error con método 2: {str(e2)}")
+                    logger.warning("Error con método 2: %s", e2)
                     raise Exception("Error al subir archivo de prueba")
 
             # Probar obtención de URL
             try:
                 url = supabase.storage.from_(test_bucket).get_public_url(test_file)
-                print(f"✓ URL pública obtenida")
+                logger.info("URL pública obtenida")
             except Exception as e:
-                print(f"✗ Error al obtener URL: {str(e)}")
+                logger.warning("Error al obtener URL: %s", e)
 
             # Limpiar archivo de prueba
             try:
@@ -118,10 +328,10 @@ def inicializar_storage():
                 except Exception:
                     pass
         except Exception as test_error:
-            print(f"❌ Prueba de storage falló: {str(test_error)}")
+            logger.warning("Prueba de storage falló: %s", test_error)
 
-        print("✅ Storage inicializado correctamente")
+        logger.info("Storage inicializado correctamente")
         return True, supabase_url, supabase_key
     except Exception as e:
-        print(f"Error general en inicializar_storage: {str(e)}")
+        logger.warning("Error general en inicializar_storage: %s", e)
         return False, None, None
\ No newline at end of file
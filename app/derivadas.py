@@ -0,0 +1,109 @@
+"""Variantes reducidas de las imágenes subidas (miniatura y WebP).
+
+Tras subir el original se generan, en el pool de hilos, una miniatura y una
+versión WebP de tamaño acotado. Se guardan en el mismo bucket y carpeta que
+el original y sus URLs se registran en las columnas `miniatura_url` y
+`webp_url` de `imagenes`. Pillow es opcional: si no está instalado, o si la
+imagen no se puede procesar, solo se guarda el original.
+"""
+import io
+import logging
+import os
+from .ejecutor import ejecutar_en_hilo
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+IMAGEN_DERIVADAS = os.getenv("IMAGEN_DERIVADAS", "true").lower() == "true"
+# Lado mayor (px) de cada variante y calidad WebP
+IMAGEN_MINIATURA_LADO = int(os.getenv("IMAGEN_MINIATURA_LADO", "320"))
+IMAGEN_WEBP_LADO = int(os.getenv("IMAGEN_WEBP_LADO", "1600"))
+IMAGEN_WEBP_CALIDAD = int(os.getenv("IMAGEN_WEBP_CALIDAD", "80"))
+
+# variante -> (columna en imagenes, sufijo del archivo, lado máximo)
+VARIANTES = {
+    "miniatura": ("miniatura_url", "_miniatura.webp", IMAGEN_MINIATURA_LADO),
+    "webp": ("webp_url", "_web.webp", IMAGEN_WEBP_LADO),
+}
+
+# Orden de preferencia al elegir la URL de una imagen, de menor a mayor tamaño
+PREFERENCIA_VARIANTE = {
+    "miniatura": ["miniatura_url", "webp_url", "url"],
+    "webp": ["webp_url", "url"],
+    "original": ["url"],
+}
+
+
+def derivadas_disponibles():
+    return IMAGEN_DERIVADAS and Image is not None
+
+
+def ruta_variante(file_path, variante):
+    """`12/abc.jpg` -> `12/abc_miniatura.webp`"""
+    base = os.path.splitext(file_path)[0]
+    return base + VARIANTES[variante][1]
+
+
+def rutas_derivadas(file_path):
+    return [ruta_variante(file_path, variante) for variante in VARIANTES]
+
+
+def _generar(archivo):
+    """Genera el contenido WebP de cada variante (se ejecuta en un hilo)"""
+    archivo.seek(0)
+    with Image.open(archivo) as original:
+        # Para JPEG decodifica directamente a menor resolución
+        original.draft("RGB", (IMAGEN_WEBP_LADO, IMAGEN_WEBP_LADO))
+        imagen = ImageOps.exif_transpose(original)
+        if imagen.mode not in ("RGB", "RGBA"):
+            imagen = imagen.convert("RGBA" if "transparency" in imagen.info else "RGB")
+
+        resultado = {}
+        # De mayor a menor, para reducir cada vez a partir de la anterior
+        for variante, (_, _, lado) in sorted(VARIANTES.items(), key=lambda v: -v[1][2]):
+            imagen = imagen.copy()
+            imagen.thumbnail((lado, lado))
+            salida = io.BytesIO()
+            imagen.save(salida, "WEBP", quality=IMAGEN_WEBP_CALIDAD, method=4)
+            resultado[variante] = salida.getvalue()
+    archivo.seek(0)
+    return resultado
+
+
+async def subir_derivadas(repo_imagenes, bucket_name, file_path, imagen):
+    """Genera y sube las variantes de una `ImagenSubida` ya subida.
+
+    Devuelve las columnas a guardar en `imagenes` ({"miniatura_url": ...,
+    "webp_url": ...}); vacío si no se pudieron generar.
+    """
+    if not derivadas_disponibles():
+        return {}
+
+    try:
+        contenidos = await ejecutar_en_hilo(_generar, imagen.upload.file)
+    except Exception as e:
+        logger.warning("No se pudieron generar variantes de %s: %s", file_path, e)
+        return {}
+
+    columnas = {}
+    for variante, contenido in contenidos.items():
+        columna = VARIANTES[variante][0]
+        try:
+            columnas[columna] = await repo_imagenes.subir_archivo(
+                bucket_name, ruta_variante(file_path, variante), contenido, "image/webp"
+            )
+        except Exception as e:
+            logger.warning("Error al subir la variante %s de %s: %s", variante, file_path, e)
+    return columnas
+
+
+def url_preferida(imagen, variante="miniatura"):
+    """URL de la variante pedida de una fila de `imagenes`, o la más cercana"""
+    for columna in PREFERENCIA_VARIANTE.get(variante, ["url"]):
+        if imagen.get(columna):
+            return imagen[columna]
+    return None
@@ -0,0 +1,93 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Número máximo de hilos para operaciones que deben seguir siendo síncronas
+EJECUTOR_HILOS = int(os.getenv("EJECUTOR_HILOS", "8"))
+
+
+class EjecutorAcotado:
+    """Pool de hilos acotado que registra cuánto espera cada tarea en cola.
+
+    Se usa para todo lo que no puede ser asíncrono (clientes Supabase
+    síncronos, procesamiento de CPU) sin bloquear el event loop.
+    """
+
+    def __init__(self, max_hilos=EJECUTOR_HILOS):
+        self.max_hilos = max(1, max_hilos)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._completadas = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+        self._ejecucion_total = 0.0
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_hilos,
+                        thread_name_prefix="ejecutor"
+                    )
+        return self._pool
+
+    def _medir(self, funcion, encolada):
+        inicio = time.perf_counter()
+        espera = inicio - encolada
+        try:
+            return funcion()
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._lock:
+                self._pendientes -= 1
+                self._completadas += 1
+                self._espera_total += espera
+                self._espera_maxima = max(self._espera_maxima, espera)
+                self._ejecucion_total += duracion
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """Ejecuta una función síncrona en el pool y espera su resultado"""
+        # La tarea ve el contexto de la petición (p. ej. la instrumentación)
+        llamada = partial(contextvars.copy_context().run, funcion, *args, **kwargs)
+        with self._lock:
+            self._pendientes += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._obtener_pool(),
+            self._medir,
+            llamada,
+            time.perf_counter()
+        )
+
+    def metricas(self):
+        """Devuelve los contadores de uso del pool"""
+        with self._lock:
+            completadas = self._completadas
+            return {
+                "max_hilos": self.max_hilos,
+                "pendientes": self._pendientes,
+                "completadas": completadas,
+                "espera_cola_media_ms": round(self._espera_total / completadas * 1000, 3) if completadas else 0.0,
+                "espera_cola_maxima_ms": round(self._espera_maxima * 1000, 3),
+                "ejecucion_media_ms": round(self._ejecucion_total / completadas * 1000, 3) if completadas else 0.0,
+            }
+
+    def cerrar(self):
+        """Espera a las tareas en curso y libera los hilos"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+ejecutor = EjecutorAcotado()
+
+
+async def ejecutar_en_hilo(funcion, *args, **kwargs):
+    return await ejecutor.ejecutar(funcion, *args, **kwargs)
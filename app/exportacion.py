@@ -0,0 +1,144 @@
+"""Exportación masiva de las tablas como NDJSON, CSV o bloques columnares.
+
+Cada tabla se lee por lotes ordenados por id (keyset `id > último`), de modo
+que en memoria solo hay un lote a la vez. Al empezar se fija una instantánea
+(el id máximo de la tabla y la hora): las filas insertadas durante la
+exportación no se incluyen, y una exportación posterior puede pedir solo lo
+nuevo con `desde_id` igual al `id_maximo` de la anterior.
+
+El formato "columnar" agrupa cada lote en un objeto con un arreglo por
+columna, más compacto que NDJSON y fácil de cargar en herramientas de
+análisis.
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+
+EXPORTACION_TAMANO_LOTE = int(os.getenv("EXPORTACION_TAMANO_LOTE", "1000"))
+# Tope de `tamano_lote`: no debe superar el max-rows de PostgREST (1000 por
+# defecto), que recortaría el lote y terminaría la exportación antes de tiempo
+EXPORTACION_TAMANO_LOTE_MAXIMO = int(os.getenv("EXPORTACION_TAMANO_LOTE_MAXIMO", "1000"))
+
+TABLAS_EXPORTABLES = {
+    "buses": ["id", "nombre", "tipo", "esta_activo", "created_at", "updated_at"],
+    "estaciones": ["id", "nombre", "localidad", "esta_activo", "created_at", "updated_at"],
+    "imagenes": ["id", "url", "miniatura_url", "webp_url", "bus_id", "estacion_id", "created_at"],
+    "bus_estacion": ["id", "bus_id", "estacion_id", "created_at"],
+}
+
+# formato -> (content-type, extensión)
+FORMATOS_EXPORTACION = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "columnar": ("application/x-ndjson", "columnar.ndjson"),
+}
+
+
+def normalizar_tamano_lote(tamano_lote):
+    """Aplica el tamaño por defecto y el tope del servidor"""
+    if not tamano_lote or tamano_lote < 1:
+        return EXPORTACION_TAMANO_LOTE
+    return min(tamano_lote, EXPORTACION_TAMANO_LOTE_MAXIMO)
+
+
+async def tomar_instantanea(cliente, tabla):
+    """Fija el id máximo actual de la tabla como límite de la exportación"""
+    respuesta = await (
+        cliente.table(tabla)
+        .select("id")
+        .order("id", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return {
+        "tabla": tabla,
+        "id_maximo": respuesta.data[0]["id"] if respuesta.data else 0,
+        "generado_en": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+async def leer_lotes(cliente, tabla, id_maximo, desde_id=0, tamano_lote=EXPORTACION_TAMANO_LOTE):
+    """Genera lotes de filas con desde_id < id <= id_maximo, ordenados por id"""
+    columnas = ",".join(TABLAS_EXPORTABLES[tabla])
+    ultimo = desde_id
+    while ultimo < id_maximo:
+        respuesta = await (
+            cliente.table(tabla)
+            .select(columnas)
+            .gt("id", ultimo)
+            .lte("id", id_maximo)
+            .order("id")
+            .limit(tamano_lote)
+            .execute()
+        )
+        filas = respuesta.data
+        if not filas:
+            break
+        yield filas
+        ultimo = filas[-1]["id"]
+        if len(filas) < tamano_lote:
+            break
+
+
+def _ndjson(columnas, filas, primero):
+    return "".join(json.dumps(fila, ensure_ascii=False, default=str) + "\n" for fila in filas)
+
+
+def _valor_csv(valor):
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    return valor
+
+
+def _csv(columnas, filas, primero):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    if primero:
+        escritor.writerow(columnas)
+    escritor.writerows([_valor_csv(fila.get(c)) for c in columnas] for fila in filas)
+    return salida.getvalue()
+
+
+def _columnar(columnas, filas, primero):
+    bloque = {
+        "filas": len(filas),
+        "columnas": {c: [fila.get(c) for fila in filas] for c in columnas},
+    }
+    return json.dumps(bloque, ensure_ascii=False, default=str, separators=(",", ":")) + "\n"
+
+
+SERIALIZADORES = {
+    "ndjson": _ndjson,
+    "csv": _csv,
+    "columnar": _columnar,
+}
+
+
+async def exportar(cliente, tabla, formato, id_maximo, desde_id=0,
+                   tamano_lote=EXPORTACION_TAMANO_LOTE, comprimir=False):
+    """Genera el contenido exportado en bytes, un fragmento por lote.
+
+    Con `comprimir` la salida es un único flujo gzip comprimido al vuelo.
+    """
+    columnas = TABLAS_EXPORTABLES[tabla]
+    serializar = SERIALIZADORES[formato]
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None
+
+    primero = True
+    async for filas in leer_lotes(cliente, tabla, id_maximo, desde_id, tamano_lote):
+        datos = serializar(columnas, filas, primero).encode("utf-8")
+        primero = False
+        if compresor:
+            datos = compresor.compress(datos)
+        if datos:
+            yield datos
+
+    if formato == "csv" and primero:
+        # Tabla vacía: al menos la cabecera
+        datos = serializar(columnas, [], True).encode("utf-8")
+        yield compresor.compress(datos) if compresor else datos
+    if compresor:
+        yield compresor.flush()
@@ -0,0 +1,38 @@
+"""Facetas de buses (tipo) y estaciones (localidad) con conteos.
+
+Se leen de la tabla `facetas` que mantienen los triggers de
+migrations/facetas.sql, así que el costo depende del número de valores
+distintos y no del número de filas. El resultado se guarda en la caché de
+cada entidad bajo una clave "lista", que ya se invalida en cada escritura.
+"""
+from .cache import cache_buses, cache_estaciones
+
+CACHES = {"buses": cache_buses, "estaciones": cache_estaciones}
+
+
+def _armar(campo, filas):
+    valores = sorted(
+        (
+            {
+                "valor": f["valor"],
+                "activos": f["activos"],
+                "inactivos": f["inactivos"],
+                "total": f["activos"] + f["inactivos"],
+            }
+            for f in filas
+        ),
+        key=lambda v: v["valor"]
+    )
+    return {
+        campo: valores,
+        "activos": sum(v["activos"] for v in valores),
+        "inactivos": sum(v["inactivos"] for v in valores),
+    }
+
+
+async def obtener_facetas(repos, entidad):
+    async def cargar():
+        filas = await repos.facetas.listar(entidad)
+        return _armar(repos.facetas.CAMPOS[entidad], filas)
+
+    return await CACHES[entidad].obtener_o_cargar(("lista", "facetas"), cargar)
@@ -0,0 +1,302 @@
+"""Grafo bus-estación en memoria para consultas de trayectos.
+
+El grafo es bipartito: una estación está unida a los buses que paran en
+ella (tabla bus_estacion). Se guarda en arreglos de adyacencia compactos
+(formato CSR: un arreglo de inicios y otro de vecinos por cada lado) con
+ids densos, de modo que un recorrido en anchura no crea objetos por arista.
+
+Las asociaciones que se agregan o quitan después de la carga se guardan
+aparte (`_extra_*` y `_quitadas`) y se combinan al recorrer; cuando superan
+GRAFO_MAX_CAMBIOS se reconstruyen los arreglos. Como en el índice de rutas,
+cada worker recarga el grafo completo cada GRAFO_TTL segundos.
+"""
+import asyncio
+import os
+import time
+from array import array
+
+GRAFO_TTL = float(os.getenv("GRAFO_TTL", "300"))
+GRAFO_MAX_CAMBIOS = int(os.getenv("GRAFO_MAX_CAMBIOS", "1000"))
+
+
+def _csr(num_nodos, pares):
+    """Arreglos (inicios, vecinos) con los vecinos de cada nodo contiguos"""
+    inicios = array("l", [0]) * (num_nodos + 1)
+    for nodo, _ in pares:
+        inicios[nodo + 1] += 1
+    for i in range(num_nodos):
+        inicios[i + 1] += inicios[i]
+    vecinos = array("l", [0]) * len(pares)
+    siguiente = array("l", inicios[:-1])
+    for nodo, vecino in pares:
+        vecinos[siguiente[nodo]] = vecino
+        siguiente[nodo] += 1
+    return inicios, vecinos
+
+
+class GrafoBusEstacion:
+    def __init__(self, ttl=GRAFO_TTL, max_cambios=GRAFO_MAX_CAMBIOS):
+        self.ttl = ttl
+        self.max_cambios = max_cambios
+        self.cargado_en = None
+        self.cargas = 0
+        self.compactaciones = 0
+        self._lock = asyncio.Lock()
+        self._construir([])
+
+    # --- Construcción ---
+
+    def _construir(self, pares):
+        """Reconstruye los arreglos a partir de pares (bus_id, estacion_id)"""
+        self.estacion_ids = []
+        self.bus_ids = []
+        self._indice_estacion = {}
+        self._indice_bus = {}
+        aristas = set()
+        for bus_id, estacion_id in pares:
+            aristas.add((self._nodo_bus(bus_id), self._nodo_estacion(estacion_id)))
+
+        self._bus_inicios, self._bus_estaciones = _csr(len(self.bus_ids), aristas)
+        self._est_inicios, self._est_buses = _csr(
+            len(self.estacion_ids), [(e, b) for b, e in aristas]
+        )
+        self.num_aristas = len(aristas)
+        self._extra_bus = {}
+        self._extra_estacion = {}
+        self._quitadas = set()
+
+    def _nodo_estacion(self, estacion_id):
+        nodo = self._indice_estacion.get(estacion_id)
+        if nodo is None:
+            nodo = self._indice_estacion[estacion_id] = len(self.estacion_ids)
+            self.estacion_ids.append(estacion_id)
+            # Los nodos nuevos no tienen vecinos en los arreglos compactos
+            if self.cargado_en is not None:
+                self._est_inicios.append(self._est_inicios[-1])
+        return nodo
+
+    def _nodo_bus(self, bus_id):
+        nodo = self._indice_bus.get(bus_id)
+        if nodo is None:
+            nodo = self._indice_bus[bus_id] = len(self.bus_ids)
+            self.bus_ids.append(bus_id)
+            if self.cargado_en is not None:
+                self._bus_inicios.append(self._bus_inicios[-1])
+        return nodo
+
+    def _vigente(self):
+        return self.cargado_en is not None and time.monotonic() - self.cargado_en < self.ttl
+
+    async def asegurar(self, cargar):
+        """Carga el grafo si aún no existe o si venció el TTL.
+
+        `cargar` es una corrutina sin argumentos que devuelve todos los
+        pares (bus_id, estacion_id).
+        """
+        if self._vigente():
+            return
+        async with self._lock:
+            if self._vigente():
+                return
+            pares = await cargar()
+            self.cargado_en = None
+            self._construir(pares)
+            self.cargado_en = time.monotonic()
+            self.cargas += 1
+
+    def invalidar(self):
+        """Fuerza una recarga completa en la próxima consulta (p. ej. tras una importación)"""
+        self.cargado_en = None
+
+    # --- Vecinos (arreglos compactos + cambios pendientes) ---
+
+    def _buses_de(self, nodo):
+        buses = self._est_buses[self._est_inicios[nodo]:self._est_inicios[nodo + 1]]
+        if self._quitadas:
+            buses = [b for b in buses if (b, nodo) not in self._quitadas]
+        extra = self._extra_estacion.get(nodo)
+        return list(buses) + list(extra) if extra else buses
+
+    def _estaciones_de(self, nodo):
+        estaciones = self._bus_estaciones[self._bus_inicios[nodo]:self._bus_inicios[nodo + 1]]
+        if self._quitadas:
+            estaciones = [e for e in estaciones if (nodo, e) not in self._quitadas]
+        extra = self._extra_bus.get(nodo)
+        return list(estaciones) + list(extra) if extra else estaciones
+
+    def _en_arreglos(self, bus, estacion):
+        return estacion in self._bus_estaciones[self._bus_inicios[bus]:self._bus_inicios[bus + 1]]
+
+    # --- Actualizaciones incrementales ---
+
+    def _agregar(self, bus_id, estacion_id):
+        bus, estacion = self._nodo_bus(bus_id), self._nodo_estacion(estacion_id)
+        if (bus, estacion) in self._quitadas:
+            self._quitadas.discard((bus, estacion))
+        elif not self._en_arreglos(bus, estacion):
+            self._extra_bus.setdefault(bus, set()).add(estacion)
+            self._extra_estacion.setdefault(estacion, set()).add(bus)
+
+    def _quitar(self, bus_id, estacion_id):
+        bus, estacion = self._indice_bus.get(bus_id), self._indice_estacion.get(estacion_id)
+        if bus is None or estacion is None:
+            return
+        if estacion in self._extra_bus.get(bus, ()):
+            self._extra_bus[bus].discard(estacion)
+            self._extra_estacion[estacion].discard(bus)
+        elif self._en_arreglos(bus, estacion):
+            self._quitadas.add((bus, estacion))
+
+    def _compactar_si_hace_falta(self):
+        extra = sum(len(v) for v in self._extra_bus.values())
+        if extra + len(self._quitadas) > self.max_cambios:
+            cargado_en = self.cargado_en
+            self.cargado_en = None
+            self._construir(self.pares())
+            self.cargado_en = cargado_en
+            self.compactaciones += 1
+
+    async def aplicar(self, agregar=(), quitar=()):
+        """Aplica asociaciones agregadas y quitadas (pares bus_id, estacion_id)"""
+        async with self._lock:
+            # Si aún no se cargó, la primera carga ya las incluirá
+            if self.cargado_en is None:
+                return
+            for bus_id, estacion_id in quitar:
+                self._quitar(bus_id, estacion_id)
+            for bus_id, estacion_id in agregar:
+                self._agregar(bus_id, estacion_id)
+            self._compactar_si_hace_falta()
+
+    async def eliminar_bus(self, bus_id):
+        async with self._lock:
+            nodo = self._indice_bus.get(bus_id)
+            if self.cargado_en is None or nodo is None:
+                return
+            for estacion in self._estaciones_de(nodo):
+                self._quitar(bus_id, self.estacion_ids[estacion])
+            self._compactar_si_hace_falta()
+
+    async def eliminar_estacion(self, estacion_id):
+        async with self._lock:
+            nodo = self._indice_estacion.get(estacion_id)
+            if self.cargado_en is None or nodo is None:
+                return
+            for bus in self._buses_de(nodo):
+                self._quitar(self.bus_ids[bus], estacion_id)
+            self._compactar_si_hace_falta()
+
+    def pares(self):
+        """Todos los pares (bus_id, estacion_id) vigentes"""
+        return [
+            (bus_id, self.estacion_ids[estacion])
+            for bus, bus_id in enumerate(self.bus_ids)
+            for estacion in self._estaciones_de(bus)
+        ]
+
+    # --- Consultas ---
+
+    def trayecto(self, origen_id, destino_id, max_transbordos=None):
+        """Trayecto con el mínimo de transbordos entre dos estaciones.
+
+        Recorre el grafo en anchura por niveles (estación -> buses ->
+        estaciones), así el primer nivel que alcanza el destino usa el menor
+        número de buses. Devuelve la lista de tramos o None si no hay trayecto.
+        """
+        origen = self._indice_estacion.get(origen_id)
+        destino = self._indice_estacion.get(destino_id)
+        if origen is None or destino is None:
+            return None
+        if origen == destino:
+            return []
+
+        estacion_visitada = bytearray(len(self.estacion_ids))
+        bus_visitado = bytearray(len(self.bus_ids))
+        llegada = {}  # estación -> (bus, estación anterior)
+        estacion_visitada[origen] = 1
+        frontera = [origen]
+        buses_usados = 0
+
+        while frontera:
+            buses_usados += 1
+            if max_transbordos is not None and buses_usados - 1 > max_transbordos:
+                return None
+            siguiente = []
+            for estacion in frontera:
+                for bus in self._buses_de(estacion):
+                    if bus_visitado[bus]:
+                        continue
+                    bus_visitado[bus] = 1
+                    for vecina in self._estaciones_de(bus):
+                        if estacion_visitada[vecina]:
+                            continue
+                        estacion_visitada[vecina] = 1
+                        llegada[vecina] = (bus, estacion)
+                        if vecina == destino:
+                            return self._tramos(llegada, destino)
+                        siguiente.append(vecina)
+            frontera = siguiente
+        return None
+
+    def _tramos(self, llegada, destino):
+        tramos = []
+        estacion = destino
+        while estacion in llegada:
+            bus, anterior = llegada[estacion]
+            tramos.append({
+                "bus_id": self.bus_ids[bus],
+                "desde": self.estacion_ids[anterior],
+                "hasta": self.estacion_ids[estacion],
+            })
+            estacion = anterior
+        tramos.reverse()
+        return tramos
+
+    def alcanzables(self, origen_id, max_transbordos=0):
+        """Estaciones alcanzables desde el origen con a lo sumo `max_transbordos`.
+
+        Devuelve {estacion_id: transbordos necesarios} o None si la estación
+        no está en el grafo.
+        """
+        origen = self._indice_estacion.get(origen_id)
+        if origen is None:
+            return None
+        estacion_visitada = bytearray(len(self.estacion_ids))
+        bus_visitado = bytearray(len(self.bus_ids))
+        estacion_visitada[origen] = 1
+        resultado = {}
+        frontera = [origen]
+        for transbordos in range(max_transbordos + 1):
+            siguiente = []
+            for estacion in frontera:
+                for bus in self._buses_de(estacion):
+                    if bus_visitado[bus]:
+                        continue
+                    bus_visitado[bus] = 1
+                    for vecina in self._estaciones_de(bus):
+                        if not estacion_visitada[vecina]:
+                            estacion_visitada[vecina] = 1
+                            resultado[self.estacion_ids[vecina]] = transbordos
+                            siguiente.append(vecina)
+            if not siguiente:
+                break
+            frontera = siguiente
+        return resultado
+
+    def estado(self):
+        return {
+            "estaciones": len(self.estacion_ids),
+            "buses": len(self.bus_ids),
+            "aristas_compactas": self.num_aristas,
+            "agregadas_pendientes": sum(len(v) for v in self._extra_bus.values()),
+            "quitadas_pendientes": len(self._quitadas),
+            "cargas": self.cargas,
+            "compactaciones": self.compactaciones,
+            "edad_segundos": (
+                round(time.monotonic() - self.cargado_en, 1) if self.cargado_en is not None else None
+            ),
+            "ttl": self.ttl,
+        }
+
+
+grafo = GrafoBusEstacion()
@@ -0,0 +1,297 @@
+"""Importación masiva de buses, estaciones y asociaciones desde CSV o NDJSON.
+
+El contenido se lee como flujo de líneas y se valida fila a fila; las filas
+válidas se insertan en lotes de tamaño configurable. En memoria solo hay un
+lote y, como mucho, IMPORTACION_MAX_ERRORES errores, sin importar el tamaño
+del archivo. Una línea (o un registro CSV con saltos de línea) de más de
+IMPORTACION_MAX_LINEA caracteres se informa como fila con error y se
+descarta, así un archivo sin saltos de línea o con comillas sin cerrar
+tampoco acumula todo en memoria.
+
+Las filas se numeran desde 1 sin contar la cabecera CSV. Tras cada lote (o
+cada fila, si el lote falló y se inserta fila a fila) se informa la última
+fila confirmada; para reanudar una importación
+interrumpida basta con volver a enviar el archivo con `desde_fila`.
+"""
+import codecs
+import csv
+import json
+import os
+from postgrest.exceptions import APIError
+
+IMPORTACION_TAMANO_LOTE = int(os.getenv("IMPORTACION_TAMANO_LOTE", "500"))
+# Tope de `tamano_lote`: el lote se acumula en memoria antes de insertarse
+IMPORTACION_TAMANO_LOTE_MAXIMO = int(os.getenv("IMPORTACION_TAMANO_LOTE_MAXIMO", "5000"))
+IMPORTACION_MAX_ERRORES = int(os.getenv("IMPORTACION_MAX_ERRORES", "100"))
+IMPORTACION_MAX_LINEA = int(os.getenv("IMPORTACION_MAX_LINEA", str(1024 * 1024)))
+
+FORMATOS = ("csv", "ndjson")
+
+
+class FilaInvalida(ValueError):
+    pass
+
+
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    if valor is None or not str(valor).strip():
+        raise FilaInvalida(f"Falta el campo '{campo}'")
+    return str(valor).strip()
+
+
+def _booleano(fila, campo, por_defecto=True):
+    valor = fila.get(campo)
+    if valor is None or valor == "":
+        return por_defecto
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in ("true", "1", "si", "sí", "t"):
+        return True
+    if texto in ("false", "0", "no", "f"):
+        return False
+    raise FilaInvalida(f"Valor no válido para '{campo}': {valor}")
+
+
+def _entero(fila, campo):
+    valor = fila.get(campo)
+    try:
+        return int(str(valor).strip())
+    except (TypeError, ValueError):
+        raise FilaInvalida(f"'{campo}' debe ser un número entero")
+
+
+def validar_bus(fila):
+    return {
+        "nombre": _texto(fila, "nombre"),
+        "tipo": _texto(fila, "tipo"),
+        "esta_activo": _booleano(fila, "esta_activo"),
+    }
+
+
+def validar_estacion(fila):
+    return {
+        "nombre": _texto(fila, "nombre"),
+        "localidad": _texto(fila, "localidad"),
+        "esta_activo": _booleano(fila, "esta_activo"),
+    }
+
+
+def validar_bus_estacion(fila):
+    return {
+        "bus_id": _entero(fila, "bus_id"),
+        "estacion_id": _entero(fila, "estacion_id"),
+    }
+
+
+# entidad -> (tabla, validador)
+ENTIDADES = {
+    "buses": ("buses", validar_bus),
+    "estaciones": ("estaciones", validar_estacion),
+    "bus_estacion": ("bus_estacion", validar_bus_estacion),
+}
+
+
+def _linea_demasiado_larga(max_linea):
+    return FilaInvalida(f"Línea de más de {max_linea} caracteres")
+
+
+async def lineas_de_bloques(bloques, max_linea=IMPORTACION_MAX_LINEA):
+    """Convierte un flujo asíncrono de bytes en líneas de texto UTF-8.
+
+    Una línea de más de `max_linea` caracteres se entrega como FilaInvalida
+    y el resto de esa línea se descarta sin guardarlo.
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    resto = ""
+    # Se está saltando el final de una línea demasiado larga
+    descartando = False
+    async for bloque in bloques:
+        *lineas, resto = (resto + decodificador.decode(bloque)).split("\n")
+        for linea in lineas:
+            if descartando:
+                descartando = False
+            elif len(linea) > max_linea:
+                yield _linea_demasiado_larga(max_linea)
+            else:
+                yield linea.rstrip("\r")
+        if descartando:
+            resto = ""
+        elif len(resto) > max_linea:
+            yield _linea_demasiado_larga(max_linea)
+            resto = ""
+            descartando = True
+    resto += decodificador.decode(b"", final=True)
+    if not descartando and resto.strip():
+        if len(resto) > max_linea:
+            yield _linea_demasiado_larga(max_linea)
+        else:
+            yield resto.rstrip("\r")
+
+
+async def registros_csv(lineas, max_registro=IMPORTACION_MAX_LINEA):
+    """Diccionarios por fila; admite campos entre comillas con saltos de línea.
+
+    Un registro que supera `max_registro` caracteres sin cerrar sus comillas
+    se entrega como FilaInvalida y la lectura sigue en la línea siguiente.
+    """
+    cabecera = None
+    pendiente = None
+    comillas = 0
+    async for linea in lineas:
+        if isinstance(linea, FilaInvalida):
+            pendiente, comillas = None, 0
+            yield linea
+            continue
+        pendiente = linea if pendiente is None else pendiente + "\n" + linea
+        comillas += linea.count('"')
+        # Un número impar de comillas indica un campo que sigue en la línea siguiente
+        if comillas % 2:
+            if len(pendiente) > max_registro:
+                pendiente, comillas = None, 0
+                yield FilaInvalida(f"Registro de más de {max_registro} caracteres (¿comillas sin cerrar?)")
+            continue
+        texto, pendiente, comillas = pendiente, None, 0
+        if not texto.strip():
+            continue
+        valores = next(csv.reader([texto]))
+        if cabecera is None:
+            cabecera = [c.strip() for c in valores]
+            continue
+        if len(valores) != len(cabecera):
+            yield FilaInvalida(f"Se esperaban {len(cabecera)} columnas y hay {len(valores)}")
+            continue
+        yield dict(zip(cabecera, valores))
+    if pendiente is not None:
+        yield FilaInvalida("Comillas sin cerrar al final del archivo")
+
+
+async def registros_ndjson(lineas):
+    async for linea in lineas:
+        if isinstance(linea, FilaInvalida):
+            yield linea
+            continue
+        if not linea.strip():
+            continue
+        try:
+            registro = json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield FilaInvalida(f"JSON inválido: {e.msg}")
+            continue
+        if not isinstance(registro, dict):
+            yield FilaInvalida("Cada línea debe ser un objeto JSON")
+            continue
+        yield registro
+
+
+def normalizar_tamano_lote(tamano_lote):
+    """Aplica el tamaño por defecto y el tope del servidor"""
+    if not tamano_lote or tamano_lote < 1:
+        return IMPORTACION_TAMANO_LOTE
+    return min(tamano_lote, IMPORTACION_TAMANO_LOTE_MAXIMO)
+
+
+class Importador:
+    """Valida filas y las inserta en lotes, acumulando el resumen"""
+
+    def __init__(self, cliente, entidad, tamano_lote=IMPORTACION_TAMANO_LOTE,
+                 max_errores=IMPORTACION_MAX_ERRORES):
+        if entidad not in ENTIDADES:
+            raise ValueError(f"Entidad no soportada: {entidad}")
+        self.cliente = cliente
+        self.entidad = entidad
+        self.tabla, self.validar = ENTIDADES[entidad]
+        self.tamano_lote = normalizar_tamano_lote(tamano_lote)
+        self.max_errores = max_errores
+        self.procesadas = 0
+        self.insertadas = 0
+        self.con_error = 0
+        self.lotes = 0
+        self.ultima_fila = 0
+        self.errores = []
+
+    def _registrar_error(self, numero, error):
+        self.con_error += 1
+        if len(self.errores) < self.max_errores:
+            self.errores.append({"fila": numero, "error": error})
+
+    async def _confirmar(self, numero, al_confirmar):
+        self.ultima_fila = numero
+        if al_confirmar:
+            await al_confirmar(numero)
+
+    async def _insertar_lote(self, lote, al_confirmar=None):
+        """Inserta el lote en una petición; si falla, fila a fila para aislar errores.
+
+        Fila a fila se confirma cada fila al terminarla, para que al reanudar
+        con `desde_fila` no se repitan las que ya se insertaron.
+        """
+        self.lotes += 1
+        try:
+            await self.cliente.table(self.tabla).insert([datos for _, datos in lote]).execute()
+            self.insertadas += len(lote)
+            return
+        except APIError as e:
+            if len(lote) == 1:
+                self._registrar_error(lote[0][0], e.message or str(e))
+                return
+
+        for numero, datos in lote:
+            try:
+                await self.cliente.table(self.tabla).insert(datos).execute()
+                self.insertadas += 1
+            except APIError as e:
+                self._registrar_error(numero, e.message or str(e))
+            await self._confirmar(numero, al_confirmar)
+
+    async def importar(self, registros, desde_fila=0, al_confirmar=None):
+        """Consume `registros` (dicts o FilaInvalida) e inserta por lotes.
+
+        Las filas con número <= `desde_fila` se omiten. `al_confirmar(n)` se
+        llama tras cada lote (y tras cada fila si el lote se inserta fila a
+        fila) con la última fila ya procesada.
+        """
+        self.ultima_fila = desde_fila
+        lote = []
+        numero = 0
+        async for registro in registros:
+            numero += 1
+            if numero <= desde_fila:
+                continue
+            self.procesadas += 1
+            try:
+                if isinstance(registro, FilaInvalida):
+                    raise registro
+                lote.append((numero, self.validar(registro)))
+            except FilaInvalida as e:
+                self._registrar_error(numero, str(e))
+
+            if len(lote) >= self.tamano_lote:
+                await self._insertar_lote(lote, al_confirmar)
+                lote = []
+                await self._confirmar(numero, al_confirmar)
+
+        if lote:
+            await self._insertar_lote(lote, al_confirmar)
+        await self._confirmar(max(self.ultima_fila, numero), al_confirmar)
+        return self.resumen()
+
+    def resumen(self):
+        return {
+            "entidad": self.entidad,
+            "procesadas": self.procesadas,
+            "insertadas": self.insertadas,
+            "con_error": self.con_error,
+            "lotes": self.lotes,
+            "ultima_fila": self.ultima_fila,
+            "errores": self.errores,
+            "errores_omitidos": self.con_error - len(self.errores),
+        }
+
+
+def registros(lineas, formato):
+    if formato == "csv":
+        return registros_csv(lineas)
+    if formato == "ndjson":
+        return registros_ndjson(lineas)
+    raise ValueError(f"Formato no soportado: {formato}")
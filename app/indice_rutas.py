@@ -0,0 +1,158 @@
+"""Índice en memoria de rutas y paradas.
+
+Las consultas "qué rutas pasan por la estación X" y "siguientes paradas
+después de X en la ruta R" se responden desde este índice, sin consultar
+Supabase. El índice se carga completo la primera vez que se usa (una sola
+consulta con las paradas y buses embebidos) y después se actualiza ruta a
+ruta en cada escritura. Como cada worker tiene su propio índice, se recarga
+completo cada INDICE_RUTAS_TTL segundos para recoger los cambios hechos por
+otros procesos.
+"""
+import asyncio
+import os
+import time
+
+INDICE_RUTAS_TTL = float(os.getenv("INDICE_RUTAS_TTL", "300"))
+
+
+def _ruta_desde_fila(fila):
+    paradas = sorted(fila.get("ruta_paradas") or [], key=lambda p: p["orden"])
+    return {
+        "id": fila["id"],
+        "nombre": fila.get("nombre"),
+        "esta_activa": fila.get("esta_activa", True),
+        "paradas": [p["estacion_id"] for p in paradas],
+        "buses": sorted({b["bus_id"] for b in fila.get("bus_ruta") or []}),
+    }
+
+
+class IndiceRutas:
+    """Rutas por id y, por cada estación, las posiciones que ocupa en cada ruta"""
+
+    def __init__(self, ttl=INDICE_RUTAS_TTL):
+        self.ttl = ttl
+        self.rutas = {}
+        self.por_estacion = {}
+        self.cargado_en = None
+        self.cargas = 0
+        self.actualizaciones = 0
+        self._lock = asyncio.Lock()
+
+    def _vigente(self):
+        return self.cargado_en is not None and time.monotonic() - self.cargado_en < self.ttl
+
+    async def asegurar(self, cargar):
+        """Carga el índice si aún no existe o si venció el TTL.
+
+        `cargar` es una corrutina sin argumentos que devuelve todas las
+        rutas con `ruta_paradas` y `bus_ruta` embebidos.
+        """
+        if self._vigente():
+            return
+        async with self._lock:
+            if self._vigente():
+                return
+            filas = await cargar()
+            self.rutas = {}
+            self.por_estacion = {}
+            for fila in filas:
+                self._agregar(_ruta_desde_fila(fila))
+            self.cargado_en = time.monotonic()
+            self.cargas += 1
+
+    def _agregar(self, ruta):
+        self.rutas[ruta["id"]] = ruta
+        for posicion, estacion_id in enumerate(ruta["paradas"]):
+            self.por_estacion.setdefault(estacion_id, {}).setdefault(ruta["id"], []).append(posicion)
+
+    def _quitar(self, ruta_id):
+        ruta = self.rutas.pop(ruta_id, None)
+        if ruta is None:
+            return
+        for estacion_id in set(ruta["paradas"]):
+            rutas = self.por_estacion.get(estacion_id)
+            if rutas is None:
+                continue
+            rutas.pop(ruta_id, None)
+            if not rutas:
+                del self.por_estacion[estacion_id]
+
+    async def actualizar_ruta(self, fila):
+        """Reemplaza una ruta del índice con su estado actual (fila con paradas y buses)"""
+        async with self._lock:
+            # Si aún no se cargó, la primera carga ya traerá esta ruta
+            if self.cargado_en is None:
+                return
+            self._quitar(fila["id"])
+            self._agregar(_ruta_desde_fila(fila))
+            self.actualizaciones += 1
+
+    async def eliminar_ruta(self, ruta_id):
+        async with self._lock:
+            self._quitar(ruta_id)
+            self.actualizaciones += 1
+
+    async def eliminar_estacion(self, estacion_id):
+        """Quita la estación de todas las rutas (las paradas se borran en cascada)"""
+        async with self._lock:
+            for ruta_id in list(self.por_estacion.get(estacion_id, {})):
+                ruta = self.rutas[ruta_id]
+                self._quitar(ruta_id)
+                ruta["paradas"] = [e for e in ruta["paradas"] if e != estacion_id]
+                self._agregar(ruta)
+            self.actualizaciones += 1
+
+    async def eliminar_bus(self, bus_id):
+        """Quita el bus de las rutas a las que estaba asignado"""
+        async with self._lock:
+            for ruta in self.rutas.values():
+                if bus_id in ruta["buses"]:
+                    ruta["buses"] = [b for b in ruta["buses"] if b != bus_id]
+            self.actualizaciones += 1
+
+    def obtener(self, ruta_id):
+        return self.rutas.get(ruta_id)
+
+    def rutas_de_estacion(self, estacion_id, solo_activas=True):
+        """Rutas que pasan por la estación, con las posiciones que ocupa en cada una"""
+        resultado = []
+        for ruta_id, posiciones in self.por_estacion.get(estacion_id, {}).items():
+            ruta = self.rutas[ruta_id]
+            if solo_activas and not ruta["esta_activa"]:
+                continue
+            resultado.append({
+                "ruta_id": ruta_id,
+                "nombre": ruta["nombre"],
+                "posiciones": posiciones,
+                "total_paradas": len(ruta["paradas"]),
+                "buses": ruta["buses"],
+            })
+        return sorted(resultado, key=lambda r: r["ruta_id"])
+
+    def siguientes_paradas(self, ruta_id, estacion_id, n=5):
+        """Las `n` paradas que siguen a la estación en la ruta.
+
+        Si la estación aparece varias veces (rutas circulares) se usa su
+        primera aparición. Devuelve None si la estación no está en la ruta.
+        """
+        posiciones = self.por_estacion.get(estacion_id, {}).get(ruta_id)
+        if not posiciones:
+            return None
+        paradas = self.rutas[ruta_id]["paradas"]
+        inicio = posiciones[0] + 1
+        return paradas[inicio:inicio + max(0, n)]
+
+    def estado(self):
+        return {
+            "rutas": len(self.rutas),
+            "estaciones": len(self.por_estacion),
+            "cargas": self.cargas,
+            "actualizaciones": self.actualizaciones,
+            "edad_segundos": (
+                round(time.monotonic() - self.cargado_en, 1) if self.cargado_en is not None else None
+            ),
+            "ttl": self.ttl,
+        }
+
+
+indice_rutas = IndiceRutas()
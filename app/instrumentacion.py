@@ -0,0 +1,368 @@
+"""Instrumentación de las llamadas a Supabase (PostgREST y Storage).
+
+Los clientes Supabase se instrumentan a nivel de transporte HTTP, así que
+cada llamada de tablas o storage que hagan los routers queda registrada sin
+tocar los repositorios: operación (select, insert, upload, get_bucket...),
+tabla o bucket, duración (hasta leer la respuesta completa), bytes enviados
+y recibidos y resultado. `get_public_url` no aparece porque solo arma la URL,
+sin llamadas de red.
+
+Por cada petición a la API el middleware:
+- agrega la cabecera `Server-Timing` con el tiempo por operación y tabla,
+- registra una línea de log estructurada con el resumen (INSTRUMENTACION_LOG),
+- acumula histogramas que se exponen en formato Prometheus en /metrics.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+import httpx
+
+INSTRUMENTACION_SERVER_TIMING = os.getenv("INSTRUMENTACION_SERVER_TIMING", "true").lower() == "true"
+INSTRUMENTACION_LOG = os.getenv("INSTRUMENTACION_LOG", "true").lower() == "true"
+
+# Límites (segundos) de las cubetas de los histogramas de duración
+LIMITES_HISTOGRAMA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rutas que no se instrumentan
+RUTAS_EXCLUIDAS = ("/static", "/metrics")
+
+# Entradas de Server-Timing como máximo (las de mayor duración)
+MAX_SERVER_TIMING = 20
+
+logger = logging.getLogger(__name__)
+
+# Llamadas a Supabase de la petición en curso
+_llamadas_peticion = ContextVar("llamadas_supabase", default=None)
+
+
+def clasificar(metodo, ruta):
+    """Devuelve (operacion, recurso) a partir del método y la ruta de la llamada"""
+    partes = [p for p in ruta.split("/") if p]
+    if partes[:2] == ["rest", "v1"] and len(partes) > 2:
+        if partes[2] == "rpc" and len(partes) > 3:
+            return "rpc", partes[3]
+        operacion = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update",
+                     "PUT": "upsert", "DELETE": "delete"}.get(metodo, metodo.lower())
+        return operacion, partes[2]
+    if partes[:2] == ["storage", "v1"] and len(partes) > 2:
+        seccion, resto = partes[2], partes[3:]
+        if seccion == "bucket":
+            if not resto:
+                return ("list_buckets" if metodo == "GET" else "create_bucket"), "-"
+            return {"GET": "get_bucket", "DELETE": "delete_bucket"}.get(metodo, "update_bucket"), resto[0]
+        if seccion == "object" and resto:
+            if resto[0] in ("list", "sign", "move", "copy", "public", "info", "authenticated"):
+                bucket = resto[1] if len(resto) > 1 else "-"
+                return resto[0], bucket
+            if metodo == "DELETE":
+                return "remove", resto[0]
+            return {"POST": "upload", "PUT": "update_object", "GET": "download"}.get(metodo, metodo.lower()), resto[0]
+        return seccion, resto[0] if resto else "-"
+    return metodo.lower(), partes[0] if partes else "-"
+
+
+class Histograma:
+    __slots__ = ("cubetas", "suma", "cuenta")
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_HISTOGRAMA) + 1)
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(LIMITES_HISTOGRAMA, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+
+
+def _etiquetas(nombres, valores, **extra):
+    pares = [*zip(nombres, valores), *extra.items()]
+    texto = ",".join(
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+        for n, v in pares
+    )
+    return "{" + texto + "}"
+
+
+class MetricasInstrumentacion:
+    """Histogramas y contadores acumulados desde que arrancó el proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.llamadas = {}      # (operacion, recurso, resultado) -> Histograma
+        self.bytes = {}         # (operacion, recurso) -> [enviados, recibidos]
+        self.peticiones = {}    # (metodo, ruta, estado) -> Histograma
+
+    def registrar_llamada(self, llamada):
+        clave = (llamada["operacion"], llamada["recurso"], llamada["resultado"])
+        with self._lock:
+            histograma = self.llamadas.get(clave)
+            if histograma is None:
+                histograma = self.llamadas[clave] = Histograma()
+            histograma.observar(llamada["duracion_ms"] / 1000)
+            contadores = self.bytes.setdefault((llamada["operacion"], llamada["recurso"]), [0, 0])
+            contadores[0] += llamada["bytes_enviados"]
+            contadores[1] += llamada["bytes_recibidos"]
+
+    def registrar_peticion(self, metodo, ruta, estado, duracion):
+        clave = (metodo, ruta, str(estado))
+        with self._lock:
+            histograma = self.peticiones.get(clave)
+            if histograma is None:
+                histograma = self.peticiones[clave] = Histograma()
+            histograma.observar(duracion)
+
+    @staticmethod
+    def _histograma(nombre, ayuda, etiquetas, datos):
+        lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} histogram"]
+        for clave, histograma in sorted(datos.items()):
+            acumulado = 0
+            for limite, cantidad in zip((*LIMITES_HISTOGRAMA, "+Inf"), histograma.cubetas):
+                acumulado += cantidad
+                lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas, clave, le=limite)} {acumulado}")
+            lineas.append(f"{nombre}_sum{_etiquetas(etiquetas, clave)} {histograma.suma:.6f}")
+            lineas.append(f"{nombre}_count{_etiquetas(etiquetas, clave)} {histograma.cuenta}")
+        return lineas
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus"""
+        with self._lock:
+            lineas = self._histograma(
+                "supabase_llamada_duracion_segundos", "Duración de las llamadas a PostgREST y Storage",
+                ("operacion", "recurso", "resultado"), self.llamadas
+            )
+            for indice, sufijo in ((0, "enviados"), (1, "recibidos")):
+                nombre = f"supabase_llamada_bytes_{sufijo}_total"
+                lineas += [f"# HELP {nombre} Bytes {sufijo} en llamadas a Supabase", f"# TYPE {nombre} counter"]
+                lineas += [
+                    f"{nombre}{_etiquetas(('operacion', 'recurso'), clave)} {contadores[indice]}"
+                    for clave, contadores in sorted(self.bytes.items())
+                ]
+            lineas += self._histograma(
+                "http_peticion_duracion_segundos", "Duración de las peticiones a la API",
+                ("metodo", "ruta", "estado"), self.peticiones
+            )
+        return "\n".join(lineas) + "\n"
+
+
+metricas = MetricasInstrumentacion()
+
+
+# --- Transporte HTTP instrumentado ---
+
+class _StreamMedido(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Envuelve el cuerpo de una petición o respuesta y cuenta sus bytes.
+
+    Si recibe `al_cerrar`, lo llama (una sola vez) cuando se cierra el stream.
+    """
+
+    def __init__(self, stream, al_cerrar=None):
+        self._stream = stream
+        self._al_cerrar = al_cerrar
+        self.bytes = 0
+
+    def __iter__(self):
+        for bloque in self._stream:
+            self.bytes += len(bloque)
+            yield bloque
+
+    async def __aiter__(self):
+        async for bloque in self._stream:
+            self.bytes += len(bloque)
+            yield bloque
+
+    def _terminar(self):
+        al_cerrar, self._al_cerrar = self._al_cerrar, None
+        if al_cerrar is not None:
+            al_cerrar(self.bytes)
+
+    def close(self):
+        try:
+            if hasattr(self._stream, "close"):
+                self._stream.close()
+        finally:
+            self._terminar()
+
+    async def aclose(self):
+        try:
+            if hasattr(self._stream, "aclose"):
+                await self._stream.aclose()
+        finally:
+            self._terminar()
+
+
+class _Medicion:
+    """Una llamada en curso: se completa al cerrar el cuerpo de la respuesta"""
+
+    def __init__(self, request):
+        self.operacion, self.recurso = clasificar(request.method, request.url.path)
+        self.inicio = time.perf_counter()
+        self.enviado = _StreamMedido(request.stream)
+        request.stream = self.enviado
+        # Se captura aquí: el cierre del stream puede ocurrir en otro contexto
+        self.llamadas = _llamadas_peticion.get()
+
+    def terminar(self, estado=None, bytes_recibidos=0, error=None):
+        if error is not None:
+            resultado = "excepcion"
+        else:
+            resultado = "ok" if estado < 400 else "error_http"
+        llamada = {
+            "operacion": self.operacion,
+            "recurso": self.recurso,
+            "estado": estado,
+            "resultado": resultado,
+            "duracion_ms": round((time.perf_counter() - self.inicio) * 1000, 2),
+            "bytes_enviados": self.enviado.bytes,
+            "bytes_recibidos": bytes_recibidos,
+        }
+        if error is not None:
+            llamada["error"] = type(error).__name__
+        metricas.registrar_llamada(llamada)
+        if self.llamadas is not None:
+            self.llamadas.append(llamada)
+
+    def envolver_respuesta(self, respuesta):
+        respuesta.stream = _StreamMedido(
+            respuesta.stream,
+            al_cerrar=lambda recibidos: self.terminar(respuesta.status_code, recibidos)
+        )
+        return respuesta
+
+
+class TransporteInstrumentado(httpx.BaseTransport):
+    def __init__(self, transporte):
+        self._transporte = transporte
+
+    def handle_request(self, request):
+        medicion = _Medicion(request)
+        try:
+            respuesta = self._transporte.handle_request(request)
+        except Exception as e:
+            medicion.terminar(error=e)
+            raise
+        return medicion.envolver_respuesta(respuesta)
+
+    def close(self):
+        self._transporte.close()
+
+
+class TransporteInstrumentadoAsync(httpx.AsyncBaseTransport):
+    def __init__(self, transporte):
+        self._transporte = transporte
+
+    async def handle_async_request(self, request):
+        medicion = _Medicion(request)
+        try:
+            respuesta = await self._transporte.handle_async_request(request)
+        except Exception as e:
+            medicion.terminar(error=e)
+            raise
+        return medicion.envolver_respuesta(respuesta)
+
+    async def aclose(self):
+        await self._transporte.aclose()
+
+
+def _instrumentar_sesion(sesion):
+    envolver = TransporteInstrumentadoAsync if isinstance(sesion, httpx.AsyncClient) else TransporteInstrumentado
+    if not isinstance(sesion._transport, envolver):
+        sesion._transport = envolver(sesion._transport)
+    # Transportes de proxies configurados por entorno
+    for patron, transporte in list(sesion._mounts.items()):
+        if transporte is not None and not isinstance(transporte, envolver):
+            sesion._mounts[patron] = envolver(transporte)
+
+
+def instrumentar_cliente(cliente):
+    """Instrumenta las sesiones HTTP de PostgREST y Storage de un cliente Supabase"""
+    _instrumentar_sesion(cliente.postgrest.session)
+    _instrumentar_sesion(cliente.storage.session)
+    return cliente
+
+
+# --- Resumen por petición ---
+
+def agrupar_llamadas(llamadas):
+    """Suma duración, cantidad y bytes por (operacion, recurso)"""
+    grupos = {}
+    for llamada in llamadas:
+        grupo = grupos.setdefault((llamada["operacion"], llamada["recurso"]), [0.0, 0, 0, 0])
+        grupo[0] += llamada["duracion_ms"]
+        grupo[1] += 1
+        grupo[2] += llamada["bytes_enviados"]
+        grupo[3] += llamada["bytes_recibidos"]
+    return grupos
+
+
+def server_timing(llamadas, duracion):
+    """Valor de la cabecera Server-Timing: total de la app y tiempo por operación"""
+    entradas = [f"app;dur={duracion * 1000:.1f}"]
+    if llamadas:
+        grupos = agrupar_llamadas(llamadas)
+        total = sum(g[0] for g in grupos.values())
+        entradas.append(f'supabase;dur={total:.1f};desc="{len(llamadas)} llamadas"')
+        mayores = sorted(grupos.items(), key=lambda g: -g[1][0])[:MAX_SERVER_TIMING]
+        for (operacion, recurso), (ms, cantidad, enviados, recibidos) in mayores:
+            nombre = "".join(c if c.isalnum() or c in "-_" else "-" for c in f"{operacion}.{recurso}")
+            entradas.append(
+                f'{nombre};dur={ms:.1f};desc="{operacion} {recurso} x{cantidad} {enviados}B/{recibidos}B"'
+            )
+    return ", ".join(entradas)
+
+
+def plantilla_ruta(scope):
+    """Ruta declarada en el router (/api/buses/{bus_id}) para no multiplicar series"""
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or "sin_ruta"
+
+
+class MiddlewareInstrumentacion:
+    """Middleware ASGI que resume las llamadas a Supabase de cada petición"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(RUTAS_EXCLUIDAS):
+            await self.app(scope, receive, send)
+            return
+
+        llamadas = []
+        token = _llamadas_peticion.set(llamadas)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                if INSTRUMENTACION_SERVER_TIMING:
+                    valor = server_timing(llamadas, time.perf_counter() - inicio)
+                    mensaje["headers"] = [
+                        *mensaje.get("headers", []),
+                        (b"server-timing", valor.encode("latin-1", "replace"))
+                    ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _llamadas_peticion.reset(token)
+            duracion = time.perf_counter() - inicio
+            ruta = plantilla_ruta(scope)
+            metricas.registrar_peticion(scope["method"], ruta, estado, duracion)
+            if INSTRUMENTACION_LOG:
+                logger.info("peticion", extra={"datos": {
+                    "metodo": scope["method"],
+                    "ruta": ruta,
+                    "path": scope["path"],
+                    "estado": estado,
+                    "duracion_ms": round(duracion * 1000, 2),
+                    "supabase_ms": round(sum(l["duracion_ms"] for l in llamadas), 2),
+                    "llamadas": llamadas,
+                }})
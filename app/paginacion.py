@@ -0,0 +1,116 @@
+"""Paginación por cursor (keyset) y proyección de campos para los listados.
+
+El cursor es opaco para el cliente: codifica el par (created_at, id) de la
+última fila devuelta, de modo que la página siguiente se pide con un filtro
+`(created_at, id) > cursor` en lugar de un OFFSET que recorra toda la tabla.
+"""
+import base64
+import json
+import os
+
+LIMITE_POR_DEFECTO = int(os.getenv("PAGINACION_LIMITE_POR_DEFECTO", "50"))
+LIMITE_MAXIMO = int(os.getenv("PAGINACION_LIMITE_MAXIMO", "200"))
+
+# Columnas necesarias siempre para poder construir el cursor
+COLUMNAS_CURSOR = ["id", "created_at"]
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def normalizar_limite(limite):
+    """Aplica el límite por defecto y el tope del servidor"""
+    if not limite or limite < 1:
+        return LIMITE_POR_DEFECTO
+    return min(limite, LIMITE_MAXIMO)
+
+
+def codificar_cursor(fila):
+    crudo = json.dumps([fila["created_at"], fila["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (created_at, id) o lanza CursorInvalido"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        created_at, fila_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except Exception:
+        raise CursorInvalido("Cursor de paginación inválido")
+    if not isinstance(created_at, str) or not isinstance(fila_id, int):
+        raise CursorInvalido("Cursor de paginación inválido")
+    return created_at, fila_id
+
+
+def codificar_cursor_id(valor):
+    """Cursor para listados ordenados por un único id (p. ej. relaciones)"""
+    return base64.urlsafe_b64encode(str(valor).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor_id(cursor):
+    """Devuelve el id (o desplazamiento) codificado, nunca negativo, o lanza CursorInvalido"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valor = int(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except Exception:
+        raise CursorInvalido("Cursor de paginación inválido")
+    if valor < 0:
+        raise CursorInvalido("Cursor de paginación inválido")
+    return valor
+
+
+def parsear_campos(fields, permitidos):
+    """Convierte `fields=a,b,c` en una lista de campos validados (None = todos)"""
+    if not fields:
+        return None
+    campos = [c.strip() for c in fields.split(",") if c.strip()]
+    desconocidos = [c for c in campos if c not in permitidos]
+    if desconocidos:
+        raise ValueError(f"Campos no permitidos: {', '.join(desconocidos)}")
+    return campos
+
+
+def construir_select(campos, columnas, con_imagen_url=False):
+    """Genera la cláusula select de PostgREST para una proyección.
+
+    `campos` puede incluir "imagenes" (arreglo completo embebido) o
+    "imagen_url" (solo las URLs de la primera imagen y sus variantes).
+    """
+    if campos is None:
+        return "*, imagenes(*)"
+
+    seleccion = [c for c in COLUMNAS_CURSOR]
+    seleccion += [c for c in campos if c in columnas and c not in seleccion]
+    if "imagenes" in campos:
+        seleccion.append("imagenes(*)")
+    elif con_imagen_url and "imagen_url" in campos:
+        seleccion.append("imagenes(url, miniatura_url, webp_url)")
+    return ", ".join(seleccion)
+
+
+def aplicar_cursor(query, cursor):
+    """Añade el filtro keyset (created_at, id) > cursor y el orden estable"""
+    if cursor:
+        created_at, fila_id = decodificar_cursor(cursor)
+        query = query.or_(
+            f'created_at.gt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.gt.{fila_id})'
+        )
+    return query.order("created_at").order("id")
+
+
+def armar_pagina(filas, limite, total=None, clave=None):
+    """Recorta la fila extra pedida y genera el cursor de la página siguiente.
+
+    Con `clave` el cursor es solo el valor de esa columna (listados
+    ordenados por un id) en lugar del par (created_at, id).
+    """
+    siguiente_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        if clave:
+            siguiente_cursor = codificar_cursor_id(filas[-1][clave])
+        else:
+            siguiente_cursor = codificar_cursor(filas[-1])
+    return {"datos": filas, "siguiente_cursor": siguiente_cursor, "total": total}
@@ -0,0 +1,97 @@
+"""Entorno Jinja2 compartido y páginas HTML pre-renderizadas.
+
+Hay un único `Environment` por proceso con caché de bytecode en disco y una
+caché acotada de plantillas compiladas. En producción todas las plantillas
+se cargan al arrancar y no se vuelven a leer del disco; con
+APP_MODO=desarrollo se recargan al modificarse.
+
+Las páginas sin datos dinámicos se renderizan una sola vez y se sirven con
+ETag, respondiendo 304 si el navegador ya tiene la misma versión.
+"""
+import hashlib
+import os
+from fastapi import HTTPException
+from fastapi.responses import HTMLResponse, Response
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateNotFound
+from .validadores import coincide_etag
+
+APP_MODO = os.getenv("APP_MODO", "produccion").lower()
+MODO_DESARROLLO = APP_MODO == "desarrollo"
+
+DIRECTORIO_PLANTILLAS = os.getenv("PLANTILLAS_DIRECTORIO", "templates")
+# Plantillas compiladas que se mantienen en memoria
+PLANTILLAS_CACHE_TAMANO = int(os.getenv("PLANTILLAS_CACHE_TAMANO", "100"))
+# Directorio de la caché de bytecode (por defecto, el temporal del sistema)
+PLANTILLAS_CACHE_DIR = os.getenv("PLANTILLAS_CACHE_DIR") or None
+
+
+def crear_entorno():
+    if PLANTILLAS_CACHE_DIR:
+        os.makedirs(PLANTILLAS_CACHE_DIR, exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(DIRECTORIO_PLANTILLAS),
+        autoescape=True,
+        auto_reload=MODO_DESARROLLO,
+        cache_size=PLANTILLAS_CACHE_TAMANO,
+        bytecode_cache=FileSystemBytecodeCache(PLANTILLAS_CACHE_DIR),
+    )
+
+
+entorno = crear_entorno()
+templates = Jinja2Templates(directory=DIRECTORIO_PLANTILLAS)
+# Conservar los globales de Starlette (url_for) en el entorno compartido
+entorno.globals.update(templates.env.globals)
+templates.env = entorno
+
+
+class PaginasEstaticas:
+    """HTML renderizado una vez por plantilla junto con su ETag"""
+
+    def __init__(self, entorno):
+        self.entorno = entorno
+        self._paginas = {}
+
+    def _renderizar(self, nombre):
+        html = self.entorno.get_template(nombre).render().encode("utf-8")
+        etag = '"' + hashlib.sha1(html).hexdigest()[:20] + '"'
+        self._paginas[nombre] = (html, etag)
+        return html, etag
+
+    def obtener(self, nombre):
+        # En desarrollo se vuelve a renderizar para reflejar los cambios
+        if MODO_DESARROLLO or nombre not in self._paginas:
+            return self._renderizar(nombre)
+        return self._paginas[nombre]
+
+    def precargar(self):
+        """Compila todas las plantillas y pre-renderiza las páginas.
+
+        Las plantillas en subdirectorios (p. ej. `panel/`) son fragmentos
+        con datos: solo se compilan.
+        """
+        errores = {}
+        for nombre in self.entorno.list_templates(extensions=["html"]):
+            try:
+                if "/" in nombre:
+                    self.entorno.get_template(nombre)
+                else:
+                    self._renderizar(nombre)
+            except Exception as e:
+                errores[nombre] = str(e)
+        return {"paginas": sorted(self._paginas), "errores": errores}
+
+    def respuesta(self, request, nombre):
+        """Respuesta HTML con ETag; 304 si coincide con If-None-Match"""
+        try:
+            html, etag = self.obtener(nombre)
+        except TemplateNotFound:
+            raise HTTPException(status_code=404, detail="Página no encontrada")
+
+        cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+        if coincide_etag(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cabeceras)
+        return HTMLResponse(content=html, headers=cabeceras)
+
+
+paginas = PaginasEstaticas(entorno)
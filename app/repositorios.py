@@ -0,0 +1,609 @@
+"""Capa de acceso a datos asíncrona sobre el cliente Supabase compartido.
+
+Los routers no construyen consultas PostgREST directamente: piden un
+`Repositorios` con `Depends(get_repos)` y usan sus métodos. Todas las
+llamadas son `await` sobre el cliente HTTP asíncrono, por lo que una
+consulta lenta no bloquea al resto de peticiones del worker.
+"""
+import logging
+from fastapi import Depends
+from postgrest.exceptions import APIError
+from .database import get_async_db
+from .almacenamiento import (
+    STORAGE_LOTE_BORRADO, es_bucket_no_encontrado, registro_buckets, rutas_de_imagenes
+)
+from .paginacion import aplicar_cursor, construir_select
+
+logger = logging.getLogger(__name__)
+
+# Columnas que se devuelven del otro lado de una relación bus-estación
+COLUMNAS_RELACION = {
+    "buses": ["id", "nombre", "tipo", "esta_activo"],
+    "estaciones": ["id", "nombre", "localidad", "esta_activo"],
+}
+
+# Códigos de PostgREST y Postgres cuando una función llamada por RPC no existe
+FUNCION_NO_ENCONTRADA = ("PGRST202", "42883")
+
+
+async def iterar_por_lotes(cliente, tabla, columnas, tamano_lote=1000):
+    """Recorre `tabla` por lotes ordenados por id (keyset); `columnas` debe incluir id"""
+    ultimo = 0
+    while True:
+        respuesta = await (
+            cliente.table(tabla)
+            .select(columnas)
+            .gt("id", ultimo)
+            .order("id")
+            .limit(tamano_lote)
+            .execute()
+        )
+        if respuesta.data:
+            yield respuesta.data
+        if len(respuesta.data) < tamano_lote:
+            return
+        ultimo = respuesta.data[-1]["id"]
+
+
+async def leer_por_lotes(cliente, tabla, columnas, tamano_lote=1000):
+    """Lee todas las filas de `tabla` por lotes ordenados por id (keyset)"""
+    filas = []
+    async for lote in iterar_por_lotes(cliente, tabla, columnas, tamano_lote):
+        filas += lote
+    return filas
+
+
+class RepositorioBuses:
+    COLUMNAS = ["id", "nombre", "tipo", "esta_activo", "created_at", "updated_at"]
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    async def listar(self, tipo=None, esta_activo=None, limite=50, cursor=None,
+                     campos=None, incluir_total=False):
+        """Lista una página de buses ordenada por (created_at, id).
+
+        Pide una fila de más para saber si existe una página siguiente.
+        Devuelve (filas, total); total es None si no se pidió.
+        """
+        select = construir_select(campos, self.COLUMNAS, con_imagen_url=True)
+        query = self.cliente.table("buses").select(select, count="exact" if incluir_total else None)
+        if tipo:
+            query = query.eq("tipo", tipo)
+        if esta_activo is not None:
+            query = query.eq("esta_activo", esta_activo)
+        if campos is not None and "imagenes" not in campos and "imagen_url" in campos:
+            query = query.limit(1, foreign_table="imagenes")
+        query = aplicar_cursor(query, cursor).limit(limite + 1)
+        respuesta = await query.execute()
+        return respuesta.data, respuesta.count
+
+    async def obtener(self, bus_id):
+        """Obtiene un bus con sus imágenes o None si no existe"""
+        respuesta = await (
+            self.cliente.table("buses")
+            .select("*, imagenes(*)")
+            .eq("id", bus_id)
+            .execute()
+        )
+        return respuesta.data[0] if respuesta.data else None
+
+    async def existe(self, bus_id):
+        respuesta = await (
+            self.cliente.table("buses")
+            .select("id")
+            .eq("id", bus_id)
+            .execute()
+        )
+        return bool(respuesta.data)
+
+    async def todos(self, columnas="id, nombre, tipo, esta_activo"):
+        """Todos los buses (solo `columnas`), leídos por lotes"""
+        return await leer_por_lotes(self.cliente, "buses", columnas)
+
+    async def crear(self, datos):
+        """Inserta un bus y devuelve la fila creada (con el id asignado por la BD)"""
+        respuesta = await self.cliente.table("buses").insert(datos).execute()
+        return respuesta.data[0] if respuesta.data else None
+
+    async def eliminar(self, bus_id):
+        """Elimina un bus y devuelve las filas borradas"""
+        respuesta = await self.cliente.table("buses").delete().eq("id", bus_id).execute()
+        return respuesta.data
+
+
+class RepositorioEstaciones:
+    COLUMNAS = ["id", "nombre", "localidad", "esta_activo", "created_at", "updated_at"]
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    async def listar(self, localidad=None, esta_activo=None, limite=50, cursor=None,
+                     campos=None, incluir_total=False):
+        """Lista una página de estaciones ordenada por (created_at, id)"""
+        select = construir_select(campos, self.COLUMNAS, con_imagen_url=True)
+        query = self.cliente.table("estaciones").select(select, count="exact" if incluir_total else None)
+        if localidad:
+            query = query.eq("localidad", localidad)
+        if esta_activo is not None:
+            query = query.eq("esta_activo", esta_activo)
+        if campos is not None and "imagenes" not in campos and "imagen_url" in campos:
+            query = query.limit(1, foreign_table="imagenes")
+        query = aplicar_cursor(query, cursor).limit(limite + 1)
+        respuesta = await query.execute()
+        return respuesta.data, respuesta.count
+
+    async def obtener(self, estacion_id):
+        """Obtiene una estación con sus imágenes y buses o None si no existe"""
+        respuesta = await (
+            self.cliente.table("estaciones")
+            .select(f"*, imagenes(*), buses!bus_estacion({', '.join(COLUMNAS_RELACION['buses'])})")
+            .eq("id", estacion_id)
+            .execute()
+        )
+        return respuesta.data[0] if respuesta.data else None
+
+    async def todas(self, columnas="id, nombre, localidad, esta_activo"):
+        """Todas las estaciones (solo `columnas`), leídas por lotes"""
+        return await leer_por_lotes(self.cliente, "estaciones", columnas)
+
+    async def crear(self, datos):
+        respuesta = await self.cliente.table("estaciones").insert(datos).execute()
+        return respuesta.data[0] if respuesta.data else None
+
+    async def actualizar(self, estacion_id, datos):
+        """Actualiza una estación y devuelve la fila resultante o None si no existe"""
+        respuesta = await (
+            self.cliente.table("estaciones")
+            .update(datos)
+            .eq("id", estacion_id)
+            .execute()
+        )
+        return respuesta.data[0] if respuesta.data else None
+
+    async def eliminar(self, estacion_id):
+        respuesta = await self.cliente.table("estaciones").delete().eq("id", estacion_id).execute()
+        return respuesta.data
+
+
+class RepositorioImagenes:
+    """Filas de la tabla `imagenes` y los archivos que referencian en storage"""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    async def crear(self, datos):
+        respuesta = await self.cliente.table("imagenes").insert(datos).execute()
+        return respuesta.data[0] if respuesta.data else None
+
+    async def crear_varias(self, filas):
+        """Inserta varias filas en una sola petición"""
+        if not filas:
+            return []
+        respuesta = await self.cliente.table("imagenes").insert(filas).execute()
+        return respuesta.data
+
+    async def listar_por_bus(self, bus_id, columnas="*"):
+        respuesta = await (
+            self.cliente.table("imagenes")
+            .select(columnas)
+            .eq("bus_id", bus_id)
+            .execute()
+        )
+        return respuesta.data
+
+    async def listar_por_estacion(self, estacion_id, columnas="*"):
+        respuesta = await (
+            self.cliente.table("imagenes")
+            .select(columnas)
+            .eq("estacion_id", estacion_id)
+            .execute()
+        )
+        return respuesta.data
+
+    async def eliminar_de_estacion(self, imagen_id, estacion_id):
+        """Elimina una imagen de la estación y devuelve la fila borrada o None"""
+        respuesta = await (
+            self.cliente.table("imagenes")
+            .delete()
+            .eq("id", imagen_id)
+            .eq("estacion_id", estacion_id)
+            .execute()
+        )
+        return respuesta.data[0] if respuesta.data else None
+
+    async def eliminar_por_bus(self, bus_id):
+        """Elimina las imágenes del bus y devuelve las filas borradas"""
+        respuesta = await self.cliente.table("imagenes").delete().eq("bus_id", bus_id).execute()
+        return respuesta.data
+
+    async def eliminar_por_estacion(self, estacion_id):
+        """Elimina las imágenes de la estación y devuelve las filas borradas"""
+        respuesta = await self.cliente.table("imagenes").delete().eq("estacion_id", estacion_id).execute()
+        return respuesta.data
+
+    async def _en_bucket(self, bucket_name, operacion):
+        """Ejecuta una subida en un bucket confirmado por `registro_buckets`.
+
+        Si storage responde que el bucket no existe, se vuelve a comprobar
+        (creándolo si hace falta) y se reintenta una vez.
+        """
+        await registro_buckets.asegurar(self.cliente, bucket_name)
+        try:
+            return await operacion()
+        except Exception as e:
+            if not es_bucket_no_encontrado(e):
+                raise
+            await registro_buckets.refrescar(self.cliente, bucket_name)
+            return await operacion()
+
+    async def subir_archivo(self, bucket_name, file_path, contenido, content_type=None):
+        """Sube un archivo al bucket y devuelve su URL pública"""
+        bucket = self.cliente.storage.from_(bucket_name)
+
+        async def subir():
+            opciones = {"content-type": content_type} if content_type else None
+            await bucket.upload(file_path, contenido, opciones)
+
+        await self._en_bucket(bucket_name, subir)
+        return await bucket.get_public_url(file_path)
+
+    async def subir_en_bloques(self, bucket_name, file_path, imagen):
+        """Sube una `ImagenSubida` en streaming y devuelve su URL pública"""
+        bucket = self.cliente.storage.from_(bucket_name)
+
+        async def subir():
+            await bucket._request(
+                "POST",
+                f"/object/{bucket_name}/{file_path}",
+                headers={
+                    "content-type": imagen.content_type,
+                    "cache-control": "max-age=3600",
+                    "x-upsert": "false",
+                },
+                content=imagen.bloques(),
+            )
+
+        await self._en_bucket(bucket_name, subir)
+        return await bucket.get_public_url(file_path)
+
+    async def eliminar_archivos(self, bucket_name, paths, tamano_lote=STORAGE_LOTE_BORRADO):
+        """Elimina objetos de storage en lotes de `tamano_lote` rutas por llamada"""
+        paths = list(paths)
+        eliminados = []
+        bucket = self.cliente.storage.from_(bucket_name)
+        for inicio in range(0, len(paths), max(1, tamano_lote)):
+            eliminados += await bucket.remove(paths[inicio:inicio + tamano_lote]) or []
+        return eliminados
+
+    async def limpiar_archivos(self, bucket_name, filas):
+        """Borra de storage los archivos (y variantes) de filas de `imagenes` ya eliminadas.
+
+        No lanza excepciones: puede ejecutarse como tarea en segundo plano.
+        """
+        paths = rutas_de_imagenes(filas, bucket_name)
+        if not paths:
+            return 0
+        try:
+            eliminados = await self.eliminar_archivos(bucket_name, paths)
+            logger.debug("Eliminados %s de %s archivos de %s", len(eliminados), len(paths), bucket_name)
+            return len(eliminados)
+        except Exception as e:
+            logger.warning("Error eliminando archivos de %s: %s", bucket_name, e)
+            return 0
+
+
+class RepositorioBusEstacion:
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    async def asociar(self, bus_id, estacion_id):
+        datos = {"bus_id": bus_id, "estacion_id": estacion_id}
+        respuesta = await self.cliente.table("bus_estacion").insert(datos).execute()
+        return respuesta.data
+
+    async def desasociar(self, bus_id, estacion_id):
+        respuesta = await (
+            self.cliente.table("bus_estacion")
+            .delete()
+            .eq("bus_id", bus_id)
+            .eq("estacion_id", estacion_id)
+            .execute()
+        )
+        return respuesta.data
+
+    async def eliminar_por_bus(self, bus_id):
+        await self.cliente.table("bus_estacion").delete().eq("bus_id", bus_id).execute()
+
+    async def eliminar_por_estacion(self, estacion_id):
+        await self.cliente.table("bus_estacion").delete().eq("estacion_id", estacion_id).execute()
+
+    async def estaciones_de_bus(self, bus_id):
+        """Filas (id, estacion_id) de las asociaciones actuales del bus"""
+        respuesta = await (
+            self.cliente.table("bus_estacion")
+            .select("id, estacion_id")
+            .eq("bus_id", bus_id)
+            .execute()
+        )
+        return respuesta.data
+
+    async def existentes(self, bus_ids, estacion_ids):
+        """Asociaciones con bus en `bus_ids` y estación en `estacion_ids` (un solo select)"""
+        if not bus_ids or not estacion_ids:
+            return []
+        respuesta = await (
+            self.cliente.table("bus_estacion")
+            .select("id, bus_id, estacion_id")
+            .in_("bus_id", sorted(bus_ids))
+            .in_("estacion_id", sorted(estacion_ids))
+            .execute()
+        )
+        return respuesta.data
+
+    async def asociar_varias(self, pares):
+        """Inserta pares (bus_id, estacion_id) en una sola petición.
+
+        Con la restricción única (bus_id, estacion_id) los duplicados se
+        ignoran, así que repetir la llamada no falla ni duplica filas.
+        """
+        if not pares:
+            return []
+        filas = [{"bus_id": bus_id, "estacion_id": estacion_id} for bus_id, estacion_id in pares]
+        respuesta = await (
+            self.cliente.table("bus_estacion")
+            .upsert(filas, on_conflict="bus_id,estacion_id", ignore_duplicates=True)
+            .execute()
+        )
+        return respuesta.data
+
+    async def eliminar_ids(self, ids, tamano_lote=500):
+        """Elimina asociaciones por id con un delete por cada `tamano_lote` ids"""
+        ids = list(ids)
+        eliminadas = []
+        for inicio in range(0, len(ids), tamano_lote):
+            respuesta = await (
+                self.cliente.table("bus_estacion")
+                .delete()
+                .in_("id", ids[inicio:inicio + tamano_lote])
+                .execute()
+            )
+            eliminadas += respuesta.data
+        return eliminadas
+
+    async def todos_los_pares(self, tamano_lote=1000):
+        """Todos los pares (bus_id, estacion_id), leídos por lotes ordenados por id"""
+        filas = await leer_por_lotes(self.cliente, "bus_estacion", "id, bus_id, estacion_id", tamano_lote)
+        return [(f["bus_id"], f["estacion_id"]) for f in filas]
+
+    async def buses_de_estacion(self, estacion_id, columnas, limite=50, despues_de=None,
+                                esta_activo=None):
+        """Página de buses de una estación ordenada por bus_id.
+
+        Se consulta bus_estacion filtrando por estacion_id (índice
+        idx_bus_estacion_estacion_id) y se embebe solo `columnas` de cada bus,
+        así el costo depende de los buses de la estación y no del tamaño de
+        la tabla. `despues_de` es el último bus_id de la página anterior.
+        """
+        query = (
+            self.cliente.table("bus_estacion")
+            .select(f"buses!inner({', '.join(columnas)})")
+            .eq("estacion_id", estacion_id)
+        )
+        if esta_activo is not None:
+            query = query.eq("buses.esta_activo", esta_activo)
+        if despues_de is not None:
+            query = query.gt("bus_id", despues_de)
+        respuesta = await query.order("bus_id").limit(limite + 1).execute()
+        return [f["buses"] for f in respuesta.data]
+
+    async def estaciones_del_bus(self, bus_id, columnas, limite=50, despues_de=None,
+                                 esta_activo=None):
+        """Página de estaciones de un bus ordenada por estacion_id.
+
+        Usa la restricción única (bus_id, estacion_id), que ya entrega las
+        filas en el orden de la página sin ordenar en memoria.
+        """
+        query = (
+            self.cliente.table("bus_estacion")
+            .select(f"estaciones!inner({', '.join(columnas)})")
+            .eq("bus_id", bus_id)
+        )
+        if esta_activo is not None:
+            query = query.eq("estaciones.esta_activo", esta_activo)
+        if despues_de is not None:
+            query = query.gt("estacion_id", despues_de)
+        respuesta = await query.order("estacion_id").limit(limite + 1).execute()
+        return [f["estaciones"] for f in respuesta.data]
+
+
+class RepositorioRutas:
+    COLUMNAS = ["id", "nombre", "descripcion", "esta_activa", "created_at", "updated_at"]
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    async def listar(self):
+        respuesta = await self.cliente.table("rutas").select("*").order("id").execute()
+        return respuesta.data
+
+    async def obtener(self, ruta_id):
+        """Obtiene una ruta con sus paradas (ordenadas) y buses o None si no existe"""
+        respuesta = await (
+            self.cliente.table("rutas")
+            .select("*, ruta_paradas(estacion_id, orden), bus_ruta(bus_id)")
+            .eq("id", ruta_id)
+            .order("orden", foreign_table="ruta_paradas")
+            .execute()
+        )
+        return respuesta.data[0] if respuesta.data else None
+
+    async def cargar_todo(self, tamano_lote=1000):
+        """Todas las rutas con sus paradas y buses, por lotes para no chocar con max-rows"""
+        return await leer_por_lotes(
+            self.cliente, "rutas",
+            "id, nombre, esta_activa, ruta_paradas(estacion_id, orden), bus_ruta(bus_id)",
+            tamano_lote
+        )
+
+    async def crear(self, datos):
+        respuesta = await self.cliente.table("rutas").insert(datos).execute()
+        return respuesta.data[0] if respuesta.data else None
+
+    async def actualizar(self, ruta_id, datos):
+        respuesta = await self.cliente.table("rutas").update(datos).eq("id", ruta_id).execute()
+        return respuesta.data[0] if respuesta.data else None
+
+    async def eliminar(self, ruta_id):
+        """Elimina la ruta; paradas y asignaciones se borran en cascada"""
+        respuesta = await self.cliente.table("rutas").delete().eq("id", ruta_id).execute()
+        return respuesta.data
+
+    async def crear_completa(self, datos, paradas, buses):
+        """Crea la ruta con sus paradas y buses en una transacción (función crear_ruta).
+
+        Si la función aún no existe se escribe paso a paso y, si falla una
+        parada o un bus, se borra la ruta recién creada (lo demás cae en cascada).
+        """
+        try:
+            respuesta = await self.cliente.rpc(
+                "crear_ruta", {"p_ruta": datos, "p_paradas": paradas, "p_buses": buses}
+            ).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except APIError as error:
+            if error.code not in FUNCION_NO_ENCONTRADA:
+                raise
+        logger.warning("Función crear_ruta no encontrada, creando la ruta paso a paso")
+        ruta = await self.crear(datos)
+        try:
+            await self.reemplazar_paradas(ruta["id"], paradas)
+            await self.reemplazar_buses(ruta["id"], buses)
+        except Exception:
+            logger.warning("Error al crear las paradas o buses de la ruta %s, se elimina", ruta["id"])
+            await self.eliminar(ruta["id"])
+            raise
+        return ruta
+
+    async def actualizar_completa(self, ruta_id, cambios, paradas=None, buses=None):
+        """Actualiza la ruta y reemplaza paradas y buses (los que no sean None) en una transacción.
+
+        Si la función actualizar_ruta aún no existe se escribe paso a paso y,
+        si algo falla, se restauran los datos, paradas y buses anteriores.
+        Devuelve None si la ruta no existe.
+        """
+        try:
+            respuesta = await self.cliente.rpc("actualizar_ruta", {
+                "p_ruta_id": ruta_id, "p_cambios": cambios, "p_paradas": paradas, "p_buses": buses
+            }).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except APIError as error:
+            if error.code not in FUNCION_NO_ENCONTRADA:
+                raise
+        logger.warning("Función actualizar_ruta no encontrada, actualizando la ruta paso a paso")
+        anterior = await self.obtener(ruta_id)
+        if anterior is None:
+            return None
+        try:
+            ruta = await self.actualizar(ruta_id, cambios)
+            if paradas is not None:
+                await self.reemplazar_paradas(ruta_id, paradas)
+            if buses is not None:
+                await self.reemplazar_buses(ruta_id, buses)
+        except Exception:
+            await self._restaurar(anterior, paradas is not None, buses is not None)
+            raise
+        return ruta
+
+    async def _restaurar(self, anterior, paradas, buses):
+        """Deja la ruta como estaba antes de una actualización fallida"""
+        ruta_id = anterior["id"]
+        logger.warning("Error al actualizar la ruta %s, restaurando los datos anteriores", ruta_id)
+        try:
+            await self.actualizar(ruta_id, {
+                campo: anterior.get(campo) for campo in ("nombre", "descripcion", "esta_activa", "updated_at")
+            })
+            if paradas:
+                previas = sorted(anterior.get("ruta_paradas") or [], key=lambda p: p["orden"])
+                await self.reemplazar_paradas(ruta_id, [p["estacion_id"] for p in previas])
+            if buses:
+                await self.reemplazar_buses(ruta_id, [b["bus_id"] for b in anterior.get("bus_ruta") or []])
+        except Exception:
+            logger.exception("No se pudo restaurar la ruta %s", ruta_id)
+
+    async def reemplazar_paradas(self, ruta_id, estacion_ids):
+        """Sustituye la secuencia de paradas de la ruta (orden = posición en la lista)"""
+        await self.cliente.table("ruta_paradas").delete().eq("ruta_id", ruta_id).execute()
+        if not estacion_ids:
+            return []
+        filas = [
+            {"ruta_id": ruta_id, "estacion_id": estacion_id, "orden": orden}
+            for orden, estacion_id in enumerate(estacion_ids)
+        ]
+        respuesta = await self.cliente.table("ruta_paradas").insert(filas).execute()
+        return respuesta.data
+
+    async def reemplazar_buses(self, ruta_id, bus_ids):
+        """Sustituye los buses asignados a la ruta"""
+        await self.cliente.table("bus_ruta").delete().eq("ruta_id", ruta_id).execute()
+        if not bus_ids:
+            return []
+        filas = [{"ruta_id": ruta_id, "bus_id": bus_id} for bus_id in bus_ids]
+        respuesta = await self.cliente.table("bus_ruta").insert(filas).execute()
+        return respuesta.data
+
+
+class RepositorioFacetas:
+    # entidad -> columna agrupada
+    CAMPOS = {"buses": "tipo", "estaciones": "localidad"}
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    async def listar(self, entidad):
+        """Filas (valor, activos, inactivos) de la tabla facetas para la entidad.
+
+        Si la migración migrations/facetas.sql aún no se aplicó, se calculan
+        leyendo la columna de toda la tabla (O(filas)).
+        """
+        try:
+            respuesta = await (
+                self.cliente.table("facetas")
+                .select("valor, activos, inactivos")
+                .eq("entidad", entidad)
+                .eq("campo", self.CAMPOS[entidad])
+                .execute()
+            )
+            return respuesta.data
+        except APIError as error:
+            if error.code not in ("42P01", "PGRST205"):
+                raise
+            logger.warning("Tabla facetas no encontrada, calculando desde %s", entidad)
+            return await self._calcular(entidad)
+
+    async def _calcular(self, entidad):
+        """Cuenta por lotes (keyset), así el límite de filas de PostgREST no recorta los conteos"""
+        campo = self.CAMPOS[entidad]
+        conteos = {}
+        async for lote in iterar_por_lotes(self.cliente, entidad, f"id, {campo}, esta_activo"):
+            for fila in lote:
+                if fila[campo] is None:
+                    continue
+                conteo = conteos.setdefault(fila[campo], {"valor": fila[campo], "activos": 0, "inactivos": 0})
+                conteo["activos" if fila["esta_activo"] is not False else "inactivos"] += 1
+        return list(conteos.values())
+
+
+class Repositorios:
+    """Agrupa los repositorios que comparten un mismo cliente asíncrono"""
+
+    def __init__(self, cliente):
+        self.buses = RepositorioBuses(cliente)
+        self.estaciones = RepositorioEstaciones(cliente)
+        self.imagenes = RepositorioImagenes(cliente)
+        self.bus_estacion = RepositorioBusEstacion(cliente)
+        self.rutas = RepositorioRutas(cliente)
+        self.facetas = RepositorioFacetas(cliente)
+
+
+def get_repos(cliente=Depends(get_async_db)):
+    return Repositorios(cliente)
@@ -0,0 +1,203 @@
+"""Serialización JSON rápida y compresión negociada de las respuestas.
+
+`RespuestaJSON` serializa con orjson si está instalado (si no, con el
+módulo json sin espacios). Los endpoints de listados la devuelven
+directamente con los dicts que llegan de Supabase, así FastAPI no hace la
+pasada de `jsonable_encoder` sobre cada fila e imagen; lo que no sea JSON
+nativo (fechas, UUID, modelos) se convierte con `jsonable_encoder` solo
+para ese valor.
+
+`MiddlewareCompresion` comprime con brotli (si está instalado) o gzip según
+`Accept-Encoding`, solo tipos de texto y cuerpos de al menos
+COMPRESION_MINIMO bytes. Las respuestas en streaming se comprimen bloque a
+bloque. Al comprimir, un ETag fuerte pasa a débil (W/), como hace nginx,
+porque el cuerpo enviado ya no es byte a byte el que se usó para calcularlo.
+"""
+import json
+import os
+import zlib
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESION_MINIMO = int(os.getenv("COMPRESION_MINIMO", "1024"))
+COMPRESION_GZIP_NIVEL = int(os.getenv("COMPRESION_GZIP_NIVEL", "6"))
+COMPRESION_BROTLI_CALIDAD = int(os.getenv("COMPRESION_BROTLI_CALIDAD", "4"))
+# Algoritmos en orden de preferencia del servidor (br se ignora sin el paquete brotli)
+COMPRESION_ALGORITMOS = [
+    a.strip() for a in os.getenv("COMPRESION_ALGORITMOS", "br,gzip").split(",")
+    if a.strip() == "gzip" or (a.strip() == "br" and brotli is not None)
+]
+
+TIPOS_COMPRIMIBLES = (
+    b"application/json", b"application/x-ndjson", b"text/", b"application/javascript", b"image/svg+xml",
+)
+
+
+def _por_defecto(valor):
+    return jsonable_encoder(valor)
+
+
+def serializar_json(contenido):
+    if orjson is not None:
+        return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_por_defecto
+    ).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse que serializa con orjson (o json compacto) sin pasar por jsonable_encoder"""
+
+    def render(self, content):
+        return serializar_json(content)
+
+
+# --- Compresión ---
+
+def negociar_codificacion(accept_encoding, algoritmos=None):
+    """Elige la codificación a usar según Accept-Encoding (q-values incluidos) o None"""
+    algoritmos = COMPRESION_ALGORITMOS if algoritmos is None else algoritmos
+    if not accept_encoding or not algoritmos:
+        return None
+    calidades = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            calidades[nombre.strip()] = calidad
+    comodin = calidades.get("*", 0.0)
+    candidatos = [(calidades.get(a, comodin), -i, a) for i, a in enumerate(algoritmos)]
+    calidad, _, elegido = max(candidatos)
+    return elegido if calidad > 0 else None
+
+
+class Compresor:
+    def __init__(self, codificacion):
+        self.codificacion = codificacion
+        if codificacion == "br":
+            self._br = brotli.Compressor(quality=COMPRESION_BROTLI_CALIDAD)
+        else:
+            self._zlib = zlib.compressobj(COMPRESION_GZIP_NIVEL, zlib.DEFLATED, 31)
+
+    def bloque(self, datos):
+        """Comprime un bloque y vacía el buffer para que el cliente lo reciba ya"""
+        if self.codificacion == "br":
+            return self._br.process(datos) + self._br.flush()
+        return self._zlib.compress(datos) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self, datos=b""):
+        if self.codificacion == "br":
+            return self._br.process(datos) + self._br.finish()
+        return self._zlib.compress(datos) + self._zlib.flush()
+
+
+def _cabecera(cabeceras, nombre):
+    for n, v in cabeceras:
+        if n.lower() == nombre:
+            return v
+    return None
+
+
+def _agregar_vary(cabeceras):
+    vary = _cabecera(cabeceras, b"vary")
+    if vary is None:
+        return [*cabeceras, (b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return cabeceras
+    return [(n, v + b", Accept-Encoding" if n.lower() == b"vary" else v) for n, v in cabeceras]
+
+
+def _cabeceras_comprimidas(cabeceras, codificacion, longitud=None):
+    resultado = []
+    for n, v in cabeceras:
+        nombre = n.lower()
+        if nombre == b"content-length":
+            continue
+        if nombre == b"etag" and not v.startswith(b"W/"):
+            v = b"W/" + v
+        resultado.append((n, v))
+    resultado.append((b"content-encoding", codificacion.encode()))
+    if longitud is not None:
+        resultado.append((b"content-length", str(longitud).encode()))
+    return _agregar_vary(resultado)
+
+
+class MiddlewareCompresion:
+    """Middleware ASGI con compresión brotli/gzip negociada y tamaño mínimo"""
+
+    def __init__(self, app, minimo=COMPRESION_MINIMO):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = _cabecera(scope["headers"], b"accept-encoding")
+        codificacion = negociar_codificacion(accept_encoding.decode("latin-1") if accept_encoding else None)
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compresor = None
+        pasar = False
+
+        async def enviar(mensaje):
+            nonlocal inicio, compresor, pasar
+            if mensaje["type"] == "http.response.start":
+                cabeceras = list(mensaje.get("headers", []))
+                tipo = _cabecera(cabeceras, b"content-type") or b""
+                comprimible = tipo.lower().startswith(TIPOS_COMPRIMIBLES)
+                if (mensaje["status"] < 200 or mensaje["status"] in (204, 304)
+                        or _cabecera(cabeceras, b"content-encoding") is not None or not comprimible):
+                    pasar = True
+                    if comprimible:
+                        mensaje = {**mensaje, "headers": _agregar_vary(cabeceras)}
+                    await send(mensaje)
+                    return
+                inicio = {**mensaje, "headers": cabeceras}
+                return
+            if mensaje["type"] != "http.response.body" or pasar:
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            mas = mensaje.get("more_body", False)
+            if compresor is None:
+                if not mas:
+                    # Cuerpo completo en un solo mensaje
+                    if len(cuerpo) < self.minimo:
+                        await send({**inicio, "headers": _agregar_vary(inicio["headers"])})
+                        await send(mensaje)
+                        return
+                    comprimido = Compresor(codificacion).terminar(cuerpo)
+                    await send({**inicio, "headers": _cabeceras_comprimidas(
+                        inicio["headers"], codificacion, len(comprimido))})
+                    await send({"type": "http.response.body", "body": comprimido})
+                    return
+                # Streaming: se comprime cada bloque a medida que llega
+                compresor = Compresor(codificacion)
+                await send({**inicio, "headers": _cabeceras_comprimidas(inicio["headers"], codificacion)})
+
+            datos = compresor.bloque(cuerpo) if mas else compresor.terminar(cuerpo)
+            if datos or not mas:
+                await send({"type": "http.response.body", "body": datos, "more_body": mas})
+
+        await self.app(scope, receive, enviar)
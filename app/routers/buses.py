@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, File, UploadFile, Form
-from ..database import get_db
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, File, UploadFile, Form
+from ..database import get_async_db
+from ..repositorios import COLUMNAS_RELACION, RepositorioEstaciones, get_repos
+from ..plantillas import paginas
+from ..cache import cache_buses, cache_estaciones
+from ..subidas import ArchivoDemasiadoGrande, preparar_imagen
+from ..almacenamiento import STORAGE_BORRADO_EN_SEGUNDO_PLANO
+from ..indice_rutas import indice_rutas
+from ..grafo import grafo
+from ..busqueda import indice_busqueda
+from ..respuestas import RespuestaJSON
+from ..derivadas import PREFERENCIA_VARIANTE, subir_derivadas, url_preferida
+from ..paginacion import (
+    CursorInvalido, armar_pagina, decodificar_cursor_id, normalizar_limite, parsear_campos,
+    LIMITE_POR_DEFECTO
+)
+from postgrest.exceptions import APIError
 from datetime import datetime
-from fastapi.templating import Jinja2Templates
 from typing import List, Optional
 from pydantic import BaseModel
+import asyncio
+import logging
 import uuid
-import os
-import shutil
-import json
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
+logger = logging.getLogger(__name__)
 
 @router.post("/api/buses")
 async def crear_bus(
@@ -18,84 +31,84 @@ async def crear_bus(
     tipo: str = Form(...),
     esta_activo: str = Form(...),
     imagen: UploadFile = File(None),
-    supabase=Depends(get_db)
+    repos=Depends(get_repos)
 ):
     """Crea un nuevo bus utilizando la tabla imagenes para las fotos"""
     try:
-        # Generar ID único para el bus
-        bus_id = str(uuid.uuid4())
+        # Validar la imagen (tamaño y tipo) antes de crear nada
+        imagen_subida = None
+        if imagen and imagen.filename:
+            imagen_subida = await preparar_imagen(imagen)
+
         # Convertir string a booleano
         esta_activo_bool = esta_activo.lower() == "true"
 
-        # Datos básicos del bus (sin imagen_url)
+        # Datos básicos del bus (el id lo asigna la base de datos)
         bus_data = {
-            "id": bus_id,
             "nombre": nombre,
             "tipo": tipo,
             "esta_activo": esta_activo_bool,
             "created_at": datetime.utcnow().isoformat()
         }
 
-        print(f"Creando bus con datos: {bus_data}")
+        logger.debug("Creando bus: %s", bus_data)
 
         # Insertar el bus
-        result, error = supabase.table("buses").insert(bus_data).execute()
-
-        if error:
-            print(f"Error al insertar bus: {error}")
+        try:
+            bus = await repos.buses.crear(bus_data)
+        except APIError as error:
+            logger.warning("Error al insertar bus: %s", error)
             raise HTTPException(status_code=400, detail=str(error))
 
+        bus_id = bus["id"]
+        cache_buses.invalidar("lista")
+        await indice_busqueda.actualizar("buses", bus)
+
         # Si el bus se creó correctamente y hay imagen, procesarla
         imagen_url = None
-        if imagen:
+        if imagen_subida:
             try:
-                print(f"Procesando imagen: {imagen.filename}")
-                # Leer contenido de la imagen
-                contents = await imagen.read()
-                print(f"Tamaño de la imagen: {len(contents)} bytes")
+                logger.debug("Procesando imagen: %s (%s)", imagen.filename, imagen_subida.content_type)
 
                 bucket_name = "buses-imagenes"
 
-                # Intentar obtener o crear el bucket
-                try:
-                    supabase.storage.get_bucket(bucket_name)
-                    print(f"Bucket {bucket_name} existe")
-                except Exception as e:
-                    print(f"Bucket {bucket_name} no existe: {str(e)}")
-                    try:
-                        supabase.storage.create_bucket(bucket_name, options={"public": True})
-                        print(f"Bucket {bucket_name} creado exitosamente")
-                    except Exception as e:
-                        print(f"Error al crear bucket {bucket_name}: {str(e)}")
-
-                # Generar nombre de archivo único
-                extension = os.path.splitext(imagen.filename)[1] if '.' in imagen.filename else '.jpg'
-                file_name = f"{uuid.uuid4()}{extension}"
+                # Generar nombre de archivo único con la extensión del tipo detectado
+                file_name = f"{uuid.uuid4()}{imagen_subida.extension}"
                 file_path = f"{bus_id}/{file_name}"
 
-                print(f"Subiendo archivo a {bucket_name}/{file_path}")
+                logger.debug("Subiendo archivo a %s/%s", bucket_name, file_path)
 
-                # Subir imagen al bucket
-                supabase.storage.from_(bucket_name).upload(file_path, contents)
-                imagen_url = supabase.storage.from_(bucket_name).get_public_url(file_path)
-                print(f"URL de imagen generada: {imagen_url}")
+                # Subir imagen al bucket por bloques
+                imagen_url = await repos.imagenes.subir_en_bloques(bucket_name, file_path, imagen_subida)
+                logger.debug("URL de imagen generada: %s (%s bytes)", imagen_url, imagen_subida.bytes_enviados)
+
+                # Generar miniatura y WebP junto al original
+                variantes = await subir_derivadas(repos.imagenes, bucket_name, file_path, imagen_subida)
 
                 # Crear registro en la tabla imagenes
                 imagen_data = {
                     "url": imagen_url,
+                    **variantes,
                     "bus_id": bus_id,
                     "created_at": datetime.utcnow().isoformat()
                 }
 
                 # Insertar en tabla imagenes
-                imagen_result, imagen_error = supabase.table("imagenes").insert(imagen_data).execute()
-
-                if imagen_error:
-                    print(f"Error al insertar en tabla imagenes: {imagen_error}")
+                try:
+                    await repos.imagenes.crear(imagen_data)
+                    cache_buses.invalidar("lista")
+                except APIError as imagen_error:
+                    logger.warning("Error al insertar en tabla imagenes: %s", imagen_error)
                     # No interrumpir la respuesta, el bus ya se creó
 
+            except ArchivoDemasiadoGrande as e:
+                # El tamaño no se conocía de antemano: no dejar el bus creado sin la imagen
+                await repos.buses.eliminar(bus_id)
+                cache_buses.invalidar("lista")
+                await indice_busqueda.eliminar("buses", bus_id)
+                raise HTTPException(status_code=413, detail=str(e))
             except Exception as img_error:
-                print(f"Error procesando imagen: {img_error}")
+                logger.warning("Error procesando imagen: %s", img_error)
                 # Continuar sin imagen
 
         # Respuesta con o sin imagen
@@ -104,118 +117,121 @@ async def crear_bus(
         else:
             return {"message": "Bus creado correctamente", "bus_id": bus_id}
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error general al crear bus: {str(e)}")
+        logger.exception("Error general al crear bus")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/buses", include_in_schema=False)
-async def buses_page(request: Request):
-    return templates.TemplateResponse(
-        "buses.html",
-        {"request": request}
-    )
-
 @router.get("/buses/create", include_in_schema=False)
 async def buses_create_page(request: Request):
-    return templates.TemplateResponse(
-        "buses_create.html",
-        {"request": request}
-    )
+    return paginas.respuesta(request, "buses_create.html")
 
 @router.get("/buses/crear", include_in_schema=False)
 async def buses_crear_page(request: Request):
-    return templates.TemplateResponse(
-        "buses_create.html",
-        {"request": request}
-    )
+    return paginas.respuesta(request, "buses_create.html")
 
 @router.get("/buses/edit", include_in_schema=False)
 async def buses_edit_page(request: Request):
-    return templates.TemplateResponse(
-        "buses_edit.html",
-        {"request": request}
-    )
+    return paginas.respuesta(request, "buses_edit.html")
 
 @router.get("/buses/editar", include_in_schema=False)
 async def buses_editar_page(request: Request):
-    return templates.TemplateResponse(
-        "buses_edit.html",
-        {"request": request}
-    )
+    return paginas.respuesta(request, "buses_edit.html")
 
 @router.get("/buses/delete", include_in_schema=False)
 async def buses_delete_page(request: Request):
-    return templates.TemplateResponse(
-        "buses_delete.html",
-        {"request": request}
-    )
+    return paginas.respuesta(request, "buses_delete.html")
 
 @router.get("/buses/eliminar", include_in_schema=False)
 async def buses_eliminar_page(request: Request):
-    return templates.TemplateResponse(
-        "buses_delete.html",
-        {"request": request}
-    )
+    return paginas.respuesta(request, "buses_delete.html")
+
+CAMPOS_BUS = ["id", "nombre", "tipo", "esta_activo", "created_at", "updated_at", "imagenes", "imagen_url"]
+
 
 @router.get("/api/buses")
 async def listar_buses(
         tipo: Optional[str] = None,
         esta_activo: Optional[bool] = None,
-        supabase=Depends(get_db)
+        limit: int = LIMITE_POR_DEFECTO,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        incluir_total: bool = False,
+        variante: str = "miniatura",
+        repos=Depends(get_repos)
 ):
-    # Seleccionar buses con sus imágenes asociadas
-    query = supabase.table("buses").select("*, imagenes(*)").order("created_at")
+    """Lista buses paginados por cursor.
 
-    if tipo:
-        query = query.eq("tipo", tipo)
-    if esta_activo is not None:
-        query = query.eq("esta_activo", esta_activo)
+    `fields` permite proyectar columnas (p. ej. `fields=id,nombre,imagen_url`)
+    para que los listados no descarguen el arreglo completo de imágenes.
+    `imagen_url` apunta a la variante más pequeña disponible salvo que se
+    pida otra con `variante` (miniatura, webp u original).
+    """
+    try:
+        campos = parsear_campos(fields, CAMPOS_BUS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    data, error = query.execute()
+    if variante not in PREFERENCIA_VARIANTE:
+        raise HTTPException(status_code=400, detail=f"Variante no válida: {variante}")
 
-    if error:
-        raise HTTPException(status_code=400, detail=str(error))
+    limite = normalizar_limite(limit)
 
-    # Procesar buses para añadir campo imagen_url basado en la primera imagen
-    buses = data[1]
-    for bus in buses:
+    async def cargar():
+        # Seleccionar buses con sus imágenes asociadas
         try:
-            # Si el bus tiene imágenes, usar la primera como imagen_url
-            if "imagenes" in bus and bus["imagenes"]:
-                bus["imagen_url"] = bus["imagenes"][0]["url"]
-            else:
-                bus["imagen_url"] = None
-        except Exception as e:
-            print(f"Error al procesar imágenes: {e}")
-            bus["imagen_url"] = None
+            buses, total = await repos.buses.listar(
+                tipo=tipo,
+                esta_activo=esta_activo,
+                limite=limite,
+                cursor=cursor,
+                campos=campos,
+                incluir_total=incluir_total
+            )
+        except CursorInvalido as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except APIError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+
+        # Procesar buses para añadir campo imagen_url basado en la primera imagen
+        quiere_imagen_url = campos is None or "imagen_url" in campos
+        quiere_imagenes = campos is None or "imagenes" in campos
+        for bus in buses:
+            if quiere_imagen_url:
+                try:
+                    # Si el bus tiene imágenes, usar la variante de la primera como imagen_url
+                    if "imagenes" in bus and bus["imagenes"]:
+                        bus["imagen_url"] = url_preferida(bus["imagenes"][0], variante)
+                    else:
+                        bus["imagen_url"] = None
+                except Exception as e:
+                    logger.warning("Error al procesar imágenes: %s", e)
+                    bus["imagen_url"] = None
+            if not quiere_imagenes:
+                bus.pop("imagenes", None)
 
-    return buses
+        return armar_pagina(buses, limite, total)
+
+    clave = ("lista", tipo, esta_activo, limite, cursor, fields, incluir_total, variante)
+    return RespuestaJSON(await cache_buses.obtener_o_cargar(clave, cargar))
 
 @router.post("/api/buses/{bus_id}/estaciones/{estacion_id}")
 async def asociar_estacion(
-                bus_id: int,
-        estacion_id: str,
-        supabase=Depends(get_db)
+        bus_id: int,
+        estacion_id: int,
+        repos=Depends(get_repos)
 ):
     # La tabla bus_estacion tiene: bus_id, estacion_id, created_at (automático)
-    data = {
-        "bus_id": bus_id,
-        "estacion_id": estacion_id
-    }
-
     try:
-        result, error = (
-            supabase.table("bus_estacion")
-            .insert(data)
-            .execute()
-        )
-
-        if error:
-            raise HTTPException(status_code=400, detail=str(error))
-
+        await repos.bus_estacion.asociar(bus_id, estacion_id)
+        cache_estaciones.invalidar("detalle", str(estacion_id))
+        await grafo.aplicar(agregar=[(bus_id, estacion_id)])
         return {"message": "Estación asociada correctamente"}
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
     except Exception as e:
-        print(f"Error al asociar estación: {str(e)}")
+        logger.exception("Error al asociar estación")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -223,139 +239,234 @@ async def asociar_estacion(
 async def desasociar_estacion(
         bus_id: int,
         estacion_id: int,
-        supabase=Depends(get_db)
+        repos=Depends(get_repos)
 ):
     # Eliminamos la relación entre el bus y la estación
     try:
-        result, error = (
-            supabase.table("bus_estacion")
-            .delete()
-            .eq("bus_id", bus_id)
-            .eq("estacion_id", estacion_id)
-            .execute()
-        )
-
-        if error:
-            raise HTTPException(status_code=400, detail=str(error))
-
+        await repos.bus_estacion.desasociar(bus_id, estacion_id)
+        cache_estaciones.invalidar("detalle", str(estacion_id))
+        await grafo.aplicar(quitar=[(bus_id, estacion_id)])
         return {"message": "Estación desasociada correctamente"}
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/api/buses/{bus_id}/estaciones")
+async def listar_estaciones_bus(
+        bus_id: int,
+        limit: int = LIMITE_POR_DEFECTO,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        esta_activo: Optional[bool] = None,
+        repos=Depends(get_repos)
+):
+    """Página de estaciones donde para el bus, ordenada por id de estación"""
+    limite = normalizar_limite(limit)
+    try:
+        campos = parsear_campos(fields, RepositorioEstaciones.COLUMNAS) or COLUMNAS_RELACION["estaciones"]
+        despues_de = decodificar_cursor_id(cursor) if cursor else None
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    columnas = ["id"] + [c for c in campos if c != "id"]
+
+    try:
+        estaciones = await repos.bus_estacion.estaciones_del_bus(
+            bus_id, columnas, limite, despues_de, esta_activo
+        )
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return armar_pagina(estaciones, limite, clave="id")
+
+
+class ParBusEstacion(BaseModel):
+    bus_id: int
+    estacion_id: int
+
+
+class LoteAsociaciones(BaseModel):
+    agregar: List[ParBusEstacion] = []
+    quitar: List[ParBusEstacion] = []
+
+
+class EstacionesDelBus(BaseModel):
+    estacion_ids: List[int]
+
+
+def _invalidar_estaciones(estacion_ids):
+    # El detalle de cada estación incluye sus buses
+    for estacion_id in estacion_ids:
+        cache_estaciones.invalidar("detalle", str(estacion_id))
+
+
+@router.post("/api/bus-estacion/lote")
+async def asociar_en_lote(
+        lote: LoteAsociaciones,
+        repos=Depends(get_repos)
+):
+    """Agrega y quita varias asociaciones bus-estación en una sola llamada.
+
+    Compara con las filas existentes y aplica un único insert y un único
+    delete. Devuelve cuántas se agregaron, eliminaron y quedaron igual.
+    """
+    agregar = {(p.bus_id, p.estacion_id) for p in lote.agregar}
+    quitar = {(p.bus_id, p.estacion_id) for p in lote.quitar}
+    if agregar & quitar:
+        raise HTTPException(status_code=400, detail="Un mismo par no puede agregarse y quitarse a la vez")
+
+    pares = agregar | quitar
+    try:
+        existentes = await repos.bus_estacion.existentes(
+            {b for b, _ in pares}, {e for _, e in pares}
+        )
+        actuales = {(f["bus_id"], f["estacion_id"]): f["id"] for f in existentes}
+
+        nuevos = agregar - actuales.keys()
+        a_eliminar = quitar & actuales.keys()
+        insertadas = await repos.bus_estacion.asociar_varias(sorted(nuevos))
+        eliminadas = await repos.bus_estacion.eliminar_ids(actuales[p] for p in sorted(a_eliminar))
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    _invalidar_estaciones({e for _, e in nuevos | a_eliminar})
+    await grafo.aplicar(agregar=nuevos, quitar=a_eliminar)
+    return {
+        "agregadas": len(insertadas),
+        "eliminadas": len(eliminadas),
+        "sin_cambios": len(pares) - len(insertadas) - len(eliminadas),
+    }
+
+
+@router.put("/api/buses/{bus_id}/estaciones")
+async def reemplazar_estaciones(
+        bus_id: int,
+        datos: EstacionesDelBus,
+        repos=Depends(get_repos)
+):
+    """Reemplaza el conjunto de estaciones del bus por `estacion_ids`"""
+    deseadas = set(datos.estacion_ids)
+    try:
+        actuales = {f["estacion_id"]: f["id"] for f in await repos.bus_estacion.estaciones_de_bus(bus_id)}
+
+        nuevas = deseadas - actuales.keys()
+        sobrantes = actuales.keys() - deseadas
+        insertadas = await repos.bus_estacion.asociar_varias([(bus_id, e) for e in sorted(nuevas)])
+        eliminadas = await repos.bus_estacion.eliminar_ids(actuales[e] for e in sorted(sobrantes))
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    _invalidar_estaciones(nuevas | sobrantes)
+    await grafo.aplicar(
+        agregar=[(bus_id, e) for e in nuevas], quitar=[(bus_id, e) for e in sobrantes]
+    )
+    return {
+        "agregadas": len(insertadas),
+        "eliminadas": len(eliminadas),
+        "sin_cambios": len(deseadas & actuales.keys()),
+    }
+
+
 @router.post("/api/buses/{bus_id}/imagen")
 async def subir_imagen_bus(
         bus_id: int,
         imagen: UploadFile = File(...),
-        supabase=Depends(get_db)
+        repos=Depends(get_repos)
 ):
     """Sube una imagen para un bus existente"""
     try:
         # Verificar que el bus existe
-        bus_data, bus_error = (
-            supabase.table("buses")
-            .select("id")
-            .eq("id", bus_id)
-            .execute()
-        )
-
-        if bus_error:
+        try:
+            existe = await repos.buses.existe(bus_id)
+        except APIError as bus_error:
             raise HTTPException(status_code=400, detail=str(bus_error))
 
-        if not bus_data[1]:
+        if not existe:
             raise HTTPException(status_code=404, detail="Bus no encontrado")
 
-        # Leer contenido de la imagen
-        contents = await imagen.read()
+        # Validar tamaño y tipo sin leer la imagen completa
+        imagen_subida = await preparar_imagen(imagen)
 
         # Generar un nombre único para la imagen
-        extension = os.path.splitext(imagen.filename)[1]
-        nombre_archivo = f"{uuid.uuid4()}{extension}"
+        nombre_archivo = f"{uuid.uuid4()}{imagen_subida.extension}"
         file_path = f"{bus_id}/{nombre_archivo}"
 
         bucket_name = "buses-imagenes"
 
-        try:
-            # Comprobar si existe el bucket
-            supabase.storage.get_bucket(bucket_name)
-        except Exception as e:
-            print(f"Error al acceder al bucket '{bucket_name}': {e}")
-            # Intentar crear el bucket si no existe
-            try:
-                supabase.storage.create_bucket(
-                    bucket_name,
-                    options={"public": True}
-                )
-                print(f"Bucket '{bucket_name}' creado correctamente")
-            except Exception as bucket_error:
-                print(f"Error al crear bucket '{bucket_name}': {bucket_error}")
-                raise HTTPException(status_code=500, detail="Error al configurar el almacenamiento")
-
         # Subir imagen a Supabase Storage
         try:
-            # Subir la imagen al bucket específico
-            supabase.storage.from_(bucket_name).upload(file_path, contents)
-            print(f"Imagen subida correctamente a '{bucket_name}/{file_path}'")
+            # Subir la imagen al bucket específico por bloques y obtener su URL pública
+            url = await repos.imagenes.subir_en_bloques(bucket_name, file_path, imagen_subida)
+            logger.debug("Imagen subida correctamente a %s/%s", bucket_name, file_path)
 
-            # Obtener URL pública del bucket específico
-            url = supabase.storage.from_(bucket_name).get_public_url(file_path)
+            # Generar miniatura y WebP junto al original
+            variantes = await subir_derivadas(repos.imagenes, bucket_name, file_path, imagen_subida)
 
             # Crear registro en la tabla imagenes
             imagen_data = {
                 "url": url,
+                **variantes,
                 "bus_id": bus_id,
                 "created_at": datetime.utcnow().isoformat()
             }
 
             # Insertar en la tabla imagenes
-            imagen_result, imagen_error = supabase.table("imagenes").insert(imagen_data).execute()
-
-            if imagen_error:
-                print(f"Error al insertar en tabla imagenes: {imagen_error}")
+            try:
+                await repos.imagenes.crear(imagen_data)
+            except APIError as imagen_error:
+                logger.warning("Error al insertar en tabla imagenes: %s", imagen_error)
                 raise HTTPException(status_code=400, detail=str(imagen_error))
 
-            return {"message": "Imagen subida correctamente", "url": url}
+            cache_buses.invalidar("detalle", bus_id)
+            cache_buses.invalidar("lista")
+
+            return {"message": "Imagen subida correctamente", "url": url, **variantes}
+        except HTTPException:
+            raise
+        except ArchivoDemasiadoGrande as e:
+            raise HTTPException(status_code=413, detail=str(e))
         except Exception as storage_error:
-            print(f"Error al subir imagen a storage: {storage_error}")
+            logger.exception("Error al subir imagen a storage")
             raise HTTPException(status_code=500, detail=f"Error al subir imagen: {str(storage_error)}")
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error general al subir imagen: {str(e)}")
+        logger.exception("Error general al subir imagen")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/api/buses/{bus_id}")
 async def obtener_bus(
         bus_id: int,
-        supabase=Depends(get_db)
+        repos=Depends(get_repos)
 ):
     """Obtiene los detalles de un bus específico con sus imágenes"""
-    try:
+    async def cargar():
         # Seleccionar bus con sus imágenes asociadas
-        data, error = (
-            supabase.table("buses")
-            .select("*, imagenes(*)")
-            .eq("id", bus_id)
-            .execute()
-        )
-
-        if error:
+        try:
+            bus = await repos.buses.obtener(bus_id)
+        except APIError as error:
             raise HTTPException(status_code=400, detail=str(error))
 
-        if not data[1]:
+        if not bus:
             raise HTTPException(status_code=404, detail="Bus no encontrado")
 
         # Añadir imagen_url como primera imagen para compatibilidad
-        bus = data[1][0]
         try:
             if "imagenes" in bus and bus["imagenes"]:
                 bus["imagen_url"] = bus["imagenes"][0]["url"]
             else:
                 bus["imagen_url"] = None
         except Exception as e:
-            print(f"Error al procesar imágenes: {e}")
+            logger.warning("Error al procesar imágenes: %s", e)
             bus["imagen_url"] = None
 
         return bus
+
+    try:
+        return RespuestaJSON(await cache_buses.obtener_o_cargar(("detalle", bus_id), cargar))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -363,78 +474,73 @@ async def obtener_bus(
 @router.delete("/api/buses/{bus_id}")
 async def eliminar_bus(
         bus_id: int,
-        supabase=Depends(get_db)
+        background_tasks: BackgroundTasks,
+        repos=Depends(get_repos)
 ):
     """Elimina un bus y todos sus recursos asociados"""
     try:
-        # Primero eliminar relaciones con estaciones
-        supabase.table("bus_estacion").delete().eq("bus_id", bus_id).execute()
-
-        # Obtener y eliminar imágenes asociadas al bus
-        imagenes, img_error = (
-            supabase.table("imagenes")
-            .select("*")
-            .eq("bus_id", bus_id)
-            .execute()
-        )
-
-        if not img_error and imagenes[1]:
-            # Eliminar archivos del bucket específico de buses
-            bucket_name = "buses-imagenes"
-            for imagen in imagenes[1]:
-                try:
-                    # Extraer solo el nombre del archivo de la URL
-                    path_parts = imagen["url"].split("/")
-                    file_name = path_parts[-1]
-                    # La ruta ahora es solo bus_id/nombre_archivo
-                    supabase.storage.from_(bucket_name).remove([f"{bus_id}/{file_name}"])
-                except Exception as e:
-                    print(f"Error eliminando archivo de {bucket_name}: {e}")
-
-        # Eliminar registros de imágenes
-        supabase.table("imagenes").delete().eq("bus_id", bus_id).execute()
-
-        # Finalmente eliminar el bus
-        data, error = supabase.table("buses").delete().eq("id", bus_id).execute()
-
-        if error:
+        # Borrar relaciones e imágenes a la vez; el delete devuelve las filas
+        # borradas, así que no hace falta consultar antes las imágenes
+        try:
+            _, imagenes = await asyncio.gather(
+                repos.bus_estacion.eliminar_por_bus(bus_id),
+                repos.imagenes.eliminar_por_bus(bus_id)
+            )
+            eliminados = await repos.buses.eliminar(bus_id)
+        except APIError as error:
             raise HTTPException(status_code=400, detail=str(error))
 
-        if not data[1]:
+        # Eliminar todos los archivos del bucket de buses en una sola llamada
+        bucket_name = "buses-imagenes"
+        if STORAGE_BORRADO_EN_SEGUNDO_PLANO:
+            background_tasks.add_task(repos.imagenes.limpiar_archivos, bucket_name, imagenes)
+        else:
+            await repos.imagenes.limpiar_archivos(bucket_name, imagenes)
+
+        if not eliminados:
             raise HTTPException(status_code=404, detail="Bus no encontrado")
 
-        return {"message": "Bus eliminado correctamente"}
+        cache_buses.invalidar("detalle", bus_id)
+        cache_buses.invalidar("lista")
+        # El detalle de las estaciones incluye sus buses
+        cache_estaciones.invalidar("detalle")
+        # Las asignaciones bus_ruta se borran en cascada
+        await indice_rutas.eliminar_bus(bus_id)
+        await grafo.eliminar_bus(bus_id)
+        await indice_busqueda.eliminar("buses", bus_id)
+
+        return {"message": "Bus eliminado correctamente", "imagenes_eliminadas": len(imagenes)}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error al eliminar bus: {str(e)}")
+        logger.exception("Error al eliminar bus")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/api/debug/tablas")
 async def verificar_tablas(
-        supabase=Depends(get_db)
+        supabase=Depends(get_async_db)
 ):
     """Endpoint de depuración para verificar la estructura de las tablas"""
-    try:
-        # Intentar leer un registro de cada tabla principal
-        buses, buses_error = supabase.table("buses").select("*").limit(1).execute()
-        imagenes, imagenes_error = supabase.table("imagenes").select("*").limit(1).execute()
-
-        return {
-            "mensaje": "Información de depuración de tablas",
-            "tablas": {
-                "buses": {
-                    "error": str(buses_error) if buses_error else None,
-                    "campos_disponibles": list(buses[1][0].keys()) if buses[1] else []
-                },
-                "imagenes": {
-                    "error": str(imagenes_error) if imagenes_error else None,
-                    "campos_disponibles": list(imagenes[1][0].keys()) if imagenes[1] else []
-                }
+    tablas = {}
+    for tabla in ("buses", "imagenes"):
+        try:
+            # Intentar leer un registro de cada tabla principal
+            respuesta = await supabase.table(tabla).select("*").limit(1).execute()
+            tablas[tabla] = {
+                "error": None,
+                "campos_disponibles": list(respuesta.data[0].keys()) if respuesta.data else []
             }
-        }
-    except Exception as e:
-        return {
-            "error": str(e),
-            "mensaje": "No se pudo obtener información de las tablas",
-            "recomendación": "Ejecuta el script migrations/add_imagenes_table.sql para verificar la estructura"
-        }
+        except APIError as error:
+            tablas[tabla] = {"error": str(error), "campos_disponibles": []}
+        except Exception as e:
+            return {
+                "error": str(e),
+                "mensaje": "No se pudo obtener información de las tablas",
+                "recomendación": "Ejecuta el script migrations/add_imagenes_table.sql para verificar la estructura"
+            }
+
+    return {
+        "mensaje": "Información de depuración de tablas",
+        "tablas": tablas
+    }
@@ -0,0 +1,69 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from ..repositorios import get_repos
+from ..busqueda import indice_busqueda
+from ..paginacion import (
+    CursorInvalido, codificar_cursor_id, decodificar_cursor_id, normalizar_limite, LIMITE_POR_DEFECTO
+)
+from postgrest.exceptions import APIError
+from typing import Optional
+
+router = APIRouter()
+
+MODOS_BUSQUEDA = ("difuso", "prefijo")
+
+
+async def _asegurar_indice(repos):
+    async def cargar():
+        buses, estaciones = await asyncio.gather(repos.buses.todos(), repos.estaciones.todas())
+        return {"buses": buses, "estaciones": estaciones}
+
+    try:
+        await indice_busqueda.asegurar(cargar)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.get("/api/buscar")
+async def buscar(
+        q: str,
+        entidad: Optional[str] = None,
+        modo: str = "difuso",
+        esta_activo: Optional[bool] = None,
+        limit: int = LIMITE_POR_DEFECTO,
+        cursor: Optional[str] = None,
+        repos=Depends(get_repos)
+):
+    """Busca buses (por nombre) y estaciones (por nombre y localidad).
+
+    `modo=difuso` tolera errores de tipeo y ordena por relevancia;
+    `modo=prefijo` es para autocompletar mientras se escribe.
+    """
+    if entidad is not None and entidad not in ("buses", "estaciones"):
+        raise HTTPException(status_code=400, detail=f"Entidad no soportada: {entidad}")
+    if modo not in MODOS_BUSQUEDA:
+        raise HTTPException(status_code=400, detail=f"Modo no soportado: {modo}")
+    limite = normalizar_limite(limit)
+    try:
+        desplazamiento = decodificar_cursor_id(cursor) if cursor else 0
+    except CursorInvalido as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    await _asegurar_indice(repos)
+    total, datos = indice_busqueda.buscar(
+        q, entidad, esta_activo, prefijo=modo == "prefijo",
+        desplazamiento=desplazamiento, limite=limite
+    )
+    fin = desplazamiento + limite
+    return {
+        "datos": datos,
+        "siguiente_cursor": codificar_cursor_id(fin) if fin < total else None,
+        "total": total,
+    }
+
+
+@router.get("/api/buscar/indice", include_in_schema=False)
+async def estado_indice_busqueda(repos=Depends(get_repos)):
+    """Tamaño y antigüedad del índice de búsqueda en este worker"""
+    await _asegurar_indice(repos)
+    return indice_busqueda.estado()
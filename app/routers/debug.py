@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from .. import database
+from ..almacenamiento import registro_buckets
 from datetime import datetime
 import os
 import uuid
@@ -107,6 +108,7 @@ async def diagnostico_imagen(bus_id: int, supabase=Depends(get_db)):
         bucket_name = "buses-imagenes"
         file_path = f"test-{uuid.uuid4()}.txt"
         file_content = f"Test content for bus {bus_id}".encode()
+        registro_buckets.asegurar_sync(supabase, bucket_name)
 
         # Intentar subir archivo
         try:
@@ -299,6 +301,7 @@ async def reparar_imagen(bus_id: int, supabase=Depends(get_db)):
         bucket_name = "buses-imagenes"
         file_name = f"bus-{bus_id}-{uuid.uuid4()}.txt"
         file_content = f"Contenido de prueba para bus {bus_id}".encode()
+        registro_buckets.asegurar_sync(supabase, bucket_name)
 
         # Intentar subir el archivo
         try:
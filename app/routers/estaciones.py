@@ -1,30 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File
 from typing import List, Optional
-from ..database import get_db
+from ..repositorios import COLUMNAS_RELACION, RepositorioBuses, get_repos
+from ..cache import cache_estaciones
+from ..facetas import obtener_facetas
+from ..subidas import preparar_imagen, subir_imagenes
+from ..almacenamiento import STORAGE_BORRADO_EN_SEGUNDO_PLANO
+from ..indice_rutas import indice_rutas
+from ..grafo import grafo
+from ..busqueda import indice_busqueda
+from ..respuestas import RespuestaJSON
+from ..derivadas import PREFERENCIA_VARIANTE, url_preferida
+from ..paginacion import (
+    CursorInvalido, armar_pagina, decodificar_cursor_id, normalizar_limite, parsear_campos,
+    LIMITE_POR_DEFECTO
+)
+from postgrest.exceptions import APIError
 from datetime import datetime
-import uuid
-from fastapi.templating import Jinja2Templates
+import asyncio
 
-templates = Jinja2Templates(directory="templates")
 router = APIRouter()
 
 
-@router.get("/estaciones", include_in_schema=False)
-async def estaciones_page(request: Request):
-    return templates.TemplateResponse(
-        "estaciones.html",
-        {"request": request}
-    )
-
-
 @router.post("/api/estaciones")
 async def crear_estacion(
         nombre: str,
         localidad: str,
         esta_activo: bool = True,
         imagenes: List[UploadFile] = File(...),
-        supabase=Depends(get_db)
+        repos=Depends(get_repos)
 ):
+    # Validar todas las imágenes antes de crear la estación
+    imagenes_subidas = [await preparar_imagen(imagen) for imagen in imagenes]
+
     estacion_data = {
         "nombre": nombre,
         "localidad": localidad,
@@ -32,74 +39,122 @@ async def crear_estacion(
         "created_at": datetime.utcnow().isoformat()
     }
 
-    data, error = supabase.table("estaciones").insert(estacion_data).execute()
-    if error:
+    try:
+        estacion = await repos.estaciones.crear(estacion_data)
+    except APIError as error:
         raise HTTPException(status_code=400, detail=str(error))
 
-    estacion_id = data[1][0]["id"]
-    imagenes_urls = []
-
-    bucket_name = "estaciones-imagenes"
-
-    for imagen in imagenes:
-        contents = await imagen.read()
-        # Usar una ruta más simple dentro del bucket específico
-        file_path = f"{estacion_id}/{imagen.filename}"
+    estacion_id = estacion["id"]
+    await indice_busqueda.actualizar("estaciones", estacion)
 
-        # Subir imagen al bucket específico de estaciones
-        supabase.storage.from_(bucket_name).upload(file_path, contents)
-        url = supabase.storage.from_(bucket_name).get_public_url(file_path)
+    # Subir las imágenes al bucket específico de estaciones en paralelo
+    resultados = await subir_imagenes(
+        repos.imagenes,
+        "estaciones-imagenes",
+        estacion_id,
+        imagenes_subidas,
+        {"estacion_id": estacion_id}
+    )
+    imagenes_urls = [r["url"] for r in resultados if r["ok"]]
+
+    cache_estaciones.invalidar("lista")
+    return {
+        **estacion_data,
+        "id": estacion_id,
+        "imagenes": imagenes_urls,
+        "resultados_imagenes": resultados
+    }
 
-        imagen_data = {
-            "url": url,
-            "estacion_id": estacion_id,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        supabase.table("imagenes").insert(imagen_data).execute()
-        imagenes_urls.append(url)
 
-    return {**estacion_data, "imagenes": imagenes_urls}
+CAMPOS_ESTACION = ["id", "nombre", "localidad", "esta_activo", "created_at", "updated_at", "imagenes", "imagen_url"]
 
 
 @router.get("/api/estaciones")
 async def listar_estaciones(
         localidad: Optional[str] = None,
         esta_activo: Optional[bool] = None,
-        supabase=Depends(get_db)
+        limit: int = LIMITE_POR_DEFECTO,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        incluir_total: bool = False,
+        variante: str = "miniatura",
+        repos=Depends(get_repos)
 ):
-    query = supabase.table("estaciones").select("*, imagenes(*)").order("created_at")
+    """Lista estaciones paginadas por cursor, con proyección opcional (`fields`).
 
-    if localidad:
-        query = query.eq("localidad", localidad)
-    if esta_activo is not None:
-        query = query.eq("esta_activo", esta_activo)
+    `imagen_url` es la variante más pequeña de la primera imagen salvo que
+    se pida otra con `variante` (miniatura, webp u original).
+    """
+    try:
+        campos = parsear_campos(fields, CAMPOS_ESTACION)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    data, error = query.execute()
+    if variante not in PREFERENCIA_VARIANTE:
+        raise HTTPException(status_code=400, detail=f"Variante no válida: {variante}")
 
-    if error:
-        raise HTTPException(status_code=400, detail=str(error))
+    limite = normalizar_limite(limit)
 
-    return data[1]
+    async def cargar():
+        try:
+            estaciones, total = await repos.estaciones.listar(
+                localidad=localidad,
+                esta_activo=esta_activo,
+                limite=limite,
+                cursor=cursor,
+                campos=campos,
+                incluir_total=incluir_total
+            )
+        except CursorInvalido as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except APIError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+
+        quiere_imagen_url = campos is None or "imagen_url" in campos
+        quiere_imagenes = campos is None or "imagenes" in campos
+        for estacion in estaciones:
+            if quiere_imagen_url:
+                imagenes = estacion.get("imagenes") or []
+                estacion["imagen_url"] = url_preferida(imagenes[0], variante) if imagenes else None
+            if not quiere_imagenes:
+                estacion.pop("imagenes", None)
+
+        return armar_pagina(estaciones, limite, total)
+
+    clave = ("lista", localidad, esta_activo, limite, cursor, fields, incluir_total, variante)
+    return RespuestaJSON(await cache_estaciones.obtener_o_cargar(clave, cargar))
+
+
+# Debe declararse antes de /api/estaciones/{estacion_id} para no quedar oculta
+@router.get("/api/estaciones/localidades")
+async def listar_localidades(
+        repos=Depends(get_repos)
+):
+    """Localidades distintas, leídas de las facetas precalculadas"""
+    try:
+        facetas = await obtener_facetas(repos, "estaciones")
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return [faceta["valor"] for faceta in facetas["localidad"]]
 
 
 @router.get("/api/estaciones/{estacion_id}")
 async def obtener_estacion(
         estacion_id: str,
-        supabase=Depends(get_db)
+        repos=Depends(get_repos)
 ):
-    data, error = (
-        supabase.table("estaciones")
-        .select("*, imagenes(*), buses!bus_estacion(*)")
-        .eq("id", estacion_id)
-        .execute()
-    )
+    async def cargar():
+        try:
+            estacion = await repos.estaciones.obtener(estacion_id)
+        except APIError as error:
+            raise HTTPException(status_code=400, detail=str(error))
 
-    if error:
-        raise HTTPException(status_code=400, detail=str(error))
-    if not data[1]:
-        raise HTTPException(status_code=404, detail="Estación no encontrada")
+        if not estacion:
+            raise HTTPException(status_code=404, detail="Estación no encontrada")
+
+        return estacion
 
-    return data[1][0]
+    return RespuestaJSON(await cache_estaciones.obtener_o_cargar(("detalle", estacion_id), cargar))
 
 
 @router.put("/api/estaciones/{estacion_id}")
@@ -109,8 +164,10 @@ async def actualizar_estacion(
         localidad: Optional[str] = None,
         esta_activo: Optional[bool] = None,
         imagenes: Optional[List[UploadFile]] = File(None),
-        supabase=Depends(get_db)
+        repos=Depends(get_repos)
 ):
+    imagenes_subidas = [await preparar_imagen(imagen) for imagen in imagenes or []]
+
     update_data = {
         "updated_at": datetime.utcnow().isoformat()
     }
@@ -123,159 +180,130 @@ async def actualizar_estacion(
         update_data["esta_activo"] = esta_activo
 
     # Actualizar datos de la estación
-    data, error = (
-        supabase.table("estaciones")
-        .update(update_data)
-        .eq("id", estacion_id)
-        .execute()
-    )
-
-    if error:
+    try:
+        estacion = await repos.estaciones.actualizar(estacion_id, update_data)
+    except APIError as error:
         raise HTTPException(status_code=400, detail=str(error))
-    if not data[1]:
-        raise HTTPException(status_code=404, detail="Estación no encontrada")
-
-    # Procesar nuevas imágenes si se proporcionaron
-    if imagenes:
-        imagenes_urls = []
-        bucket_name = "estaciones-imagenes"
 
-        for imagen in imagenes:
-            contents = await imagen.read()
-            # Usar una ruta más simple dentro del bucket específico
-            file_path = f"{estacion_id}/{imagen.filename}"
+    if not estacion:
+        raise HTTPException(status_code=404, detail="Estación no encontrada")
 
-            supabase.storage.from_(bucket_name).upload(file_path, contents)
-            url = supabase.storage.from_(bucket_name).get_public_url(file_path)
+    cache_estaciones.invalidar("detalle", estacion_id)
+    cache_estaciones.invalidar("lista")
+    await indice_busqueda.actualizar("estaciones", estacion)
 
-            imagen_data = {
-                "url": url,
-                "estacion_id": estacion_id,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            supabase.table("imagenes").insert(imagen_data).execute()
-            imagenes_urls.append(url)
+    # Procesar nuevas imágenes si se proporcionaron
+    if imagenes_subidas:
+        resultados = await subir_imagenes(
+            repos.imagenes,
+            "estaciones-imagenes",
+            estacion_id,
+            imagenes_subidas,
+            {"estacion_id": estacion_id}
+        )
+        imagenes_urls = [r["url"] for r in resultados if r["ok"]]
 
-        data[1][0]["nuevas_imagenes"] = imagenes_urls
+        estacion["resultados_imagenes"] = resultados
+        estacion["nuevas_imagenes"] = imagenes_urls
+        cache_estaciones.invalidar("detalle", estacion_id)
+        cache_estaciones.invalidar("lista")
 
-    return data[1][0]
+    return estacion
 
 
 @router.delete("/api/estaciones/{estacion_id}")
 async def eliminar_estacion(
         estacion_id: str,
-        supabase=Depends(get_db)
+        background_tasks: BackgroundTasks,
+        repos=Depends(get_repos)
 ):
-    # Eliminar asociaciones con buses
-    supabase.table("bus_estacion").delete().eq("estacion_id", estacion_id).execute()
-
-    # Obtener y eliminar imágenes
-    imagenes, error = (
-        supabase.table("imagenes")
-        .select("url")
-        .eq("estacion_id", estacion_id)
-        .execute()
-    )
-
-    if error:
+    try:
+        # Eliminar asociaciones e imágenes a la vez (el delete devuelve las filas)
+        _, imagenes = await asyncio.gather(
+            repos.bus_estacion.eliminar_por_estacion(estacion_id),
+            repos.imagenes.eliminar_por_estacion(estacion_id)
+        )
+
+        # Eliminar la estación
+        eliminadas = await repos.estaciones.eliminar(estacion_id)
+    except APIError as error:
         raise HTTPException(status_code=400, detail=str(error))
 
-    # Eliminar archivos del bucket específico de estaciones
+    # Eliminar los archivos del bucket de estaciones en una sola llamada
     bucket_name = "estaciones-imagenes"
-    for imagen in imagenes[1]:
-        try:
-            file_path = imagen["url"].split("/")[-1]
-            supabase.storage.from_(bucket_name).remove([f"{estacion_id}/{file_path}"])
-        except Exception as e:
-            print(f"Error eliminando archivo: {e}")
-
-    # Eliminar registros de imágenes
-    supabase.table("imagenes").delete().eq("estacion_id", estacion_id).execute()
-
-    # Eliminar la estación
-    data, error = supabase.table("estaciones").delete().eq("id", estacion_id).execute()
+    if STORAGE_BORRADO_EN_SEGUNDO_PLANO:
+        background_tasks.add_task(repos.imagenes.limpiar_archivos, bucket_name, imagenes)
+    else:
+        await repos.imagenes.limpiar_archivos(bucket_name, imagenes)
 
-    if error:
-        raise HTTPException(status_code=400, detail=str(error))
-    if not data[1]:
+    if not eliminadas:
         raise HTTPException(status_code=404, detail="Estación no encontrada")
 
-    return {"message": "Estación eliminada correctamente"}
+    cache_estaciones.invalidar("detalle", estacion_id)
+    cache_estaciones.invalidar("lista")
+    # Las paradas de rutas en esta estación se borran en cascada
+    await indice_rutas.eliminar_estacion(int(estacion_id))
+    await grafo.eliminar_estacion(int(estacion_id))
+    await indice_busqueda.eliminar("estaciones", int(estacion_id))
+
+    return {"message": "Estación eliminada correctamente", "imagenes_eliminadas": len(imagenes)}
 
 
 @router.delete("/api/estaciones/{estacion_id}/imagenes/{imagen_id}")
 async def eliminar_imagen_estacion(
         estacion_id: str,
         imagen_id: str,
-        supabase=Depends(get_db)
+        background_tasks: BackgroundTasks,
+        repos=Depends(get_repos)
 ):
-    # Obtener la imagen
-    imagen, error = (
-        supabase.table("imagenes")
-        .select("url")
-        .eq("id", imagen_id)
-        .eq("estacion_id", estacion_id)
-        .execute()
-    )
-
-    if error:
+    # Eliminar el registro de la imagen y obtener sus URLs en la misma llamada
+    try:
+        imagen = await repos.imagenes.eliminar_de_estacion(imagen_id, estacion_id)
+    except APIError as error:
         raise HTTPException(status_code=400, detail=str(error))
-    if not imagen[1]:
+
+    if not imagen:
         raise HTTPException(status_code=404, detail="Imagen no encontrada")
 
-    # Eliminar archivo del bucket específico de estaciones
+    # Eliminar el archivo y sus variantes del bucket de estaciones
     bucket_name = "estaciones-imagenes"
-    try:
-        file_path = imagen[1][0]["url"].split("/")[-1]
-        supabase.storage.from_(bucket_name).remove([f"{estacion_id}/{file_path}"])
-    except Exception as e:
-        print(f"Error eliminando archivo: {e}")
-
-    # Eliminar registro de la imagen
-    data, error = (
-        supabase.table("imagenes")
-        .delete()
-        .eq("id", imagen_id)
-        .execute()
-    )
+    if STORAGE_BORRADO_EN_SEGUNDO_PLANO:
+        background_tasks.add_task(repos.imagenes.limpiar_archivos, bucket_name, [imagen])
+    else:
+        await repos.imagenes.limpiar_archivos(bucket_name, [imagen])
 
-    if error:
-        raise HTTPException(status_code=400, detail=str(error))
+    cache_estaciones.invalidar("detalle", estacion_id)
+    cache_estaciones.invalidar("lista")
 
     return {"message": "Imagen eliminada correctamente"}
 
 
 @router.get("/api/estaciones/{estacion_id}/buses")
 async def listar_buses_estacion(
-        estacion_id: str,
-        supabase=Depends(get_db)
+        estacion_id: int,
+        limit: int = LIMITE_POR_DEFECTO,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        esta_activo: Optional[bool] = None,
+        repos=Depends(get_repos)
 ):
-    data, error = (
-        supabase.table("buses")
-        .select("*")
-        .eq("bus_estacion.estacion_id", estacion_id)
-        .execute()
-    )
+    """Página de buses que paran en la estación, ordenada por id de bus.
 
-    if error:
+    `fields` elige las columnas de cada bus (por defecto id, nombre, tipo y
+    esta_activo); `cursor` es el `siguiente_cursor` de la página anterior.
+    """
+    limite = normalizar_limite(limit)
+    try:
+        campos = parsear_campos(fields, RepositorioBuses.COLUMNAS) or COLUMNAS_RELACION["buses"]
+        despues_de = decodificar_cursor_id(cursor) if cursor else None
+    except ValueError as error:
         raise HTTPException(status_code=400, detail=str(error))
+    columnas = ["id"] + [c for c in campos if c != "id"]
 
-    return data[1]
-
-
-@router.get("/api/estaciones/localidades")
-async def listar_localidades(
-        supabase=Depends(get_db)
-):
-    data, error = (
-        supabase.table("estaciones")
-        .select("localidad")
-        .execute()
-    )
-
-    if error:
+    try:
+        buses = await repos.bus_estacion.buses_de_estacion(
+            estacion_id, columnas, limite, despues_de, esta_activo
+        )
+    except APIError as error:
         raise HTTPException(status_code=400, detail=str(error))
-
-    # Obtener lista única de localidades
-    localidades = list(set(item["localidad"] for item in data[1]))
-    return sorted(localidades)
\ No newline at end of file
+    return armar_pagina(buses, limite, clave="id")
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from postgrest.exceptions import APIError
+from ..database import get_async_db
+from ..exportacion import (
+    EXPORTACION_TAMANO_LOTE, FORMATOS_EXPORTACION, TABLAS_EXPORTABLES, exportar, normalizar_tamano_lote,
+    tomar_instantanea
+)
+
+router = APIRouter()
+
+
+@router.get("/api/exportar")
+async def instantanea_exportacion(supabase=Depends(get_async_db)):
+    """Instantánea de todas las tablas exportables.
+
+    Un trabajo que exporte varias tablas puede pedir primero esta
+    instantánea y pasar el `id_maximo` de cada tabla a /api/exportar/{tabla}
+    para obtener un conjunto coherente.
+    """
+    try:
+        instantaneas = await asyncio.gather(
+            *(tomar_instantanea(supabase, tabla) for tabla in TABLAS_EXPORTABLES)
+        )
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {i["tabla"]: i for i in instantaneas}
+
+
+@router.get("/api/exportar/{tabla}")
+async def exportar_tabla(
+        tabla: str,
+        request: Request,
+        formato: str = "ndjson",
+        desde_id: int = 0,
+        id_maximo: Optional[int] = None,
+        tamano_lote: int = EXPORTACION_TAMANO_LOTE,
+        comprimir: Optional[bool] = None,
+        supabase=Depends(get_async_db)
+):
+    """Exporta una tabla completa (o desde `desde_id`) en streaming.
+
+    `tamano_lote` se limita a EXPORTACION_TAMANO_LOTE_MAXIMO. La respuesta
+    se comprime con gzip si el cliente lo acepta, salvo `comprimir=false`.
+    Las cabeceras X-Instantanea-* indican el límite usado.
+    """
+    if tabla not in TABLAS_EXPORTABLES:
+        raise HTTPException(status_code=404, detail=f"Tabla no exportable: {tabla}")
+    if formato not in FORMATOS_EXPORTACION:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}")
+
+    try:
+        instantanea = await tomar_instantanea(supabase, tabla)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if id_maximo is not None:
+        # Reutilizar una instantánea anterior (nunca por encima de la actual)
+        instantanea["id_maximo"] = min(id_maximo, instantanea["id_maximo"])
+
+    if comprimir is None:
+        comprimir = "gzip" in request.headers.get("accept-encoding", "").lower()
+
+    content_type, extension = FORMATOS_EXPORTACION[formato]
+    headers = {
+        "Content-Disposition": f'attachment; filename="{tabla}-{instantanea["id_maximo"]}.{extension}"',
+        "X-Instantanea-Id-Maximo": str(instantanea["id_maximo"]),
+        "X-Instantanea-Desde-Id": str(desde_id),
+        "X-Instantanea-Generado-En": instantanea["generado_en"],
+        "Cache-Control": "no-store",
+    }
+    if comprimir:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(
+        exportar(
+            supabase, tabla, formato, instantanea["id_maximo"],
+            desde_id=desde_id, tamano_lote=normalizar_tamano_lote(tamano_lote), comprimir=comprimir
+        ),
+        media_type=content_type,
+        headers=headers
+    )
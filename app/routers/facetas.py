@@ -0,0 +1,20 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from ..repositorios import get_repos
+from ..facetas import obtener_facetas
+from postgrest.exceptions import APIError
+
+router = APIRouter()
+
+
+@router.get("/api/facetas")
+async def listar_facetas(repos=Depends(get_repos)):
+    """Tipos de bus y localidades distintos con sus conteos de activos e inactivos"""
+    try:
+        buses, estaciones = await asyncio.gather(
+            obtener_facetas(repos, "buses"),
+            obtener_facetas(repos, "estaciones")
+        )
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"buses": buses, "estaciones": estaciones}
@@ -0,0 +1,60 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request
+from ..database import get_async_db
+from ..cache import cache_buses, cache_estaciones
+from ..grafo import grafo
+from ..busqueda import indice_busqueda
+from ..importacion import (
+    ENTIDADES, FORMATOS, IMPORTACION_TAMANO_LOTE, Importador, lineas_de_bloques, registros
+)
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/api/importar/{entidad}")
+async def importar(
+        entidad: str,
+        request: Request,
+        formato: str = "csv",
+        tamano_lote: int = IMPORTACION_TAMANO_LOTE,
+        desde_fila: int = 0,
+        supabase=Depends(get_async_db)
+):
+    """Importa buses, estaciones o bus_estacion desde el cuerpo de la petición.
+
+    El cuerpo es el archivo CSV (con cabecera) o NDJSON tal cual, no un
+    formulario multipart, y se procesa a medida que llega. `tamano_lote`
+    se limita a IMPORTACION_TAMANO_LOTE_MAXIMO. Para reanudar
+    una importación se reenvía el archivo con `desde_fila` igual al
+    `ultima_fila` de la respuesta anterior.
+    """
+    if entidad not in ENTIDADES:
+        raise HTTPException(status_code=404, detail=f"Entidad no soportada: {entidad}")
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}")
+    if desde_fila < 0:
+        raise HTTPException(status_code=400, detail="desde_fila no puede ser negativo")
+
+    importador = Importador(supabase, entidad, tamano_lote=tamano_lote)
+    try:
+        resumen = await importador.importar(
+            registros(lineas_de_bloques(request.stream()), formato),
+            desde_fila=desde_fila
+        )
+    except Exception as e:
+        # Lo insertado hasta el último lote confirmado se conserva
+        logger.warning("Importación de %s interrumpida: %s", entidad, e)
+        resumen = importador.resumen()
+        resumen["interrumpida"] = str(e)
+    finally:
+        if importador.insertadas:
+            if entidad in ("buses", "bus_estacion"):
+                cache_buses.invalidar()
+            if entidad == "bus_estacion":
+                grafo.invalidar()
+            else:
+                indice_busqueda.invalidar()
+            cache_estaciones.invalidar()
+
+    return resumen
@@ -0,0 +1,194 @@
+"""Panel HTML de la flota renderizado en el servidor.
+
+La página se envía por partes: primero la cabecera (pre-renderizada) para
+que el navegador empiece a cargar estilos, y después los listados de buses
+y estaciones, leídos a través de las cachés de lectura en proceso.
+"""
+import asyncio
+import logging
+from typing import Optional
+from urllib.parse import urlencode
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from postgrest.exceptions import APIError
+from ..repositorios import get_repos
+from ..cache import cache_buses, cache_estaciones
+from ..derivadas import url_preferida
+from ..plantillas import entorno, paginas
+from ..paginacion import (
+    CursorInvalido, armar_pagina, decodificar_cursor, normalizar_limite, LIMITE_POR_DEFECTO
+)
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+CAMPOS_PANEL_BUS = ["id", "nombre", "tipo", "esta_activo", "imagen_url"]
+CAMPOS_PANEL_ESTACION = ["id", "nombre", "localidad", "esta_activo", "imagen_url"]
+# Tamaño aproximado de cada parte enviada al cliente
+TAMANO_PARTE = 8 * 1024
+
+
+def _parsear_esta_activo(valor):
+    """El formulario envía "" para "Todos"; FastAPI no lo aceptaría como bool"""
+    if valor in (None, ""):
+        return None
+    if valor.lower() in ("true", "false"):
+        return valor.lower() == "true"
+    raise HTTPException(status_code=400, detail="esta_activo debe ser true o false")
+
+
+def _con_imagen(filas):
+    for fila in filas:
+        imagenes = fila.pop("imagenes", None) or []
+        fila["imagen_url"] = url_preferida(imagenes[0]) if imagenes else None
+    return filas
+
+
+async def _pagina_buses(repos, tipo, esta_activo, limite, cursor):
+    async def cargar():
+        filas, _ = await repos.buses.listar(
+            tipo=tipo, esta_activo=esta_activo, limite=limite,
+            cursor=cursor, campos=CAMPOS_PANEL_BUS
+        )
+        return armar_pagina(_con_imagen(filas), limite)
+
+    # Prefijo "lista" para que las escrituras de buses también la invaliden
+    clave = ("lista", "panel", tipo, esta_activo, limite, cursor)
+    return await cache_buses.obtener_o_cargar(clave, cargar)
+
+
+async def _pagina_estaciones(repos, localidad, esta_activo, limite, cursor):
+    async def cargar():
+        filas, _ = await repos.estaciones.listar(
+            localidad=localidad, esta_activo=esta_activo, limite=limite,
+            cursor=cursor, campos=CAMPOS_PANEL_ESTACION
+        )
+        return armar_pagina(_con_imagen(filas), limite)
+
+    clave = ("lista", "panel", localidad, esta_activo, limite, cursor)
+    return await cache_estaciones.obtener_o_cargar(clave, cargar)
+
+
+async def _seccion(carga):
+    """Resultado de una carga para la plantilla; los errores se muestran en la página"""
+    try:
+        return dict(await carga)
+    except APIError as e:
+        return {"datos": [], "siguiente_cursor": None, "error": e.message or str(e)}
+    except Exception as e:
+        logger.warning("Error al cargar el panel: %s", e)
+        return {"datos": [], "siguiente_cursor": None, "error": str(e)}
+
+
+async def _generar_html(repos, accion, filtros, limite, cursores, secciones):
+    """Envía la cabecera de inmediato y después el contenido por partes"""
+    cabecera, _ = paginas.obtener("panel/cabecera.html")
+    yield cabecera
+
+    cargas = []
+    for seccion in secciones:
+        if seccion == "buses":
+            cargas.append(_pagina_buses(
+                repos, filtros["tipo"], filtros["esta_activo"], limite, cursores["buses"]
+            ))
+        else:
+            cargas.append(_pagina_estaciones(
+                repos, filtros["localidad"], filtros["esta_activo"], limite, cursores["estaciones"]
+            ))
+    resultados = await asyncio.gather(*(_seccion(carga) for carga in cargas))
+    contexto = {"buses": None, "estaciones": None}
+    contexto.update(zip(secciones, resultados))
+
+    # Enlaces "siguiente" conservando filtros y el cursor de la otra sección
+    base = {k: v for k, v in filtros.items() if v is not None}
+    if "esta_activo" in base:
+        base["esta_activo"] = "true" if base["esta_activo"] else "false"
+    base["limit"] = limite
+    for seccion in secciones:
+        siguiente = contexto[seccion]["siguiente_cursor"]
+        if siguiente:
+            parametros = dict(base)
+            parametros.update({f"cursor_{s}": c for s, c in cursores.items() if c and s != seccion})
+            parametros[f"cursor_{seccion}"] = siguiente
+            contexto[seccion]["siguiente_url"] = f"{accion}?{urlencode(parametros)}"
+
+    parte = []
+    tamano = 0
+    for fragmento in entorno.get_template("panel/contenido.html").generate(
+        accion=accion, filtros=filtros, limite=limite, **contexto
+    ):
+        parte.append(fragmento)
+        tamano += len(fragmento)
+        if tamano >= TAMANO_PARTE:
+            yield "".join(parte).encode("utf-8")
+            parte, tamano = [], 0
+            # Ceder el bucle entre partes para no acaparar el worker
+            await asyncio.sleep(0)
+    if parte:
+        yield "".join(parte).encode("utf-8")
+
+
+def _respuesta_panel(request, repos, secciones, tipo, localidad, esta_activo, limit,
+                     cursor_buses, cursor_estaciones):
+    # Validar todo antes de empezar a enviar, mientras aún se puede responder 400
+    filtros = {
+        "tipo": tipo or None,
+        "localidad": localidad or None,
+        "esta_activo": _parsear_esta_activo(esta_activo),
+    }
+    cursores = {"buses": cursor_buses or None, "estaciones": cursor_estaciones or None}
+    for cursor in cursores.values():
+        if cursor:
+            try:
+                decodificar_cursor(cursor)
+            except CursorInvalido as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        _generar_html(repos, request.url.path, filtros, normalizar_limite(limit),
+                      cursores, secciones),
+        media_type="text/html; charset=utf-8",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@router.get("/panel", include_in_schema=False)
+async def panel(
+        request: Request,
+        tipo: Optional[str] = None,
+        localidad: Optional[str] = None,
+        esta_activo: Optional[str] = None,
+        limit: int = LIMITE_POR_DEFECTO,
+        cursor_buses: Optional[str] = None,
+        cursor_estaciones: Optional[str] = None,
+        repos=Depends(get_repos)
+):
+    """Panel con los listados de buses y estaciones en una sola página"""
+    return _respuesta_panel(request, repos, ["buses", "estaciones"], tipo, localidad,
+                            esta_activo, limit, cursor_buses, cursor_estaciones)
+
+
+@router.get("/buses", include_in_schema=False)
+async def buses_page(
+        request: Request,
+        tipo: Optional[str] = None,
+        esta_activo: Optional[str] = None,
+        limit: int = LIMITE_POR_DEFECTO,
+        cursor_buses: Optional[str] = None,
+        repos=Depends(get_repos)
+):
+    return _respuesta_panel(request, repos, ["buses"], tipo, None,
+                            esta_activo, limit, cursor_buses, None)
+
+
+@router.get("/estaciones", include_in_schema=False)
+async def estaciones_page(
+        request: Request,
+        localidad: Optional[str] = None,
+        esta_activo: Optional[str] = None,
+        limit: int = LIMITE_POR_DEFECTO,
+        cursor_estaciones: Optional[str] = None,
+        repos=Depends(get_repos)
+):
+    return _respuesta_panel(request, repos, ["estaciones"], None, localidad,
+                            esta_activo, limit, None, cursor_estaciones)
@@ -4,6 +4,7 @@ import json
 import uuid
 from fastapi import APIRouter, Depends, HTTPException
 from .. import database
+from ..almacenamiento import BUCKETS, registro_buckets
 from supabase import create_client
 from dotenv import load_dotenv
 
@@ -42,10 +43,14 @@ async def reparar_storage(supabase=Depends(get_db)):
             except Exception as e:
                 bucket_names.append(f"Error: {str(e)}")
 
+        # Refrescar el registro compartido con los buckets que existen
+        registro_buckets.sincronizar([n for n in bucket_names if n in BUCKETS])
+
         result["tests"].append({
             "name": "listar_buckets",
             "status": "success",
-            "data": bucket_names
+            "data": bucket_names,
+            "registro": registro_buckets.resumen()
         })
     except Exception as e:
         result["tests"].append({
@@ -300,6 +305,8 @@ async def verificar_tablas(supabase=Depends(get_db)):
                 pass
 
         result["storage"]["buckets"] = bucket_list
+        registro_buckets.sincronizar([n for n in bucket_list if n in BUCKETS])
+        result["storage"]["registro"] = registro_buckets.resumen()
 
         # Prueba de subida mínima
         test_bucket = "buses-imagenes"
@@ -0,0 +1,175 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request
+from ..repositorios import get_repos
+from ..plantillas import paginas
+from ..indice_rutas import indice_rutas
+from postgrest.exceptions import APIError
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/rutas/crear", include_in_schema=False)
+async def rutas_crear_page(request: Request):
+    return paginas.respuesta(request, "rutas_create.html")
+
+@router.get("/rutas/editar", include_in_schema=False)
+async def rutas_editar_page(request: Request):
+    return paginas.respuesta(request, "rutas_edit.html")
+
+@router.get("/rutas/eliminar", include_in_schema=False)
+async def rutas_eliminar_page(request: Request):
+    return paginas.respuesta(request, "rutas_delete.html")
+
+
+class DatosRuta(BaseModel):
+    nombre: str
+    descripcion: Optional[str] = None
+    esta_activa: bool = True
+    # Estaciones en el orden del recorrido
+    paradas: List[int] = []
+    buses: List[int] = []
+
+
+class CambiosRuta(BaseModel):
+    nombre: Optional[str] = None
+    descripcion: Optional[str] = None
+    esta_activa: Optional[bool] = None
+    paradas: Optional[List[int]] = None
+    buses: Optional[List[int]] = None
+
+
+class BusesDeRuta(BaseModel):
+    bus_ids: List[int]
+
+
+async def _refrescar_indice(repos, ruta_id):
+    """Relee la ruta con sus paradas y buses y la actualiza en el índice"""
+    ruta = await repos.rutas.obtener(ruta_id)
+    if ruta:
+        await indice_rutas.actualizar_ruta(ruta)
+    return ruta
+
+
+@router.get("/api/rutas")
+async def listar_rutas(repos=Depends(get_repos)):
+    try:
+        return await repos.rutas.listar()
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.get("/api/rutas/indice", include_in_schema=False)
+async def estado_indice_rutas(repos=Depends(get_repos)):
+    """Tamaño y antigüedad del índice de rutas en este worker"""
+    await indice_rutas.asegurar(repos.rutas.cargar_todo)
+    return indice_rutas.estado()
+
+
+@router.post("/api/rutas")
+async def crear_ruta(datos: DatosRuta, repos=Depends(get_repos)):
+    """Crea una ruta con su secuencia de paradas y sus buses (todo o nada)"""
+    fila = {
+        "nombre": datos.nombre,
+        "descripcion": datos.descripcion,
+        "esta_activa": datos.esta_activa,
+        "created_at": datetime.utcnow().isoformat()
+    }
+    try:
+        ruta = await repos.rutas.crear_completa(fila, datos.paradas, sorted(set(datos.buses)))
+        if not ruta:
+            raise HTTPException(status_code=500, detail="No se pudo crear la ruta")
+        return await _refrescar_indice(repos, ruta["id"])
+    except APIError as error:
+        logger.warning("Error al crear ruta: %s", error)
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.get("/api/rutas/{ruta_id}")
+async def obtener_ruta(ruta_id: int, repos=Depends(get_repos)):
+    try:
+        ruta = await repos.rutas.obtener(ruta_id)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if not ruta:
+        raise HTTPException(status_code=404, detail="Ruta no encontrada")
+    return ruta
+
+
+@router.put("/api/rutas/{ruta_id}")
+async def actualizar_ruta(ruta_id: int, datos: CambiosRuta, repos=Depends(get_repos)):
+    """Actualiza los datos de la ruta; `paradas` y `buses` reemplazan los actuales (todo o nada)"""
+    cambios = {
+        campo: valor for campo, valor in
+        {"nombre": datos.nombre, "descripcion": datos.descripcion, "esta_activa": datos.esta_activa}.items()
+        if valor is not None
+    }
+    cambios["updated_at"] = datetime.utcnow().isoformat()
+    try:
+        buses = sorted(set(datos.buses)) if datos.buses is not None else None
+        if not await repos.rutas.actualizar_completa(ruta_id, cambios, datos.paradas, buses):
+            raise HTTPException(status_code=404, detail="Ruta no encontrada")
+        return await _refrescar_indice(repos, ruta_id)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.put("/api/rutas/{ruta_id}/buses")
+async def asignar_buses(ruta_id: int, datos: BusesDeRuta, repos=Depends(get_repos)):
+    """Reemplaza los buses asignados a la ruta"""
+    try:
+        cambios = {"updated_at": datetime.utcnow().isoformat()}
+        if not await repos.rutas.actualizar_completa(ruta_id, cambios, buses=sorted(set(datos.bus_ids))):
+            raise HTTPException(status_code=404, detail="Ruta no encontrada")
+        return await _refrescar_indice(repos, ruta_id)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.delete("/api/rutas/{ruta_id}")
+async def eliminar_ruta(ruta_id: int, repos=Depends(get_repos)):
+    try:
+        eliminadas = await repos.rutas.eliminar(ruta_id)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if not eliminadas:
+        raise HTTPException(status_code=404, detail="Ruta no encontrada")
+    await indice_rutas.eliminar_ruta(ruta_id)
+    return {"message": "Ruta eliminada correctamente"}
+
+
+@router.get("/api/estaciones/{estacion_id}/rutas")
+async def rutas_de_estacion(
+        estacion_id: int,
+        incluir_inactivas: bool = False,
+        repos=Depends(get_repos)
+):
+    """Rutas que pasan por la estación (desde el índice en memoria)"""
+    try:
+        await indice_rutas.asegurar(repos.rutas.cargar_todo)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return indice_rutas.rutas_de_estacion(estacion_id, solo_activas=not incluir_inactivas)
+
+
+@router.get("/api/rutas/{ruta_id}/siguientes")
+async def siguientes_paradas(
+        ruta_id: int,
+        estacion_id: int,
+        n: int = 5,
+        repos=Depends(get_repos)
+):
+    """Las `n` paradas que siguen a `estacion_id` en la ruta (desde el índice en memoria)"""
+    try:
+        await indice_rutas.asegurar(repos.rutas.cargar_todo)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if indice_rutas.obtener(ruta_id) is None:
+        raise HTTPException(status_code=404, detail="Ruta no encontrada")
+    paradas = indice_rutas.siguientes_paradas(ruta_id, estacion_id, n)
+    if paradas is None:
+        raise HTTPException(status_code=404, detail="La estación no pertenece a la ruta")
+    return {"ruta_id": ruta_id, "estacion_id": estacion_id, "siguientes": paradas}
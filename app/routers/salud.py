@@ -0,0 +1,57 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ..database import registro_clientes
+from ..almacenamiento import estado_storage
+from ..cache import estadisticas_cache
+from ..bitacora import bitacora
+from ..validadores import validadores
+from ..ejecutor import ejecutor, ejecutar_en_hilo
+
+router = APIRouter()
+
+
+@router.get("/api/salud")
+async def salud():
+    """Comprueba que el cliente Supabase que atiende la API responde.
+
+    Si el pool síncrono (scripts y mantenimiento) llegó a iniciarse en este
+    proceso, también se verifica y su resultado va en `pool`.
+    """
+    resultado = await registro_clientes.verificar_salud_async()
+    if registro_clientes.pool_iniciado:
+        pool = await ejecutar_en_hilo(registro_clientes.verificar_salud)
+        resultado["pool"] = pool
+        if pool["estado"] != "ok":
+            resultado["estado"] = "degradado"
+    return resultado
+
+
+@router.get("/api/salud/ejecutor")
+async def salud_ejecutor():
+    """Métricas del pool de hilos (tamaño de cola y tiempos de espera)"""
+    return ejecutor.metricas()
+
+
+@router.get("/api/salud/listo")
+async def salud_listo(reintentar: bool = False):
+    """Readiness: indica si la verificación del storage terminó correctamente"""
+    if reintentar:
+        await estado_storage.reintentar(registro_clientes.obtener_async)
+    elif estado_storage.estado == "pendiente":
+        await estado_storage.asegurar(registro_clientes.obtener_async)
+
+    resumen = estado_storage.resumen()
+    status_code = 200 if resumen["estado"] == "listo" else 503
+    return JSONResponse(status_code=status_code, content=resumen)
+
+
+@router.get("/api/salud/cache")
+async def salud_cache():
+    """Contadores de aciertos/fallos de la caché de lectura y de las respuestas 304"""
+    return {**estadisticas_cache(), "validadores": validadores.estadisticas()}
+
+
+@router.get("/api/salud/logs")
+async def salud_logs():
+    """Configuración del logging y estado de la cola (registros pendientes y descartados)"""
+    return bitacora.estadisticas()
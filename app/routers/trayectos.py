@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException
+from ..repositorios import get_repos
+from ..grafo import grafo
+from postgrest.exceptions import APIError
+from typing import Optional
+
+router = APIRouter()
+
+
+async def _asegurar_grafo(repos):
+    try:
+        await grafo.asegurar(repos.bus_estacion.todos_los_pares)
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.get("/api/trayectos")
+async def buscar_trayecto(
+        origen: int,
+        destino: int,
+        max_transbordos: Optional[int] = None,
+        repos=Depends(get_repos)
+):
+    """Trayecto entre dos estaciones con el menor número de transbordos.
+
+    Cada tramo indica el bus y las estaciones donde se sube y se baja.
+    """
+    if max_transbordos is not None and max_transbordos < 0:
+        raise HTTPException(status_code=400, detail="max_transbordos no puede ser negativo")
+    await _asegurar_grafo(repos)
+    tramos = grafo.trayecto(origen, destino, max_transbordos)
+    if tramos is None:
+        raise HTTPException(status_code=404, detail="No hay trayecto entre las estaciones")
+    return {
+        "origen": origen,
+        "destino": destino,
+        "transbordos": max(0, len(tramos) - 1),
+        "tramos": tramos,
+    }
+
+
+@router.get("/api/estaciones/{estacion_id}/alcanzables")
+async def estaciones_alcanzables(
+        estacion_id: int,
+        max_transbordos: int = 0,
+        repos=Depends(get_repos)
+):
+    """Estaciones a las que se llega desde `estacion_id` con hasta `max_transbordos` transbordos"""
+    if max_transbordos < 0:
+        raise HTTPException(status_code=400, detail="max_transbordos no puede ser negativo")
+    await _asegurar_grafo(repos)
+    alcanzables = grafo.alcanzables(estacion_id, max_transbordos)
+    if alcanzables is None:
+        alcanzables = {}
+    return {
+        "estacion_id": estacion_id,
+        "total": len(alcanzables),
+        "estaciones": [
+            {"estacion_id": destino, "transbordos": transbordos}
+            for destino, transbordos in sorted(alcanzables.items(), key=lambda e: (e[1], e[0]))
+        ],
+    }
+
+
+@router.get("/api/trayectos/grafo", include_in_schema=False)
+async def estado_grafo(repos=Depends(get_repos)):
+    """Tamaño y antigüedad del grafo bus-estación en este worker"""
+    await _asegurar_grafo(repos)
+    return grafo.estado()
@@ -0,0 +1,162 @@
+"""Subida de imágenes a storage en bloques de tamaño fijo.
+
+El archivo se lee del spool del formulario multipart por bloques y se envía
+a storage como cuerpo en streaming, así que la memoria usada por cada subida
+no depende del tamaño del archivo. El tamaño máximo se comprueba antes de
+empezar y el tipo de contenido se detecta a partir de los primeros bytes.
+Varias imágenes de una misma petición se suben con concurrencia acotada.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from fastapi import HTTPException
+from .derivadas import VARIANTES, rutas_derivadas, subir_derivadas
+
+logger = logging.getLogger(__name__)
+
+# Tamaño máximo por archivo (bytes) y tamaño de cada bloque enviado
+SUBIDA_TAMANO_MAXIMO = int(os.getenv("SUBIDA_TAMANO_MAXIMO", str(10 * 1024 * 1024)))
+SUBIDA_TAMANO_BLOQUE = int(os.getenv("SUBIDA_TAMANO_BLOQUE", str(256 * 1024)))
+# Subidas simultáneas como máximo dentro de una misma petición
+SUBIDA_CONCURRENCIA = int(os.getenv("SUBIDA_CONCURRENCIA", "4"))
+
+# Firmas de los formatos de imagen aceptados: (prefijo, content-type, extensión)
+FIRMAS_IMAGEN = [
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"GIF87a", "image/gif", ".gif"),
+    (b"GIF89a", "image/gif", ".gif"),
+    (b"BM", "image/bmp", ".bmp"),
+]
+
+
+class ArchivoDemasiadoGrande(Exception):
+    pass
+
+
+def detectar_tipo(cabecera):
+    """Devuelve (content_type, extension) según los primeros bytes o None"""
+    if len(cabecera) >= 12 and cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    for firma, content_type, extension in FIRMAS_IMAGEN:
+        if cabecera.startswith(firma):
+            return content_type, extension
+    return None
+
+
+class ImagenSubida:
+    """Imagen validada lista para enviarse a storage por bloques"""
+
+    def __init__(self, upload, content_type, extension, tamano_maximo):
+        self.upload = upload
+        self.content_type = content_type
+        self.extension = extension
+        self.tamano_maximo = tamano_maximo
+        self.bytes_enviados = 0
+
+    @property
+    def filename(self):
+        return self.upload.filename
+
+    async def bloques(self, tamano_bloque=SUBIDA_TAMANO_BLOQUE):
+        """Generador asíncrono con el contenido del archivo en bloques"""
+        await self.upload.seek(0)
+        self.bytes_enviados = 0
+        while True:
+            bloque = await self.upload.read(tamano_bloque)
+            if not bloque:
+                break
+            self.bytes_enviados += len(bloque)
+            # Por si el tamaño del spool no era conocido de antemano
+            if self.bytes_enviados > self.tamano_maximo:
+                raise ArchivoDemasiadoGrande(
+                    f"El archivo supera el máximo de {self.tamano_maximo} bytes"
+                )
+            yield bloque
+
+
+async def preparar_imagen(upload, tamano_maximo=SUBIDA_TAMANO_MAXIMO):
+    """Valida tamaño y tipo de una imagen sin leerla completa.
+
+    Lanza HTTPException 413 si es demasiado grande y 415 si no es una imagen.
+    """
+    if upload.size is not None and upload.size > tamano_maximo:
+        raise HTTPException(
+            status_code=413,
+            detail=f"La imagen '{upload.filename}' supera el máximo de {tamano_maximo} bytes"
+        )
+
+    await upload.seek(0)
+    cabecera = await upload.read(16)
+    await upload.seek(0)
+
+    tipo = detectar_tipo(cabecera)
+    if tipo is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"El archivo '{upload.filename}' no es una imagen soportada"
+        )
+
+    content_type, extension = tipo
+    return ImagenSubida(upload, content_type, extension, tamano_maximo)
+
+
+async def subir_imagenes(repo_imagenes, bucket_name, carpeta, imagenes, datos_fila,
+                         concurrencia=SUBIDA_CONCURRENCIA):
+    """Sube varias imágenes en paralelo y registra todas en un único insert.
+
+    `datos_fila` son las columnas comunes de cada fila de `imagenes`
+    (p. ej. {"estacion_id": 3}). Devuelve un resultado por archivo con
+    `ok`, `url` y `error`. Si el insert masivo falla, los objetos ya
+    subidos (y sus variantes) se eliminan de storage para no dejar
+    archivos huérfanos.
+    """
+    semaforo = asyncio.Semaphore(max(1, concurrencia))
+
+    async def subir(imagen):
+        # Nombre generado: dos archivos con el mismo nombre no comparten objeto
+        file_path = f"{carpeta}/{uuid.uuid4().hex}{imagen.extension}"
+        async with semaforo:
+            try:
+                url = await repo_imagenes.subir_en_bloques(bucket_name, file_path, imagen)
+            except Exception as e:
+                return {"archivo": imagen.filename, "path": file_path, "url": None, "ok": False, "error": str(e)}
+            variantes = await subir_derivadas(repo_imagenes, bucket_name, file_path, imagen)
+            return {"archivo": imagen.filename, "path": file_path, "url": url, **variantes, "ok": True, "error": None}
+
+    resultados = await asyncio.gather(*(subir(imagen) for imagen in imagenes))
+    subidas = [r for r in resultados if r["ok"]]
+    if not subidas:
+        return resultados
+
+    # Las columnas de variantes solo se envían si se generaron, así el insert
+    # funciona también sin migrations/variantes_imagenes.sql
+    columnas_variantes = [columna for columna, _, _ in VARIANTES.values()]
+    filas = [
+        {
+            **datos_fila,
+            "url": r["url"],
+            **{c: r[c] for c in columnas_variantes if c in r},
+            "created_at": datetime.utcnow().isoformat()
+        }
+        for r in subidas
+    ]
+    try:
+        await repo_imagenes.crear_varias(filas)
+    except Exception as e:
+        logger.warning("Error al registrar imágenes, revirtiendo %s archivos: %s", len(subidas), e)
+        try:
+            paths = []
+            for r in subidas:
+                paths += [r["path"], *rutas_derivadas(r["path"])]
+            await repo_imagenes.eliminar_archivos(bucket_name, paths)
+        except Exception as rollback_error:
+            logger.error("Error al revertir archivos subidos: %s", rollback_error)
+        for r in subidas:
+            r.update({"ok": False, "url": None, "error": f"Error al registrar la imagen: {e}"})
+            for columna in columnas_variantes:
+                r.pop(columna, None)
+
+    return resultados
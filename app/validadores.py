@@ -0,0 +1,191 @@
+"""ETag, peticiones condicionales y Cache-Control para las lecturas de la API.
+
+El middleware cubre los listados y detalles de buses y estaciones:
+
+- El ETag es un hash del cuerpo sin comprimir. Así coincide entre workers y
+  no depende de cuándo se cargó cada caché. Se envía siempre débil (W/):
+  el mismo valor sirve para la respuesta comprimida y para la que no lo
+  está, y el 304 directo lleva el mismo ETag que el 200 correspondiente.
+- Por cada URL se recuerda el último ETag junto con la versión de la caché
+  de su entidad (`cache_buses.version` / `cache_estaciones.version`). Si
+  llega `If-None-Match` con ese ETag, la versión no cambió y no venció el TTL
+  de la caché, se responde 304 sin ejecutar el endpoint ni serializar nada.
+- Los endpoints de escritura ya invalidan la caché de lectura y cada
+  invalidación sube la versión, así que también renuevan los validadores.
+- Si el endpoint se ejecuta y el hash coincide con `If-None-Match`, se
+  responde igualmente 304 (sin cuerpo).
+
+Cache-Control se configura por entidad con HTTP_CACHE_CONTROL_BUSES y
+HTTP_CACHE_CONTROL_ESTACIONES (por ejemplo "max-age=5, stale-while-revalidate=30").
+"""
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from .cache import CACHE_MAX_ENTRADAS, cache_buses, cache_estaciones
+
+HTTP_CACHE_CONTROL = {
+    "buses": os.getenv("HTTP_CACHE_CONTROL_BUSES", "private, max-age=5, stale-while-revalidate=30"),
+    "estaciones": os.getenv("HTTP_CACHE_CONTROL_ESTACIONES", "private, max-age=10, stale-while-revalidate=60"),
+}
+
+# Rutas con validadores: patrón -> caché de la entidad
+RUTAS_VALIDADAS = [
+    (re.compile(r"^/api/buses/?$"), "buses"),
+    (re.compile(r"^/api/buses/\d+$"), "buses"),
+    (re.compile(r"^/api/estaciones/?$"), "estaciones"),
+    (re.compile(r"^/api/estaciones/\d+$"), "estaciones"),
+]
+
+CACHES = {
+    "buses": cache_buses,
+    "estaciones": cache_estaciones,
+}
+
+
+def calcular_etag(cuerpo):
+    return 'W/"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"'
+
+
+def coincide_etag(if_none_match, etag):
+    """Indica si el ETag está en la cabecera If-None-Match (o si es "*").
+
+    La comparación es débil, como pide RFC 9110 para If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    etags_cliente = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return etag.removeprefix("W/") in etags_cliente or "*" in etags_cliente
+
+
+def entidad_de_ruta(path):
+    for patron, entidad in RUTAS_VALIDADAS:
+        if patron.match(path):
+            return entidad
+    return None
+
+
+class RegistroValidadores:
+    """Último ETag de cada URL con la versión de caché con la que se calculó"""
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS):
+        self.max_entradas = max(1, max_entradas)
+        self._entradas = OrderedDict()
+        self.respuestas_304_directas = 0
+        self.respuestas_304 = 0
+        self.respuestas_200 = 0
+
+    def vigente(self, clave, entidad):
+        """ETag recordado si sigue valiendo para la versión actual de la caché"""
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        etag, version, expira = entrada
+        cache = CACHES[entidad]
+        if version != cache.version or expira < time.monotonic():
+            del self._entradas[clave]
+            return None
+        self._entradas.move_to_end(clave)
+        return etag
+
+    def guardar(self, clave, entidad, etag, version):
+        cache = CACHES[entidad]
+        # Si hubo una escritura mientras se calculaba, el ETag ya nació viejo
+        if version != cache.version or not cache.ttl:
+            return
+        self._entradas[clave] = (etag, version, time.monotonic() + cache.ttl)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def estadisticas(self):
+        return {
+            "entradas": len(self._entradas),
+            "respuestas_304_directas": self.respuestas_304_directas,
+            "respuestas_304": self.respuestas_304,
+            "respuestas_200": self.respuestas_200,
+        }
+
+
+validadores = RegistroValidadores()
+
+
+def _cabeceras_validacion(etag, entidad):
+    return [
+        (b"etag", etag.encode()),
+        (b"cache-control", HTTP_CACHE_CONTROL[entidad].encode()),
+    ]
+
+
+class MiddlewareValidadores:
+    """Middleware ASGI con ETag y respuestas 304 para lecturas de buses y estaciones"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        entidad = entidad_de_ruta(scope["path"])
+        if entidad is None:
+            await self.app(scope, receive, send)
+            return
+
+        clave = (scope["path"], scope["query_string"])
+        if_none_match = None
+        for nombre, valor in scope["headers"]:
+            if nombre == b"if-none-match":
+                if_none_match = valor.decode("latin-1")
+                break
+
+        # Camino rápido: el ETag del cliente sigue siendo el actual
+        etag = validadores.vigente(clave, entidad)
+        if etag is not None and coincide_etag(if_none_match, etag):
+            validadores.respuestas_304_directas += 1
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": _cabeceras_validacion(etag, entidad)})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        version = CACHES[entidad].version
+        inicio = None
+        partes = []
+
+        async def enviar(mensaje):
+            nonlocal inicio
+            if mensaje["type"] == "http.response.start":
+                if mensaje["status"] != 200:
+                    inicio = False
+                    await send(mensaje)
+                else:
+                    inicio = mensaje
+                return
+            if mensaje["type"] != "http.response.body" or inicio is False:
+                await send(mensaje)
+                return
+
+            partes.append(mensaje.get("body", b""))
+            if mensaje.get("more_body", False):
+                return
+
+            cuerpo = b"".join(partes)
+            etag = calcular_etag(cuerpo)
+            validadores.guardar(clave, entidad, etag, version)
+            cabeceras = [
+                (n, v) for n, v in inicio.get("headers", [])
+                if n.lower() not in (b"etag", b"cache-control")
+            ] + _cabeceras_validacion(etag, entidad)
+
+            if coincide_etag(if_none_match, etag):
+                validadores.respuestas_304 += 1
+                cabeceras = [(n, v) for n, v in cabeceras if n.lower() not in (b"content-length", b"content-type")]
+                await send({**inicio, "status": 304, "headers": cabeceras})
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                validadores.respuestas_200 += 1
+                await send({**inicio, "headers": cabeceras})
+                await send({"type": "http.response.body", "body": cuerpo})
+
+        await self.app(scope, receive, enviar)
@@ -2,93 +2,118 @@ import uvicorn
 import logging
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from jinja2 import Environment, FileSystemLoader
-from app.routers import buses, estaciones
+from app.routers import (
+    buses, busqueda, estaciones, exportacion, facetas, importacion, metricas, panel, rutas, salud, trayectos
+)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
-from app.database import inicializar_storage
+from app.database import registro_clientes
+from app.almacenamiento import estado_storage, STORAGE_INICIO
+from app.ejecutor import ejecutor
+from app.instrumentacion import MiddlewareInstrumentacion
+from app.validadores import MiddlewareValidadores
+from app.respuestas import MiddlewareCompresion, RespuestaJSON
+from app.bitacora import MiddlewareIdPeticion, bitacora
+from app.plantillas import MODO_DESARROLLO, paginas
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Configurar logging (cola no bloqueante, JSON y muestreo; ver app/bitacora.py)
+bitacora.configurar()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Sistema de Gestión de Buses")
+app = FastAPI(title="Sistema de Gestión de Buses", default_response_class=RespuestaJSON)
+
+
+@app.on_event("startup")
+async def configurar_logging():
+    # uvicorn.run configura sus loggers después de importar este módulo
+    bitacora.configurar()
+
 
-# Inicializar storage con manejo de errores mejorado
-try:
-    logger.info("🔄 Iniciando inicialización de storage...")
-    storage_ok, supabase_url, supabase_key = inicializar_storage()
-    if storage_ok:
-        logger.info("✅ Storage inicializado correctamente")
-    else:
-        logger.warning("⚠️ No se pudo inicializar el storage, verifique los logs")
+@app.on_event("startup")
+async def precargar_plantillas():
+    # En producción se compilan y pre-renderizan todas las páginas al arrancar
+    if MODO_DESARROLLO:
+        return
+    resultado = paginas.precargar()
+    logger.info("Plantillas pre-renderizadas: %s", len(resultado['paginas']))
+    for nombre, error in resultado["errores"].items():
+        logger.error("❌ Error al pre-renderizar %s: %s", nombre, error)
 
+
+@app.on_event("startup")
+async def iniciar_clientes():
     # Verificar credenciales
-    if not supabase_url or not supabase_key:
+    if not registro_clientes.url or not registro_clientes.key:
         logger.error("❌ Credenciales de Supabase no configuradas correctamente")
-    else:
-        logger.info(f"ℹ️ Usando Supabase URL: {supabase_url}")
+        return
+    logger.info("ℹ️ Usando Supabase URL: %s", registro_clientes.url)
 
-    # Intentar una prueba directa de storage
+    # El cliente asíncrono se crea una sola vez y atiende todas las peticiones;
+    # el pool síncrono solo se crea si algo lo pide (scripts, mantenimiento)
     try:
-        from app.database import get_db
-        supabase = get_db()
-        test_file = "test.txt"
-        test_bucket = "buses-imagenes"
-        test_content = b"test content"
+        await registro_clientes.obtener_async()
+    except Exception as e:
+        logger.error("❌ Error al crear los clientes de Supabase: %s", e)
+        return
 
-        # Intentar listar buckets
-        buckets = supabase.storage.list_buckets()
-        logger.info(f"ℹ️ Buckets disponibles: {[b['name'] for b in buckets]}")
+    # La verificación de buckets no bloquea el arranque; en modo "lazy"
+    # se hace la primera vez que se consulta el estado del storage
+    if STORAGE_INICIO == "background":
+        estado_storage.iniciar_en_segundo_plano(registro_clientes.obtener_async)
 
-        # Intentar subir un archivo de prueba
-        supabase.storage.from_(test_bucket).upload(test_file, test_content)
-        logger.info(f"✅ Prueba de subida exitosa a {test_bucket}/{test_file}")
 
-        # Limpiar el archivo de prueba
-        supabase.storage.from_(test_bucket).remove([test_file])
-    except Exception as test_error:
-        logger.error(f"❌ Prueba de storage falló: {str(test_error)}")
+@app.on_event("shutdown")
+async def cerrar_clientes():
+    await registro_clientes.cerrar_async()
+    registro_clientes.cerrar()
+    ejecutor.cerrar()
 
-except Exception as e:
-    logger.error(f"❌ Error al inicializar storage: {str(e)}")
 
-# Archivos estáticos y templates
+# Archivos estáticos
 app.mount("/static", StaticFiles(directory="static"), name="static")
-jinja_env = Environment(
-    loader=FileSystemLoader("templates"),
-    auto_reload=True,
-    cache_size=0
-)
-templates = Jinja2Templates(directory="templates")
-templates.env = jinja_env
 
-# Configuración de CORS
+# ETag y 304 para las lecturas de buses y estaciones
+app.add_middleware(MiddlewareValidadores)
+# Compresión brotli/gzip negociada (por fuera de los ETag, que se calculan sin comprimir)
+app.add_middleware(MiddlewareCompresion)
+# Tiempos de las llamadas a Supabase por petición (Server-Timing, logs y /metrics)
+app.add_middleware(MiddlewareInstrumentacion)
+# Id de petición (X-Request-ID) para correlacionar los logs
+app.add_middleware(MiddlewareIdPeticion)
+# Configuración de CORS. Va por fuera de todo (se registra al final) para que
+# también lleven sus cabeceras las respuestas que un middleware interno
+# contesta sin llamar a la app, como los 304 directos de MiddlewareValidadores
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID", "ETag"],
 )
 
 # Ruta principal
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     try:
-        return templates.TemplateResponse(
-            "index.html",
-            {"request": request}
-        )
+        return paginas.respuesta(request, "index.html")
     except Exception as e:
-        print(f"Error rendering template: {str(e)}")
+        logger.exception("Error al renderizar la plantilla principal")
         # Fallback básico
         return HTMLResponse(content="<html><body><h1>Sistema de Gestión de Buses</h1><p>Error cargando la plantilla.</p></body></html>")
 
 # Routers
 app.include_router(buses.router)
 app.include_router(estaciones.router)
+app.include_router(busqueda.router)
+app.include_router(importacion.router)
+app.include_router(exportacion.router)
+app.include_router(facetas.router)
+app.include_router(panel.router)
+app.include_router(rutas.router)
+app.include_router(trayectos.router)
+app.include_router(salud.router)
+app.include_router(metricas.router)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=MODO_DESARROLLO)
@@ -0,0 +1,109 @@
+-- Script para crear las tablas de rutas (secuencias ordenadas de paradas)
+
+-- 1. Rutas
+CREATE TABLE IF NOT EXISTS public.rutas (
+  id BIGSERIAL PRIMARY KEY,
+  nombre TEXT NOT NULL,
+  descripcion TEXT,
+  esta_activa BOOLEAN DEFAULT TRUE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+);
+
+-- 2. Paradas de cada ruta en orden (una estación puede repetirse en rutas circulares)
+CREATE TABLE IF NOT EXISTS public.ruta_paradas (
+  id BIGSERIAL PRIMARY KEY,
+  ruta_id BIGINT NOT NULL REFERENCES public.rutas(id) ON DELETE CASCADE,
+  estacion_id BIGINT NOT NULL REFERENCES public.estaciones(id) ON DELETE CASCADE,
+  orden INTEGER NOT NULL,
+  CONSTRAINT ruta_paradas_orden_unique UNIQUE (ruta_id, orden)
+);
+
+-- 3. Buses asignados a cada ruta
+CREATE TABLE IF NOT EXISTS public.bus_ruta (
+  id BIGSERIAL PRIMARY KEY,
+  bus_id BIGINT NOT NULL REFERENCES public.buses(id) ON DELETE CASCADE,
+  ruta_id BIGINT NOT NULL REFERENCES public.rutas(id) ON DELETE CASCADE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+  CONSTRAINT bus_ruta_unique UNIQUE (bus_id, ruta_id)
+);
+
+-- 4. Índices para las búsquedas por estación y por bus
+CREATE INDEX IF NOT EXISTS idx_ruta_paradas_estacion_id ON public.ruta_paradas(estacion_id);
+CREATE INDEX IF NOT EXISTS idx_bus_ruta_ruta_id ON public.bus_ruta(ruta_id);
+
+-- 5. Escrituras en una sola transacción (se llaman por RPC desde /api/rutas)
+-- Si falla una parada o un bus (por ejemplo una estación que no existe) no
+-- queda una ruta a medias ni se pierden las paradas y buses anteriores.
+CREATE OR REPLACE FUNCTION public.crear_ruta(
+  p_ruta JSONB, p_paradas BIGINT[], p_buses BIGINT[]
+) RETURNS SETOF public.rutas AS $$
+DECLARE
+  v_ruta_id BIGINT;
+BEGIN
+  INSERT INTO public.rutas (nombre, descripcion, esta_activa, created_at)
+  VALUES (
+    p_ruta->>'nombre',
+    p_ruta->>'descripcion',
+    COALESCE((p_ruta->>'esta_activa')::BOOLEAN, TRUE),
+    COALESCE((p_ruta->>'created_at')::TIMESTAMPTZ, timezone('utc'::text, now()))
+  )
+  RETURNING id INTO v_ruta_id;
+
+  INSERT INTO public.ruta_paradas (ruta_id, estacion_id, orden)
+  SELECT v_ruta_id, p.estacion_id, p.posicion - 1
+  FROM unnest(COALESCE(p_paradas, '{}')) WITH ORDINALITY AS p(estacion_id, posicion);
+
+  INSERT INTO public.bus_ruta (ruta_id, bus_id)
+  SELECT DISTINCT v_ruta_id, b.bus_id
+  FROM unnest(COALESCE(p_buses, '{}')) AS b(bus_id);
+
+  RETURN QUERY SELECT * FROM public.rutas WHERE id = v_ruta_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- p_paradas / p_buses en NULL dejan sin cambios las paradas / buses actuales.
+-- Devuelve la ruta actualizada (ninguna fila si no existe).
+CREATE OR REPLACE FUNCTION public.actualizar_ruta(
+  p_ruta_id BIGINT, p_cambios JSONB, p_paradas BIGINT[], p_buses BIGINT[]
+) RETURNS SETOF public.rutas AS $$
+BEGIN
+  UPDATE public.rutas SET
+    nombre = COALESCE(p_cambios->>'nombre', nombre),
+    descripcion = CASE WHEN p_cambios ? 'descripcion' THEN p_cambios->>'descripcion' ELSE descripcion END,
+    esta_activa = COALESCE((p_cambios->>'esta_activa')::BOOLEAN, esta_activa),
+    updated_at = COALESCE((p_cambios->>'updated_at')::TIMESTAMPTZ, timezone('utc'::text, now()))
+  WHERE id = p_ruta_id;
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  IF p_paradas IS NOT NULL THEN
+    DELETE FROM public.ruta_paradas WHERE ruta_id = p_ruta_id;
+    INSERT INTO public.ruta_paradas (ruta_id, estacion_id, orden)
+    SELECT p_ruta_id, p.estacion_id, p.posicion - 1
+    FROM unnest(p_paradas) WITH ORDINALITY AS p(estacion_id, posicion);
+  END IF;
+
+  IF p_buses IS NOT NULL THEN
+    DELETE FROM public.bus_ruta WHERE ruta_id = p_ruta_id;
+    INSERT INTO public.bus_ruta (ruta_id, bus_id)
+    SELECT DISTINCT p_ruta_id, b.bus_id
+    FROM unnest(p_buses) AS b(bus_id);
+  END IF;
+
+  RETURN QUERY SELECT * FROM public.rutas WHERE id = p_ruta_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Comentarios explicativos
+COMMENT ON TABLE public.rutas IS 'Rutas de transporte con su secuencia de paradas';
+COMMENT ON TABLE public.ruta_paradas IS 'Estaciones de cada ruta con su posición (orden) en el recorrido';
+COMMENT ON TABLE public.bus_ruta IS 'Relación muchos a muchos entre buses y rutas';
+
+-- INSTRUCCIONES DE USO:
+-- 1. Ejecuta este script en tu base de datos Supabase (después de crear buses y estaciones)
+-- 2. Las rutas se gestionan desde /api/rutas
+-- 3. Si el script es anterior a las funciones crear_ruta / actualizar_ruta,
+--    vuelve a ejecutarlo (todo es idempotente); mientras falten, la API
+--    escribe paso a paso y deshace a mano lo que haya quedado a medias.
@@ -0,0 +1,90 @@
+-- Script para crear la tabla de facetas (valores distintos y conteos)
+-- La tabla se mantiene con triggers, así que leerla cuesta O(valores distintos)
+-- y no O(filas) como un SELECT DISTINCT sobre buses o estaciones.
+
+-- 1. Tabla de facetas
+CREATE TABLE IF NOT EXISTS public.facetas (
+  entidad TEXT NOT NULL,           -- 'buses' o 'estaciones'
+  campo TEXT NOT NULL,             -- 'tipo' o 'localidad'
+  valor TEXT NOT NULL,
+  activos BIGINT NOT NULL DEFAULT 0,
+  inactivos BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (entidad, campo, valor)
+);
+
+-- 2. Función que suma (o resta) una fila a su faceta
+CREATE OR REPLACE FUNCTION public.ajustar_faceta(
+  p_entidad TEXT, p_campo TEXT, p_valor TEXT, p_activo BOOLEAN, p_delta INTEGER
+) RETURNS VOID AS $$
+BEGIN
+  IF p_valor IS NULL THEN
+    RETURN;
+  END IF;
+  INSERT INTO public.facetas AS f (entidad, campo, valor, activos, inactivos)
+  VALUES (
+    p_entidad, p_campo, p_valor,
+    CASE WHEN COALESCE(p_activo, TRUE) THEN p_delta ELSE 0 END,
+    CASE WHEN COALESCE(p_activo, TRUE) THEN 0 ELSE p_delta END
+  )
+  ON CONFLICT (entidad, campo, valor) DO UPDATE
+    SET activos = f.activos + EXCLUDED.activos,
+        inactivos = f.inactivos + EXCLUDED.inactivos;
+  DELETE FROM public.facetas
+  WHERE entidad = p_entidad AND campo = p_campo AND valor = p_valor
+    AND activos <= 0 AND inactivos <= 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Triggers de buses (campo tipo) y estaciones (campo localidad)
+CREATE OR REPLACE FUNCTION public.facetas_buses() RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.ajustar_faceta('buses', 'tipo', OLD.tipo, OLD.esta_activo, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.ajustar_faceta('buses', 'tipo', NEW.tipo, NEW.esta_activo, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.facetas_estaciones() RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.ajustar_faceta('estaciones', 'localidad', OLD.localidad, OLD.esta_activo, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.ajustar_faceta('estaciones', 'localidad', NEW.localidad, NEW.esta_activo, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_facetas_buses ON public.buses;
+CREATE TRIGGER trg_facetas_buses
+AFTER INSERT OR DELETE OR UPDATE OF tipo, esta_activo ON public.buses
+FOR EACH ROW EXECUTE FUNCTION public.facetas_buses();
+
+DROP TRIGGER IF EXISTS trg_facetas_estaciones ON public.estaciones;
+CREATE TRIGGER trg_facetas_estaciones
+AFTER INSERT OR DELETE OR UPDATE OF localidad, esta_activo ON public.estaciones
+FOR EACH ROW EXECUTE FUNCTION public.facetas_estaciones();
+
+-- 4. Carga inicial con los datos existentes
+DELETE FROM public.facetas;
+INSERT INTO public.facetas (entidad, campo, valor, activos, inactivos)
+SELECT 'buses', 'tipo', tipo,
+       COUNT(*) FILTER (WHERE COALESCE(esta_activo, TRUE)),
+       COUNT(*) FILTER (WHERE NOT COALESCE(esta_activo, TRUE))
+FROM public.buses WHERE tipo IS NOT NULL GROUP BY tipo;
+INSERT INTO public.facetas (entidad, campo, valor, activos, inactivos)
+SELECT 'estaciones', 'localidad', localidad,
+       COUNT(*) FILTER (WHERE COALESCE(esta_activo, TRUE)),
+       COUNT(*) FILTER (WHERE NOT COALESCE(esta_activo, TRUE))
+FROM public.estaciones WHERE localidad IS NOT NULL GROUP BY localidad;
+
+COMMENT ON TABLE public.facetas IS 'Valores distintos de tipo (buses) y localidad (estaciones) con conteos de activos/inactivos, mantenidos por triggers';
+
+-- INSTRUCCIONES DE USO:
+-- 1. Ejecuta este script en tu base de datos Supabase
+-- 2. Las facetas se consultan en /api/facetas y /api/estaciones/localidades
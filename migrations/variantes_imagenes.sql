@@ -0,0 +1,14 @@
+-- Script para guardar las variantes reducidas de cada imagen
+
+-- 1. Columnas con las URLs de la miniatura y de la versión WebP
+ALTER TABLE imagenes ADD COLUMN IF NOT EXISTS miniatura_url TEXT;
+ALTER TABLE imagenes ADD COLUMN IF NOT EXISTS webp_url TEXT;
+
+-- 2. Comentarios explicativos
+COMMENT ON COLUMN imagenes.miniatura_url IS 'Miniatura WebP (lado mayor IMAGEN_MINIATURA_LADO) o NULL si no se generó';
+COMMENT ON COLUMN imagenes.webp_url IS 'Versión WebP de tamaño acotado (IMAGEN_WEBP_LADO) o NULL si no se generó';
+
+-- INSTRUCCIONES DE USO:
+-- 1. Ejecuta este script en tu base de datos Supabase antes de desplegar
+-- 2. Las imágenes existentes seguirán usando la URL original (url)
+-- 3. Instala Pillow para que las nuevas subidas generen sus variantes
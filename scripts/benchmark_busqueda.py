@@ -0,0 +1,119 @@
+"""Mide la latencia del índice de búsqueda en memoria con datos sintéticos.
+
+Uso:
+    python scripts/benchmark_busqueda.py
+    python scripts/benchmark_busqueda.py --buses 20000 --estaciones 50000 --objetivo-p99-ms 25
+
+Construye el mismo índice que usa /api/buscar (sin Supabase) con nombres
+generados al azar y ejecuta consultas exactas, con errores de tipeo y de
+autocompletado. Informa p50/p95/p99 por tipo de consulta y termina con
+código 2 si algún p99 supera el objetivo.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.busqueda import IndiceBusqueda
+
+PALABRAS = [
+    "portal", "norte", "sur", "calle", "avenida", "carrera", "centro", "museo", "parque",
+    "estadio", "universidad", "hospital", "plaza", "mercado", "terminal", "aeropuerto",
+    "américas", "bolívar", "libertador", "las", "flores", "san", "josé", "cedritos",
+    "usaquén", "suba", "kennedy", "bosa", "tintal", "ricaurte", "héroes", "marly",
+]
+LOCALIDADES = ["Usaquén", "Chapinero", "Santa Fe", "Suba", "Kennedy", "Bosa", "Engativá", "Fontibón"]
+
+
+def nombre_aleatorio(rng):
+    return " ".join(rng.choice(PALABRAS) for _ in range(rng.randint(1, 3))).title() + f" {rng.randint(1, 200)}"
+
+
+def con_error(rng, texto):
+    """Cambia, borra o duplica una letra al azar"""
+    i = rng.randrange(len(texto))
+    cambio = rng.choice(["cambiar", "borrar", "duplicar"])
+    if cambio == "cambiar":
+        return texto[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + texto[i + 1:]
+    if cambio == "borrar":
+        return texto[:i] + texto[i + 1:]
+    return texto[:i] + texto[i] + texto[i:]
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+
+    def p(q):
+        return round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * q))], 3)
+
+    return {"p50_ms": p(0.50), "p95_ms": p(0.95), "p99_ms": p(0.99)}
+
+
+async def ejecutar(args):
+    rng = random.Random(args.semilla)
+    buses = [{"id": i, "nombre": nombre_aleatorio(rng), "esta_activo": rng.random() > 0.2}
+             for i in range(1, args.buses + 1)]
+    estaciones = [{"id": i, "nombre": nombre_aleatorio(rng), "localidad": rng.choice(LOCALIDADES),
+                   "esta_activo": rng.random() > 0.2}
+                  for i in range(1, args.estaciones + 1)]
+
+    indice = IndiceBusqueda()
+
+    async def cargar():
+        return {"buses": buses, "estaciones": estaciones}
+
+    inicio = time.perf_counter()
+    await indice.asegurar(cargar)
+    carga_ms = round((time.perf_counter() - inicio) * 1000, 1)
+    print(f"Índice: {indice.estado()['documentos']} documentos cargados en {carga_ms} ms")
+
+    nombres = [d["nombre"] for d in buses + estaciones]
+    consultas = {
+        "exacta": lambda: (rng.choice(PALABRAS), False),
+        "con_error": lambda: (con_error(rng, rng.choice(PALABRAS)), False),
+        "dos_palabras": lambda: (" ".join(rng.choice(nombres).split()[:2]), False),
+        "prefijo": lambda: (rng.choice(PALABRAS)[:rng.randint(2, 4)], True),
+    }
+
+    resultados = {"documentos": len(nombres), "carga_ms": carga_ms, "consultas": {}}
+    fallo = False
+    for tipo, generar in consultas.items():
+        tiempos = []
+        for _ in range(args.repeticiones):
+            texto, prefijo = generar()
+            inicio = time.perf_counter()
+            indice.buscar(texto, prefijo=prefijo, limite=args.limite)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        medidas = percentiles(tiempos)
+        resultados["consultas"][tipo] = medidas
+        supera = medidas["p99_ms"] > args.objetivo_p99_ms
+        fallo = fallo or supera
+        print(f"{tipo:>13}: p50 {medidas['p50_ms']:>8} ms  p95 {medidas['p95_ms']:>8} ms  "
+              f"p99 {medidas['p99_ms']:>8} ms {'❌' if supera else '✅'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+    return 2 if fallo else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del índice de búsqueda")
+    parser.add_argument("--buses", type=int, default=5000)
+    parser.add_argument("--estaciones", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=500, help="consultas por tipo")
+    parser.add_argument("--limite", type=int, default=20, help="resultados por página")
+    parser.add_argument("--objetivo-p99-ms", type=float, default=50.0)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(ejecutar(args)))
+
+
+if __name__ == "__main__":
+    main()
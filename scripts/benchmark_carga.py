@@ -0,0 +1,343 @@
+"""Prueba de carga reproducible de la API contra un Supabase falso local.
+
+Uso:
+    python scripts/benchmark_carga.py
+    python scripts/benchmark_carga.py --peticiones 5000 --concurrencia 32 --latencia-ms 15 \\
+        --json resultados/actual.json --comparar resultados/anterior.json
+
+Arranca scripts/supabase_falso.py (con la latencia indicada) y la aplicación
+con uvicorn en procesos separados, carga datos de prueba y ejecuta una
+mezcla de operaciones con `--concurrencia` clientes simultáneos:
+
+- listar_buses:       GET /api/buses?limit=20
+- obtener_estacion:   GET /api/estaciones/{id}
+- crear_bus:          POST /api/buses con una imagen JPEG
+- eliminar_estacion:  DELETE /api/estaciones/{id} (estación con imágenes)
+
+Las proporciones se cambian con --mezcla. Informa rendimiento (peticiones
+por segundo) y p50/p95/p99 por operación; con --json guarda los resultados
+(junto con el commit y los parámetros) y con --comparar muestra la
+diferencia con un resultado anterior.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cualquier clave con forma de JWT sirve para el servidor falso
+CLAVE_FALSA = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark"
+
+MEZCLA_POR_DEFECTO = "listar_buses=50,obtener_estacion=30,crear_bus=15,eliminar_estacion=5"
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def imagen_de_prueba():
+    """JPEG de 640x480 (o solo la cabecera si Pillow no está instalado)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b"\xff\xd8\xff\xe0" + b"0" * 20000
+    salida = io.BytesIO()
+    Image.new("RGB", (640, 480), (30, 120, 200)).save(salida, "JPEG", quality=85)
+    return salida.getvalue()
+
+
+def parsear_mezcla(texto):
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        if nombre.strip() not in OPERACIONES:
+            raise SystemExit(f"Operación desconocida en --mezcla: {nombre}")
+        mezcla[nombre.strip()] = float(peso or 1)
+    return mezcla
+
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+async def esperar_servidor(url, segundos=30):
+    limite = time.monotonic() + segundos
+    async with httpx.AsyncClient() as cliente:
+        while time.monotonic() < limite:
+            try:
+                await cliente.get(url, timeout=2)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise SystemExit(f"El servidor {url} no respondió a tiempo")
+
+
+# --- Datos de prueba ---
+
+async def sembrar(url_supabase, buses, estaciones, eliminables):
+    """Crea buses, estaciones y estaciones con imágenes directamente en el servidor falso"""
+    cabeceras = {"apikey": CLAVE_FALSA, "Authorization": f"Bearer {CLAVE_FALSA}"}
+    ahora = datetime.utcnow().isoformat()
+    async with httpx.AsyncClient(base_url=url_supabase, headers=cabeceras, timeout=60) as cliente:
+        async def insertar(tabla, filas):
+            respuesta = await cliente.post(f"/rest/v1/{tabla}", json=filas)
+            respuesta.raise_for_status()
+            return [f["id"] for f in respuesta.json()]
+
+        bus_ids = await insertar("buses", [
+            {"nombre": f"Bus {i}", "tipo": random.choice(["articulado", "alimentador", "dual"]),
+             "esta_activo": i % 5 != 0, "created_at": ahora}
+            for i in range(buses)
+        ])
+        estacion_ids = await insertar("estaciones", [
+            {"nombre": f"Estación {i}", "localidad": f"Localidad {i % 20}", "esta_activo": True, "created_at": ahora}
+            for i in range(estaciones + eliminables)
+        ])
+        await insertar("bus_estacion", [
+            {"bus_id": b, "estacion_id": e} for e in estacion_ids for b in random.sample(bus_ids, min(2, len(bus_ids)))
+        ])
+
+        # Las estaciones eliminables tienen dos imágenes en storage cada una
+        eliminables_ids = estacion_ids[estaciones:]
+        imagenes = []
+        for estacion_id in eliminables_ids:
+            for n in range(2):
+                ruta = f"{estacion_id}/foto{n}.jpg"
+                await cliente.post(f"/storage/v1/object/estaciones-imagenes/{ruta}", content=b"jpg",
+                                   headers={"content-type": "image/jpeg"})
+                imagenes.append({
+                    "estacion_id": estacion_id,
+                    "url": f"{url_supabase}/storage/v1/object/public/estaciones-imagenes/{ruta}",
+                })
+        if imagenes:
+            await insertar("imagenes", imagenes)
+    return estacion_ids[:estaciones], eliminables_ids
+
+
+# --- Operaciones ---
+
+async def listar_buses(cliente, estado):
+    return await cliente.get("/api/buses", params={"limit": 20})
+
+
+async def obtener_estacion(cliente, estado):
+    return await cliente.get(f"/api/estaciones/{random.choice(estado['estaciones'])}")
+
+
+async def crear_bus(cliente, estado):
+    return await cliente.post(
+        "/api/buses",
+        data={"nombre": f"Bus carga {random.randrange(10 ** 6)}", "tipo": "articulado", "esta_activo": "true"},
+        files={"imagen": ("foto.jpg", estado["imagen"], "image/jpeg")}
+    )
+
+
+async def eliminar_estacion(cliente, estado):
+    if not estado["eliminables"]:
+        return None
+    return await cliente.delete(f"/api/estaciones/{estado['eliminables'].pop()}")
+
+
+OPERACIONES = {
+    "listar_buses": listar_buses,
+    "obtener_estacion": obtener_estacion,
+    "crear_bus": crear_bus,
+    "eliminar_estacion": eliminar_estacion,
+}
+
+
+# --- Ejecución y resultados ---
+
+def percentil(valores, q):
+    return round(valores[min(len(valores) - 1, int(len(valores) * q))], 2) if valores else None
+
+
+def resumir(mediciones, duracion):
+    resumen = {}
+    for nombre, datos in sorted(mediciones.items()):
+        tiempos = sorted(datos["tiempos"])
+        resumen[nombre] = {
+            "peticiones": len(tiempos),
+            "errores": datos["errores"],
+            "rps": round(len(tiempos) / duracion, 1),
+            "p50_ms": percentil(tiempos, 0.50),
+            "p95_ms": percentil(tiempos, 0.95),
+            "p99_ms": percentil(tiempos, 0.99),
+            "max_ms": round(tiempos[-1], 2) if tiempos else None,
+        }
+    return resumen
+
+
+async def ejecutar_mezcla(url_app, estado, mezcla, peticiones, concurrencia):
+    nombres = list(mezcla)
+    pesos = [mezcla[n] for n in nombres]
+    mediciones = {n: {"tiempos": [], "errores": 0} for n in nombres}
+    restantes = [peticiones]
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+
+    async with httpx.AsyncClient(base_url=url_app, timeout=60, limits=limites) as cliente:
+        async def trabajador():
+            while restantes[0] > 0:
+                restantes[0] -= 1
+                nombre = random.choices(nombres, pesos)[0]
+                inicio = time.perf_counter()
+                try:
+                    respuesta = await OPERACIONES[nombre](cliente, estado)
+                    if respuesta is None:
+                        continue
+                    error = respuesta.status_code >= 400
+                except httpx.HTTPError:
+                    error = True
+                mediciones[nombre]["tiempos"].append((time.perf_counter() - inicio) * 1000)
+                mediciones[nombre]["errores"] += error
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+        duracion = time.perf_counter() - inicio
+    return mediciones, duracion
+
+
+def imprimir(resultado):
+    total = resultado["total"]
+    print(f"\n{total['peticiones']} peticiones en {total['duracion_s']} s -> {total['rps']} req/s "
+          f"({total['errores']} errores)")
+    print(f"{'operación':<18}{'n':>7}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for nombre, r in resultado["operaciones"].items():
+        print(f"{nombre:<18}{r['peticiones']:>7}{r['errores']:>6}{r['rps']:>9}"
+              f"{r['p50_ms']!s:>9}{r['p95_ms']!s:>9}{r['p99_ms']!s:>9}{r['max_ms']!s:>9}")
+
+
+def comparar(actual, anterior):
+    print(f"\nComparación con {anterior.get('commit') or 'resultado anterior'}:")
+
+    def delta(nuevo, viejo):
+        if not nuevo or not viejo:
+            return "   -"
+        return f"{(nuevo - viejo) / viejo * 100:+.1f}%"
+
+    print(f"  rendimiento: {anterior['total']['rps']} -> {actual['total']['rps']} req/s "
+          f"({delta(actual['total']['rps'], anterior['total']['rps'])})")
+    for nombre, r in actual["operaciones"].items():
+        previo = anterior["operaciones"].get(nombre)
+        if not previo:
+            continue
+        print(f"  {nombre:<18} p95 {previo['p95_ms']} -> {r['p95_ms']} ms ({delta(r['p95_ms'], previo['p95_ms'])})"
+              f"  p99 {previo['p99_ms']} -> {r['p99_ms']} ms ({delta(r['p99_ms'], previo['p99_ms'])})")
+
+
+async def ejecutar(args):
+    random.seed(args.semilla)
+    mezcla = parsear_mezcla(args.mezcla)
+    puerto_supabase, puerto_app = puerto_libre(), puerto_libre()
+    url_supabase = f"http://127.0.0.1:{puerto_supabase}"
+    url_app = f"http://127.0.0.1:{puerto_app}"
+
+    procesos = []
+    try:
+        procesos.append(subprocess.Popen([
+            sys.executable, os.path.join(RAIZ, "scripts", "supabase_falso.py"),
+            "--puerto", str(puerto_supabase),
+            "--latencia-ms", str(args.latencia_ms), "--variacion-ms", str(args.variacion_ms)
+        ]))
+        await esperar_servidor(f"{url_supabase}/storage/v1/bucket")
+
+        # Las estaciones eliminables alcanzan para todas las eliminaciones previstas
+        eliminaciones = int((args.peticiones + args.calentamiento) * mezcla.get("eliminar_estacion", 0)
+                            / sum(mezcla.values())) + 50
+        estaciones, eliminables = await sembrar(url_supabase, args.buses, args.estaciones, eliminaciones)
+
+        entorno = {
+            **os.environ,
+            "SUPABASE_URL": url_supabase,
+            "SUPABASE_KEY": CLAVE_FALSA,
+            "STORAGE_PRUEBA_ESCRITURA": "false",
+            "APP_MODO": "produccion",
+        }
+        procesos.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(puerto_app),
+            "--workers", str(args.workers), "--log-level", "warning"
+        ], cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL if args.silencioso else None,
+        stderr=subprocess.DEVNULL if args.silencioso else None))
+        await esperar_servidor(f"{url_app}/")
+
+        estado = {"estaciones": estaciones, "eliminables": eliminables, "imagen": imagen_de_prueba()}
+        if args.calentamiento:
+            await ejecutar_mezcla(url_app, estado, mezcla, args.calentamiento, args.concurrencia)
+        mediciones, duracion = await ejecutar_mezcla(url_app, estado, mezcla, args.peticiones, args.concurrencia)
+    finally:
+        for proceso in reversed(procesos):
+            proceso.terminate()
+            try:
+                proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+
+    operaciones = resumir(mediciones, duracion)
+    realizadas = sum(o["peticiones"] for o in operaciones.values())
+    resultado = {
+        "fecha": datetime.utcnow().isoformat() + "Z",
+        "commit": commit_actual(),
+        "parametros": {
+            "peticiones": args.peticiones, "concurrencia": args.concurrencia, "workers": args.workers,
+            "latencia_ms": args.latencia_ms, "variacion_ms": args.variacion_ms, "mezcla": mezcla,
+            "buses": args.buses, "estaciones": args.estaciones, "semilla": args.semilla,
+        },
+        "total": {
+            "peticiones": realizadas,
+            "errores": sum(o["errores"] for o in operaciones.values()),
+            "duracion_s": round(duracion, 2),
+            "rps": round(realizadas / duracion, 1),
+        },
+        "operaciones": operaciones,
+    }
+    imprimir(resultado)
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            comparar(resultado, json.load(f))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.json}")
+    return 0 if not resultado["total"]["errores"] else 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga contra un Supabase falso local")
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--calentamiento", type=int, default=100, help="peticiones previas que no se miden")
+    parser.add_argument("--mezcla", default=MEZCLA_POR_DEFECTO, help="operacion=peso separados por comas")
+    parser.add_argument("--latencia-ms", type=float, default=10.0, help="latencia simulada de Supabase")
+    parser.add_argument("--variacion-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn de la aplicación")
+    parser.add_argument("--buses", type=int, default=500)
+    parser.add_argument("--estaciones", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    parser.add_argument("--comparar", help="resultado JSON anterior con el que comparar")
+    parser.add_argument("--silencioso", action="store_true", help="ocultar la salida de la aplicación")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(ejecutar(args)))
+
+
+if __name__ == "__main__":
+    main()
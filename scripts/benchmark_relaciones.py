@@ -0,0 +1,155 @@
+"""Mide la latencia de las consultas estación->buses y bus->estaciones a
+medida que crece la tabla bus_estacion.
+
+Uso:
+    python scripts/benchmark_relaciones.py
+    python scripts/benchmark_relaciones.py --tamanos 1000 10000 100000 --repeticiones 50
+
+Crea una estación y un bus de prueba con `--por-estacion` asociaciones
+cada uno y, para cada tamaño, rellena bus_estacion con asociaciones entre
+buses y estaciones de relleno hasta ese número de filas. En cada tamaño
+consulta la primera página de la estación y del bus de prueba; como las
+consultas usan los índices por estacion_id y (bus_id, estacion_id), la
+latencia debería mantenerse constante. Al final borra todo lo creado
+(las asociaciones se borran en cascada), salvo con --conservar.
+
+Ejecutar contra una base de datos de pruebas: el script inserta y borra filas.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from supabase import acreate_client
+from app.repositorios import COLUMNAS_RELACION, Repositorios
+
+# Cargar variables de entorno
+load_dotenv()
+
+BUSES_RELLENO = 100
+TAMANO_LOTE = 1000
+
+
+async def insertar(cliente, tabla, filas):
+    """Inserta por lotes y devuelve los ids creados"""
+    ids = []
+    for inicio in range(0, len(filas), TAMANO_LOTE):
+        respuesta = await cliente.table(tabla).insert(filas[inicio:inicio + TAMANO_LOTE]).execute()
+        ids += [f["id"] for f in respuesta.data]
+    return ids
+
+
+def filas_de_prueba(tabla, cantidad, prefijo):
+    ahora = datetime.utcnow().isoformat()
+    if tabla == "buses":
+        return [{"nombre": f"{prefijo}-{i}", "tipo": "benchmark", "esta_activo": True, "created_at": ahora}
+                for i in range(cantidad)]
+    return [{"nombre": f"{prefijo}-{i}", "localidad": "benchmark", "esta_activo": True, "created_at": ahora}
+            for i in range(cantidad)]
+
+
+async def medir(consulta, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await consulta()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "p50_ms": round(statistics.median(tiempos), 2),
+        "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 2),
+    }
+
+
+async def ejecutar(args):
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+    if not supabase_url or not supabase_key:
+        print("Error: No se encontraron las variables de entorno SUPABASE_URL y SUPABASE_KEY")
+        return 1
+
+    cliente = await acreate_client(supabase_url, supabase_key)
+    repos = Repositorios(cliente)
+    buses_creados, estaciones_creadas = [], []
+    resultados = []
+
+    try:
+        # Estación y bus de prueba, cada uno con `por_estacion` asociaciones
+        estaciones_creadas += await insertar(cliente, "estaciones", filas_de_prueba("estaciones", 1, "bench-estacion"))
+        buses_creados += await insertar(cliente, "buses", filas_de_prueba("buses", args.por_estacion, "bench-bus"))
+        estacion_id, bus_id = estaciones_creadas[0], buses_creados[0]
+        otras = await insertar(cliente, "estaciones", filas_de_prueba("estaciones", args.por_estacion - 1, "bench-parada"))
+        estaciones_creadas += otras
+        pares = [(b, estacion_id) for b in buses_creados] + [(bus_id, e) for e in otras]
+        await insertar(cliente, "bus_estacion", [{"bus_id": b, "estacion_id": e} for b, e in pares])
+        asociaciones = len(pares)
+
+        relleno_buses = await insertar(cliente, "buses", filas_de_prueba("buses", BUSES_RELLENO, "bench-relleno"))
+        buses_creados += relleno_buses
+
+        for tamano in sorted(args.tamanos):
+            # Rellenar con pares (bus de relleno, estación de relleno) hasta el tamaño
+            faltan = tamano - asociaciones
+            if faltan > 0:
+                nuevas = await insertar(
+                    cliente, "estaciones",
+                    filas_de_prueba("estaciones", -(-faltan // BUSES_RELLENO), f"bench-relleno-{tamano}")
+                )
+                estaciones_creadas += nuevas
+                filas = [{"bus_id": b, "estacion_id": e} for e in nuevas for b in relleno_buses][:faltan]
+                await insertar(cliente, "bus_estacion", filas)
+                asociaciones += len(filas)
+
+            estacion_buses = await medir(
+                lambda: repos.bus_estacion.buses_de_estacion(estacion_id, COLUMNAS_RELACION["buses"], args.limite),
+                args.repeticiones
+            )
+            bus_estaciones = await medir(
+                lambda: repos.bus_estacion.estaciones_del_bus(bus_id, COLUMNAS_RELACION["estaciones"], args.limite),
+                args.repeticiones
+            )
+            resultados.append({
+                "filas_bus_estacion": asociaciones,
+                "estacion_a_buses": estacion_buses,
+                "bus_a_estaciones": bus_estaciones,
+            })
+            print(f"{asociaciones:>9} filas | estación->buses p50 {estacion_buses['p50_ms']:>7} ms "
+                  f"p95 {estacion_buses['p95_ms']:>7} ms | bus->estaciones p50 {bus_estaciones['p50_ms']:>7} ms "
+                  f"p95 {bus_estaciones['p95_ms']:>7} ms")
+    finally:
+        if not args.conservar:
+            # Borrar buses y estaciones elimina también sus asociaciones (ON DELETE CASCADE)
+            for inicio in range(0, len(buses_creados), TAMANO_LOTE):
+                await cliente.table("buses").delete().in_("id", buses_creados[inicio:inicio + TAMANO_LOTE]).execute()
+            for inicio in range(0, len(estaciones_creadas), TAMANO_LOTE):
+                await cliente.table("estaciones").delete().in_("id", estaciones_creadas[inicio:inicio + TAMANO_LOTE]).execute()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las consultas bus-estación")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="filas de bus_estacion en cada medición")
+    parser.add_argument("--por-estacion", type=int, default=50,
+                        help="asociaciones de la estación y del bus de prueba")
+    parser.add_argument("--limite", type=int, default=50, help="tamaño de página consultado")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    parser.add_argument("--conservar", action="store_true", help="no borrar los datos de prueba")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(ejecutar(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Mide CPU y bytes de las respuestas de listar_buses y listar_estaciones.
+
+Uso:
+    python scripts/benchmark_respuestas.py
+    python scripts/benchmark_respuestas.py --filas 5000 --imagenes 3 --json resultados.json
+
+Genera páginas con la forma que devuelve Supabase (filas con su arreglo
+`imagenes` embebido) y compara, por payload:
+
+- serialización por defecto de FastAPI (jsonable_encoder + JSONResponse)
+  contra RespuestaJSON (orjson si está instalado, si no json compacto);
+- bytes sin comprimir, con gzip y con brotli (si está instalado) y el CPU
+  que cuesta cada compresión.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.respuestas import (
+    COMPRESION_BROTLI_CALIDAD, COMPRESION_GZIP_NIVEL, Compresor, RespuestaJSON, brotli, orjson
+)
+
+TIPOS = ["articulado", "biarticulado", "alimentador", "dual", "zonal"]
+LOCALIDADES = ["Usaquén", "Chapinero", "Santa Fe", "Suba", "Kennedy", "Bosa", "Engativá", "Fontibón"]
+URL_STORAGE = "https://proyecto.supabase.co/storage/v1/object/public"
+
+
+def imagenes(rng, entidad, fila_id, cantidad, fecha):
+    columna = "bus_id" if entidad == "buses" else "estacion_id"
+    resultado = []
+    for _ in range(cantidad):
+        ruta = f"{URL_STORAGE}/{entidad}-imagenes/{fila_id}/{rng.getrandbits(128):032x}"
+        resultado.append({
+            "id": rng.randrange(10 ** 6),
+            columna: fila_id,
+            "url": f"{ruta}.jpg",
+            "miniatura_url": f"{ruta}_miniatura.webp",
+            "webp_url": f"{ruta}.webp",
+            "created_at": fecha,
+        })
+    return resultado
+
+
+def generar(rng, filas, por_fila):
+    inicio = datetime(2024, 1, 1)
+    buses, estaciones = [], []
+    for i in range(1, filas + 1):
+        fecha = (inicio + timedelta(minutes=i)).isoformat()
+        lista = imagenes(rng, "buses", i, rng.randint(0, por_fila * 2), fecha)
+        buses.append({
+            "id": i, "nombre": f"Bus {rng.choice(TIPOS).title()} {i}", "tipo": rng.choice(TIPOS),
+            "esta_activo": rng.random() > 0.2, "created_at": fecha, "updated_at": fecha,
+            "imagenes": lista, "imagen_url": lista[0]["miniatura_url"] if lista else None,
+        })
+        lista = imagenes(rng, "estaciones", i, rng.randint(0, por_fila * 2), fecha)
+        estaciones.append({
+            "id": i, "nombre": f"Estación {i}", "localidad": rng.choice(LOCALIDADES),
+            "esta_activo": rng.random() > 0.1, "created_at": fecha, "updated_at": fecha,
+            "imagenes": lista, "imagen_url": lista[0]["miniatura_url"] if lista else None,
+        })
+    pagina = {"siguiente_cursor": "eyJpZCI6IDEwMDB9", "total": None}
+    return {
+        "listar_buses": {"datos": buses, **pagina},
+        "listar_estaciones": {"datos": estaciones, **pagina},
+    }
+
+
+def medir(funcion, repeticiones):
+    """Devuelve (resultado, ms de CPU por llamada)"""
+    resultado = funcion()
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        funcion()
+    return resultado, (time.process_time() - inicio) * 1000 / repeticiones
+
+
+def ejecutar(args):
+    rng = random.Random(args.semilla)
+    payloads = generar(rng, args.filas, args.imagenes)
+    resultados = {
+        "serializador": "orjson" if orjson is not None else "json",
+        "brotli": brotli is not None,
+        "filas": args.filas,
+        "payloads": {},
+    }
+    print(f"Serializador rápido: {resultados['serializador']}; brotli: "
+          f"{'sí' if brotli is not None else 'no instalado'}; {args.filas} filas por página\n")
+
+    for nombre, payload in payloads.items():
+        por_defecto, ms_defecto = medir(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeticiones)
+        rapida, ms_rapida = medir(lambda: RespuestaJSON(payload).body, args.repeticiones)
+        if json.loads(por_defecto) != json.loads(rapida):
+            raise SystemExit(f"{nombre}: las dos serializaciones no son equivalentes")
+
+        medidas = {
+            "serializacion_fastapi_ms": round(ms_defecto, 3),
+            "serializacion_rapida_ms": round(ms_rapida, 3),
+            "aceleracion": round(ms_defecto / ms_rapida, 1) if ms_rapida else None,
+            "bytes": len(rapida),
+        }
+        codificaciones = [("gzip", lambda: Compresor("gzip").terminar(rapida))]
+        if brotli is not None:
+            codificaciones.append(("br", lambda: Compresor("br").terminar(rapida)))
+        # Referencia: lo que haría zlib con su nivel máximo
+        codificaciones.append(("gzip_9", lambda: zlib.compress(rapida, 9)))
+        for codificacion, comprimir in codificaciones:
+            comprimido, ms = medir(comprimir, args.repeticiones)
+            medidas[f"bytes_{codificacion}"] = len(comprimido)
+            medidas[f"compresion_{codificacion}_ms"] = round(ms, 3)
+            medidas[f"ahorro_{codificacion}"] = round(1 - len(comprimido) / len(rapida), 3)
+        resultados["payloads"][nombre] = medidas
+
+        print(f"{nombre}:")
+        print(f"  serialización  FastAPI {medidas['serializacion_fastapi_ms']:>8} ms   "
+              f"RespuestaJSON {medidas['serializacion_rapida_ms']:>8} ms   (x{medidas['aceleracion']})")
+        print(f"  sin comprimir  {medidas['bytes']:>10} bytes")
+        for codificacion, _ in codificaciones:
+            etiqueta = {"br": f"brotli q{COMPRESION_BROTLI_CALIDAD}", "gzip": f"gzip {COMPRESION_GZIP_NIVEL}",
+                        "gzip_9": "gzip 9"}[codificacion]
+            print(f"  {etiqueta:<14} {medidas[f'bytes_{codificacion}']:>10} bytes "
+                  f"({medidas[f'ahorro_{codificacion}'] * 100:.1f}% menos) en "
+                  f"{medidas[f'compresion_{codificacion}_ms']} ms")
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización y compresión de listados")
+    parser.add_argument("--filas", type=int, default=1000, help="filas por página")
+    parser.add_argument("--imagenes", type=int, default=2, help="imágenes promedio por fila")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    args = parser.parse_args()
+    sys.exit(ejecutar(args))
+
+
+if __name__ == "__main__":
+    main()
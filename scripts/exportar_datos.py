@@ -0,0 +1,96 @@
+"""Exporta las tablas de la flota a archivos NDJSON, CSV o columnares.
+
+Uso:
+    python scripts/exportar_datos.py exportacion/
+    python scripts/exportar_datos.py exportacion/ --formato csv --gzip
+    python scripts/exportar_datos.py exportacion/ --incremental
+
+Todas las tablas se exportan con la misma instantánea (id máximo de cada
+tabla al empezar), que se guarda en `instantanea.json` dentro del directorio
+de salida. Con --incremental solo se exportan las filas posteriores a la
+instantánea anterior guardada en ese directorio.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from supabase import acreate_client
+from app.exportacion import (
+    EXPORTACION_TAMANO_LOTE, FORMATOS_EXPORTACION, TABLAS_EXPORTABLES, exportar, tomar_instantanea
+)
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+def leer_instantanea_anterior(directorio):
+    ruta = os.path.join(directorio, "instantanea.json")
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta) as f:
+        return json.load(f)
+
+
+async def exportar_tablas(args):
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+    if not supabase_url or not supabase_key:
+        print("Error: No se encontraron las variables de entorno SUPABASE_URL y SUPABASE_KEY")
+        return 1
+
+    os.makedirs(args.directorio, exist_ok=True)
+    cliente = await acreate_client(supabase_url, supabase_key)
+    tablas = args.tablas or list(TABLAS_EXPORTABLES)
+    anterior = leer_instantanea_anterior(args.directorio) if args.incremental else {}
+
+    # Instantánea de todas las tablas antes de empezar a leer
+    instantaneas = await asyncio.gather(*(tomar_instantanea(cliente, t) for t in tablas))
+    manifiesto = {}
+
+    for instantanea in instantaneas:
+        tabla = instantanea["tabla"]
+        desde_id = anterior.get(tabla, {}).get("id_maximo", 0)
+        extension = FORMATOS_EXPORTACION[args.formato][1] + (".gz" if args.gzip else "")
+        nombre = f"{tabla}-{desde_id}-{instantanea['id_maximo']}.{extension}"
+        ruta = os.path.join(args.directorio, nombre)
+
+        # El gzip se escribe tal cual lo genera el exportador
+        bytes_escritos = 0
+        with open(ruta, "wb") as salida:
+            async for datos in exportar(
+                cliente, tabla, args.formato, instantanea["id_maximo"],
+                desde_id=desde_id, tamano_lote=args.lote, comprimir=args.gzip
+            ):
+                salida.write(datos)
+                bytes_escritos += len(datos)
+
+        manifiesto[tabla] = {**instantanea, "desde_id": desde_id, "archivo": nombre}
+        print(f"✅ {tabla}: ids {desde_id + 1}..{instantanea['id_maximo']} -> {nombre} ({bytes_escritos} bytes)")
+
+    # Se conserva la instantánea de las tablas que no se exportaron esta vez
+    manifiesto = {**leer_instantanea_anterior(args.directorio), **manifiesto}
+    with open(os.path.join(args.directorio, "instantanea.json"), "w") as f:
+        json.dump(manifiesto, f, indent=2)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportación masiva desde Supabase")
+    parser.add_argument("directorio")
+    parser.add_argument("--tablas", nargs="+", choices=sorted(TABLAS_EXPORTABLES))
+    parser.add_argument("--formato", choices=sorted(FORMATOS_EXPORTACION), default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="comprimir cada archivo")
+    parser.add_argument("--lote", type=int, default=EXPORTACION_TAMANO_LOTE, help="filas por consulta")
+    parser.add_argument("--incremental", action="store_true",
+                        help="exportar solo las filas posteriores a la instantánea guardada")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(exportar_tablas(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Importa buses, estaciones o asociaciones bus_estacion desde CSV o NDJSON.
+
+Uso:
+    python scripts/importar_datos.py buses flota.csv
+    python scripts/importar_datos.py estaciones estaciones.ndjson --lote 1000
+
+El progreso se guarda en `<archivo>.progreso.json` después de cada lote; si
+la importación se interrumpe, volver a ejecutar el mismo comando la reanuda
+desde la última fila confirmada (usar --reiniciar para empezar de cero).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from supabase import acreate_client
+from app.importacion import (
+    ENTIDADES, FORMATOS, IMPORTACION_TAMANO_LOTE, Importador, lineas_de_bloques, registros
+)
+
+# Cargar variables de entorno
+load_dotenv()
+
+TAMANO_BLOQUE = 256 * 1024
+
+
+async def leer_bloques(ruta):
+    with open(ruta, "rb") as archivo:
+        while True:
+            bloque = archivo.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
+
+
+def leer_progreso(ruta_progreso, entidad):
+    if not os.path.exists(ruta_progreso):
+        return 0
+    with open(ruta_progreso) as f:
+        progreso = json.load(f)
+    if progreso.get("entidad") != entidad:
+        return 0
+    return progreso.get("ultima_fila", 0)
+
+
+def guardar_progreso(ruta_progreso, entidad, ultima_fila):
+    temporal = ruta_progreso + ".tmp"
+    with open(temporal, "w") as f:
+        json.dump({"entidad": entidad, "ultima_fila": ultima_fila}, f)
+    os.replace(temporal, ruta_progreso)
+
+
+async def importar(args):
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+    if not supabase_url or not supabase_key:
+        print("Error: No se encontraron las variables de entorno SUPABASE_URL y SUPABASE_KEY")
+        return 1
+
+    formato = args.formato or ("ndjson" if args.archivo.endswith((".ndjson", ".jsonl")) else "csv")
+    ruta_progreso = args.archivo + ".progreso.json"
+    desde_fila = 0 if args.reiniciar else leer_progreso(ruta_progreso, args.entidad)
+    if desde_fila:
+        print(f"Reanudando {args.entidad} desde la fila {desde_fila + 1}")
+
+    cliente = await acreate_client(supabase_url, supabase_key)
+    importador = Importador(cliente, args.entidad, tamano_lote=args.lote)
+
+    async def al_confirmar(ultima_fila):
+        guardar_progreso(ruta_progreso, args.entidad, ultima_fila)
+        print(f"  Fila {ultima_fila}: {importador.insertadas} insertadas, {importador.con_error} con error")
+
+    resumen = await importador.importar(
+        registros(lineas_de_bloques(leer_bloques(args.archivo)), formato),
+        desde_fila=desde_fila,
+        al_confirmar=al_confirmar
+    )
+
+    print(f"\n==== Importación de {args.entidad} terminada ====")
+    print(f"Procesadas: {resumen['procesadas']}  Insertadas: {resumen['insertadas']}  Con error: {resumen['con_error']}")
+    for error in resumen["errores"]:
+        print(f"  ❌ Fila {error['fila']}: {error['error']}")
+    if resumen["errores_omitidos"]:
+        print(f"  ... y {resumen['errores_omitidos']} errores más")
+    return 0 if not resumen["con_error"] else 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación masiva a Supabase")
+    parser.add_argument("entidad", choices=sorted(ENTIDADES))
+    parser.add_argument("archivo")
+    parser.add_argument("--formato", choices=FORMATOS, help="por defecto según la extensión")
+    parser.add_argument("--lote", type=int, default=IMPORTACION_TAMANO_LOTE, help="filas por insert")
+    parser.add_argument("--reiniciar", action="store_true", help="ignorar el progreso guardado")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(importar(args)))
+
+
+if __name__ == "__main__":
+    main()
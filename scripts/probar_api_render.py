@@ -41,8 +41,9 @@ def probar_api():
         response = requests.get(f"{render_url}/api/buses")
         print(f"  Código: {response.status_code}")
         if response.status_code == 200:
-            buses = response.json()
-            print(f"  ✅ {len(buses)} buses encontrados")
+            # La respuesta es una página: {"datos": [...], "siguiente_cursor": ...}
+            buses = response.json()["datos"]
+            print(f"  ✅ {len(buses)} buses encontrados en la primera página")
             if buses:
                 print(f"  Primer bus: {buses[0]['nombre']} (ID: {buses[0]['id']})")
                 # Verificar si tiene imagen_url
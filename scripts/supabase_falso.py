@@ -0,0 +1,351 @@
+"""Servidor local que imita la API de Supabase (PostgREST + Storage) en memoria.
+
+Sirve para ejecutar la aplicación y los benchmarks sin un proyecto real:
+
+    python scripts/supabase_falso.py --puerto 54321 --latencia-ms 20
+
+y luego arrancar la app con SUPABASE_URL=http://127.0.0.1:54321 y cualquier
+SUPABASE_KEY con forma de JWT. Implementa solo lo que usa la aplicación:
+filtros (eq, neq, gt, gte, lt, lte, in, like, ilike, is, not, or/and),
+order, limit/offset, count, recursos embebidos (`imagenes(*)`,
+`buses!bus_estacion(*)`, `buses!inner(...)`), upsert con ignore-duplicates,
+claves foráneas, borrado en cascada y los endpoints de buckets y objetos de
+Storage. Las funciones RPC responden como si no existieran (PGRST202).
+
+`--latencia-ms` y `--variacion-ms` agregan una espera a cada petición para
+simular la red hasta Supabase. `--max-filas` recorta las lecturas como el
+`db-max-rows` de PostgREST.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+# La tabla facetas no se incluye: sin triggers la aplicación la calcula desde las tablas base
+TABLAS = ["buses", "estaciones", "imagenes", "bus_estacion", "rutas", "ruta_paradas", "bus_ruta"]
+
+# tabla -> {tabla referenciada: columna}; todas con ON DELETE CASCADE
+REFERENCIAS = {
+    "imagenes": {"buses": "bus_id", "estaciones": "estacion_id"},
+    "bus_estacion": {"buses": "bus_id", "estaciones": "estacion_id"},
+    "ruta_paradas": {"rutas": "ruta_id", "estaciones": "estacion_id"},
+    "bus_ruta": {"rutas": "ruta_id", "buses": "bus_id"},
+}
+
+RESTRICCIONES_UNICAS = {
+    "bus_estacion": ("bus_id", "estacion_id"),
+    "bus_ruta": ("bus_id", "ruta_id"),
+    "ruta_paradas": ("ruta_id", "orden"),
+}
+
+PARAMETROS_RESERVADOS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _error(status, mensaje, codigo):
+    cuerpo = {"message": mensaje, "code": codigo, "hint": None, "details": None}
+    return Response(json.dumps(cuerpo), status, media_type="application/json")
+
+
+def _valor(texto):
+    if texto == "null":
+        return None
+    if texto.lower() in ("true", "false"):
+        return texto.lower() == "true"
+    try:
+        return int(texto)
+    except ValueError:
+        return texto
+
+
+def _comparar(valor, operador, argumento):
+    argumento = argumento.strip('"')
+    if operador == "is":
+        return valor is _valor(argumento)
+    if operador == "eq":
+        return valor == _valor(argumento) if isinstance(valor, bool) else str(valor) == argumento
+    if operador == "neq":
+        return str(valor) != argumento
+    if operador == "in":
+        return str(valor) in [x.strip('"') for x in argumento.strip("()").split(",")]
+    if valor is None:
+        return False
+    if operador in ("like", "ilike"):
+        patron = re.escape(argumento).replace(r"\*", ".*").replace("%", ".*")
+        return re.fullmatch(patron, str(valor), re.I if operador == "ilike" else 0) is not None
+    try:
+        a, b = int(valor), int(argumento)
+    except (TypeError, ValueError):
+        a, b = str(valor), argumento
+    return {"gt": a > b, "gte": a >= b, "lt": a < b, "lte": a <= b}.get(operador, True)
+
+
+def _partir(texto):
+    """Divide por comas que no estén dentro de paréntesis"""
+    partes, nivel, actual = [], 0, ""
+    for c in texto:
+        if c == "," and nivel == 0:
+            partes.append(actual)
+            actual = ""
+            continue
+        nivel += c == "("
+        nivel -= c == ")"
+        actual += c
+    if actual:
+        partes.append(actual)
+    return partes
+
+
+class BaseFalsa:
+    def __init__(self):
+        self.tablas = {t: [] for t in TABLAS}
+        self.ids = {t: itertools.count(1) for t in TABLAS}
+        self.buckets = {"buses-imagenes": {}, "estaciones-imagenes": {}}
+        self.peticiones = 0
+
+    # --- Filtros ---
+
+    def _condicion(self, fila, clave, valor):
+        if clave in ("or", "and"):
+            resultados = [self._expresion(fila, p) for p in _partir(valor.strip("()"))]
+            return any(resultados) if clave == "or" else all(resultados)
+        negar = False
+        operador, _, argumento = valor.partition(".")
+        if operador == "not":
+            negar = True
+            operador, _, argumento = argumento.partition(".")
+        resultado = _comparar(fila.get(clave), operador, argumento)
+        return not resultado if negar else resultado
+
+    def _expresion(self, fila, expresion):
+        m = re.match(r"(and|or)\((.*)\)$", expresion)
+        if m:
+            return self._condicion(fila, m.group(1), "(" + m.group(2) + ")")
+        clave, _, resto = expresion.partition(".")
+        return self._condicion(fila, clave, resto)
+
+    def filtrar(self, tabla, parametros):
+        filas = self.tablas[tabla]
+        for clave, valor in parametros.multi_items():
+            if clave in PARAMETROS_RESERVADOS:
+                continue
+            if "." in clave:
+                # Filtro sobre un recurso embebido (p. ej. buses.esta_activo con !inner)
+                relacion, columna = clave.split(".", 1)
+                fk = REFERENCIAS.get(tabla, {}).get(relacion)
+                if fk and columna not in ("order", "limit"):
+                    relacionadas = {str(r["id"]): r for r in self.tablas[relacion]}
+                    filas = [
+                        f for f in filas
+                        if str(f.get(fk)) in relacionadas
+                        and self._condicion(relacionadas[str(f.get(fk))], columna, valor)
+                    ]
+                continue
+            filas = [f for f in filas if self._condicion(f, clave, valor)]
+        return filas
+
+    # --- Proyección con recursos embebidos ---
+
+    def proyectar(self, tabla, fila, select):
+        if not select or select == "*":
+            return dict(fila)
+        salida = {}
+        for parte in _partir(select):
+            parte = parte.strip()
+            m = re.match(r"(\w+)(?:!(\w+))?\((.*)\)$", parte)
+            if not m:
+                if parte == "*":
+                    salida.update(fila)
+                else:
+                    salida[parte] = fila.get(parte)
+                continue
+            relacion, via, sub = m.groups()
+            if via == "inner":
+                via = None
+            if via:
+                # Muchos a muchos a través de una tabla intermedia
+                propia, ajena = REFERENCIAS[via][tabla], REFERENCIAS[via][relacion]
+                ids = {str(v[ajena]) for v in self.tablas[via] if str(v[propia]) == str(fila["id"])}
+                salida[relacion] = [self.proyectar(relacion, r, sub) for r in self.tablas[relacion] if str(r["id"]) in ids]
+            elif relacion in REFERENCIAS.get(tabla, {}):
+                fk = REFERENCIAS[tabla][relacion]
+                r = next((r for r in self.tablas[relacion] if str(r["id"]) == str(fila.get(fk))), None)
+                salida[relacion] = self.proyectar(relacion, r, sub) if r else None
+            else:
+                fk = REFERENCIAS[relacion][tabla]
+                salida[relacion] = [self.proyectar(relacion, r, sub) for r in self.tablas[relacion] if str(r.get(fk)) == str(fila["id"])]
+        return salida
+
+    # --- Escrituras ---
+
+    def insertar(self, tabla, filas, ignorar_duplicados=False):
+        """Inserta todas las filas o ninguna; devuelve las creadas o (status, mensaje, código)"""
+        creadas = []
+        unica = RESTRICCIONES_UNICAS.get(tabla)
+        for fila in filas:
+            for referida, columna in REFERENCIAS.get(tabla, {}).items():
+                valor = fila.get(columna)
+                if valor is not None and not any(str(r["id"]) == str(valor) for r in self.tablas[referida]):
+                    self._deshacer(tabla, creadas)
+                    return 409, f'insert or update on table "{tabla}" violates foreign key constraint', "23503"
+            if unica:
+                clave = tuple(fila.get(c) for c in unica)
+                if any(tuple(x.get(c) for c in unica) == clave for x in self.tablas[tabla]):
+                    if ignorar_duplicados:
+                        continue
+                    self._deshacer(tabla, creadas)
+                    return 409, "duplicate key value violates unique constraint", "23505"
+            fila = dict(fila)
+            fila.setdefault("id", next(self.ids[tabla]))
+            fila.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S") + f".{fila['id'] % 1000000:06d}")
+            self.tablas[tabla].append(fila)
+            creadas.append(fila)
+        return creadas
+
+    def _deshacer(self, tabla, creadas):
+        ids = {f["id"] for f in creadas}
+        self.tablas[tabla] = [f for f in self.tablas[tabla] if f["id"] not in ids]
+
+    def eliminar(self, tabla, filas):
+        ids = {f["id"] for f in filas}
+        self.tablas[tabla] = [f for f in self.tablas[tabla] if f["id"] not in ids]
+        # ON DELETE CASCADE
+        for dependiente, referencias in REFERENCIAS.items():
+            columna = referencias.get(tabla)
+            if columna:
+                self.eliminar(dependiente, [f for f in self.tablas[dependiente] if f.get(columna) in ids])
+
+
+def crear_app(base=None, latencia_ms=0.0, variacion_ms=0.0, max_filas=None):
+    base = base or BaseFalsa()
+    app = FastAPI()
+    app.state.base = base
+
+    @app.middleware("http")
+    async def simular_latencia(request, call_next):
+        base.peticiones += 1
+        espera = latencia_ms + random.uniform(0, variacion_ms)
+        if espera > 0:
+            await asyncio.sleep(espera / 1000)
+        return await call_next(request)
+
+    @app.post("/rest/v1/rpc/{funcion}")
+    async def rpc(funcion: str):
+        # Sin funciones SQL: la aplicación usa su camino alternativo
+        return _error(404, f"Could not find the function public.{funcion} in the schema cache", "PGRST202")
+
+    @app.api_route("/rest/v1/{tabla}", methods=["GET", "HEAD", "POST", "PATCH", "DELETE"])
+    async def rest(tabla: str, request: Request):
+        if tabla not in base.tablas:
+            return _error(404, f'relation "public.{tabla}" does not exist', "42P01")
+        parametros = request.query_params
+        prefer = request.headers.get("prefer", "")
+
+        if request.method in ("GET", "HEAD"):
+            filas = base.filtrar(tabla, parametros)
+            orden = parametros.get("order")
+            for criterio in reversed(orden.split(",") if orden else []):
+                columna, *modificadores = criterio.split(".")
+                filas = sorted(
+                    filas,
+                    key=lambda f: (f.get(columna) is None, f.get(columna) if f.get(columna) is not None else 0),
+                    reverse="desc" in modificadores
+                )
+            total = len(filas)
+            inicio = int(parametros.get("offset", 0))
+            fin = inicio + int(parametros["limit"]) if "limit" in parametros else None
+            if max_filas is not None:
+                fin = inicio + max_filas if fin is None else min(fin, inicio + max_filas)
+            datos = [base.proyectar(tabla, f, parametros.get("select")) for f in filas[inicio:fin]]
+            rango = f"{inicio}-{inicio + len(datos) - 1}/{total if 'count=' in prefer else '*'}"
+            return Response(json.dumps(datos, default=str), 200, headers={"content-range": rango},
+                            media_type="application/json")
+
+        if request.method == "POST":
+            cuerpo = await request.json()
+            creadas = base.insertar(tabla, cuerpo if isinstance(cuerpo, list) else [cuerpo],
+                                    ignorar_duplicados="ignore-duplicates" in prefer)
+            if isinstance(creadas, tuple):
+                return _error(*creadas)
+            return Response(json.dumps(creadas, default=str), 201, media_type="application/json")
+
+        filas = base.filtrar(tabla, parametros)
+        if request.method == "PATCH":
+            cambios = await request.json()
+            for fila in filas:
+                fila.update(cambios)
+        else:
+            base.eliminar(tabla, filas)
+        return Response(json.dumps(filas, default=str), 200, media_type="application/json")
+
+    def _bucket(nombre):
+        return {"id": nombre, "name": nombre, "public": True, "owner": "",
+                "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00",
+                "file_size_limit": None, "allowed_mime_types": None}
+
+    def _bucket_no_encontrado():
+        cuerpo = {"statusCode": "404", "error": "Bucket not found", "message": "Bucket not found"}
+        return Response(json.dumps(cuerpo), 400, media_type="application/json")
+
+    @app.get("/storage/v1/bucket")
+    async def listar_buckets():
+        return [_bucket(b) for b in base.buckets]
+
+    @app.get("/storage/v1/bucket/{bucket}")
+    async def obtener_bucket(bucket: str):
+        if bucket not in base.buckets:
+            return _bucket_no_encontrado()
+        return _bucket(bucket)
+
+    @app.post("/storage/v1/bucket")
+    async def crear_bucket(request: Request):
+        nombre = (await request.json())["name"]
+        base.buckets.setdefault(nombre, {})
+        return {"name": nombre}
+
+    @app.api_route("/storage/v1/object/{bucket}/{ruta:path}", methods=["POST", "PUT"])
+    async def subir_objeto(bucket: str, ruta: str, request: Request):
+        if bucket not in base.buckets:
+            return _bucket_no_encontrado()
+        base.buckets[bucket][ruta] = (await request.body(), request.headers.get("content-type"))
+        return {"Key": f"{bucket}/{ruta}"}
+
+    @app.delete("/storage/v1/object/{bucket}")
+    async def borrar_objetos(bucket: str, request: Request):
+        eliminados = []
+        for ruta in (await request.json())["prefixes"]:
+            if base.buckets.get(bucket, {}).pop(ruta, None) is not None:
+                eliminados.append({"name": ruta})
+        return eliminados
+
+    return app
+
+
+def arrancar_en_hilo(app, puerto):
+    """Arranca el servidor en un hilo (para usarlo desde otro script) y espera a que escuche"""
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supabase falso en memoria")
+    parser.add_argument("--puerto", type=int, default=54321)
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="espera fija por petición")
+    parser.add_argument("--variacion-ms", type=float, default=0.0, help="espera aleatoria adicional")
+    parser.add_argument("--max-filas", type=int, default=None, help="filas máximas por lectura (db-max-rows)")
+    args = parser.parse_args()
+    app = crear_app(latencia_ms=args.latencia_ms, variacion_ms=args.variacion_ms, max_filas=args.max_filas)
+    uvicorn.run(app, host="127.0.0.1", port=args.puerto, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
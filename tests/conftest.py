@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Los tests importan `app` y los scripts desde la raíz del repositorio
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "scripts"))
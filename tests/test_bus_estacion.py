@@ -0,0 +1,117 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from postgrest import AsyncPostgrestClient
+
+from app.cache import cache_estaciones
+from app.grafo import grafo
+from app.repositorios import Repositorios, get_repos
+from app.routers import buses
+from supabase_falso import crear_app
+
+
+class Entorno:
+    """Router de buses sobre el Supabase falso en memoria (sin red)"""
+
+    def __init__(self):
+        falso = crear_app()
+        self.base = falso.state.base
+        self.base.insertar("buses", [{"nombre": f"B{i}"} for i in range(1, 3)])
+        self.base.insertar("estaciones", [{"nombre": f"E{i}"} for i in range(1, 6)])
+        self.cliente = AsyncPostgrestClient("http://falso/rest/v1")
+        self.cliente.session = httpx.AsyncClient(
+            base_url="http://falso/rest/v1", transport=httpx.ASGITransport(app=falso)
+        )
+        app = FastAPI()
+        app.include_router(buses.router)
+        app.dependency_overrides[get_repos] = lambda: Repositorios(self.cliente)
+        self.http = TestClient(app)
+
+    def pares(self):
+        return sorted((f["bus_id"], f["estacion_id"]) for f in self.base.tablas["bus_estacion"])
+
+
+@pytest.fixture
+def entorno():
+    entorno = Entorno()
+    yield entorno
+    asyncio.run(entorno.cliente.session.aclose())
+
+
+def _lote(agregar=(), quitar=()):
+    return {
+        "agregar": [{"bus_id": b, "estacion_id": e} for b, e in agregar],
+        "quitar": [{"bus_id": b, "estacion_id": e} for b, e in quitar],
+    }
+
+
+def test_lote_agrega_quita_y_cuenta_sin_cambios(entorno):
+    entorno.base.insertar("bus_estacion", [{"bus_id": 1, "estacion_id": 1}, {"bus_id": 1, "estacion_id": 2}])
+    respuesta = entorno.http.post("/api/bus-estacion/lote", json=_lote(
+        agregar=[(1, 1), (1, 3), (2, 3)],
+        quitar=[(1, 2), (2, 5)],
+    ))
+    assert respuesta.status_code == 200
+    # (1, 1) ya existía y (2, 5) no existía: ninguno de los dos cambia nada
+    assert respuesta.json() == {"agregadas": 2, "eliminadas": 1, "sin_cambios": 2}
+    assert entorno.pares() == [(1, 1), (1, 3), (2, 3)]
+
+
+def test_lote_repetido_es_idempotente(entorno):
+    lote = _lote(agregar=[(1, 1), (2, 2)])
+    assert entorno.http.post("/api/bus-estacion/lote", json=lote).json()["agregadas"] == 2
+    assert entorno.http.post("/api/bus-estacion/lote", json=lote).json() == {
+        "agregadas": 0, "eliminadas": 0, "sin_cambios": 2
+    }
+    assert entorno.pares() == [(1, 1), (2, 2)]
+
+
+def test_lote_rechaza_par_en_agregar_y_quitar(entorno):
+    respuesta = entorno.http.post("/api/bus-estacion/lote", json=_lote(agregar=[(1, 1)], quitar=[(1, 1)]))
+    assert respuesta.status_code == 400
+    assert entorno.pares() == []
+
+
+def test_lote_con_estacion_inexistente_es_400(entorno):
+    respuesta = entorno.http.post("/api/bus-estacion/lote", json=_lote(agregar=[(1, 999)]))
+    assert respuesta.status_code == 400
+    assert entorno.pares() == []
+
+
+def test_reemplazar_estaciones_aplica_solo_la_diferencia(entorno):
+    entorno.base.insertar("bus_estacion", [
+        {"bus_id": 1, "estacion_id": e} for e in (1, 2, 3)
+    ] + [{"bus_id": 2, "estacion_id": 1}])
+    ids_antes = {f["estacion_id"]: f["id"] for f in entorno.base.tablas["bus_estacion"] if f["bus_id"] == 1}
+
+    respuesta = entorno.http.put("/api/buses/1/estaciones", json={"estacion_ids": [2, 3, 4, 4]})
+    assert respuesta.json() == {"agregadas": 1, "eliminadas": 1, "sin_cambios": 2}
+    assert entorno.pares() == [(1, 2), (1, 3), (1, 4), (2, 1)]
+    # Las filas que se mantienen no se borran y se vuelven a crear
+    ids_despues = {f["estacion_id"]: f["id"] for f in entorno.base.tablas["bus_estacion"] if f["bus_id"] == 1}
+    assert ids_despues[2] == ids_antes[2] and ids_despues[3] == ids_antes[3]
+
+
+def test_reemplazar_por_lista_vacia(entorno):
+    entorno.base.insertar("bus_estacion", [{"bus_id": 1, "estacion_id": 1}, {"bus_id": 2, "estacion_id": 1}])
+    respuesta = entorno.http.put("/api/buses/1/estaciones", json={"estacion_ids": []})
+    assert respuesta.json() == {"agregadas": 0, "eliminadas": 1, "sin_cambios": 0}
+    assert entorno.pares() == [(2, 1)]
+
+
+def test_cambios_invalidan_solo_las_estaciones_afectadas(entorno, monkeypatch):
+    invalidadas = []
+    monkeypatch.setattr(cache_estaciones, "invalidar", lambda *prefijo: invalidadas.append(prefijo))
+    aplicados = []
+
+    async def aplicar(agregar=(), quitar=()):
+        aplicados.append((sorted(agregar), sorted(quitar)))
+
+    monkeypatch.setattr(grafo, "aplicar", aplicar)
+    entorno.base.insertar("bus_estacion", [{"bus_id": 1, "estacion_id": 1}])
+    entorno.http.post("/api/bus-estacion/lote", json=_lote(agregar=[(1, 1), (1, 2)], quitar=[(2, 3)]))
+    assert invalidadas == [("detalle", "2")]
+    assert aplicados == [([(1, 2)], [])]
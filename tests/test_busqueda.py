@@ -0,0 +1,128 @@
+import asyncio
+import base64
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.busqueda import IndiceBusqueda, normalizar
+from app.paginacion import (
+    CursorInvalido, codificar_cursor, codificar_cursor_id, decodificar_cursor, decodificar_cursor_id
+)
+from app.repositorios import get_repos
+from app.routers import busqueda
+
+
+def _b64(texto):
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+# --- Cursores ---
+
+@pytest.mark.parametrize("valor", [0, 1, 49, 10 ** 12])
+def test_cursor_id_ida_y_vuelta(valor):
+    cursor = codificar_cursor_id(valor)
+    assert "=" not in cursor
+    assert decodificar_cursor_id(cursor) == valor
+
+
+def test_cursor_keyset_ida_y_vuelta():
+    fila = {"created_at": "2024-01-01T10:00:00.123456+00:00", "id": 42}
+    assert decodificar_cursor(codificar_cursor(fila)) == ("2024-01-01T10:00:00.123456+00:00", 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "###", _b64("abc"), _b64("1.5"), _b64("-1"), _b64("-100")])
+def test_cursor_id_invalido(cursor):
+    with pytest.raises(CursorInvalido):
+        decodificar_cursor_id(cursor)
+
+
+@pytest.mark.parametrize("cursor", [
+    "###", _b64("abc"), _b64('["2024-01-01", "7"]'), _b64("[1, 2]"), _b64('["2024-01-01"]'), _b64("{}"),
+])
+def test_cursor_keyset_invalido(cursor):
+    with pytest.raises(CursorInvalido):
+        decodificar_cursor(cursor)
+
+
+def test_buscar_rechaza_cursor_negativo():
+    app = FastAPI()
+    app.include_router(busqueda.router)
+    app.dependency_overrides[get_repos] = lambda: None
+    respuesta = TestClient(app).get("/api/buscar", params={"q": "norte", "cursor": codificar_cursor_id(-3)})
+    assert respuesta.status_code == 400
+
+
+# --- Índice de trigramas ---
+
+def _indice():
+    indice = IndiceBusqueda(umbral=0.5)
+
+    async def cargar():
+        return {
+            "buses": [
+                {"id": 1, "nombre": "Expreso Norte", "esta_activo": True},
+                {"id": 2, "nombre": "Alimentador Sur", "esta_activo": False},
+            ],
+            "estaciones": [
+                {"id": 1, "nombre": "Portal Norte", "localidad": "Usaquén", "esta_activo": True},
+                {"id": 2, "nombre": "Calle 100", "localidad": "Chapinero", "esta_activo": True},
+                {"id": 3, "nombre": "Portal Sur", "localidad": "Bosa", "esta_activo": True},
+            ],
+        }
+
+    asyncio.run(indice.asegurar(cargar))
+    return indice
+
+
+def _claves(resultados):
+    return [(r["entidad"], r["id"]) for r in resultados]
+
+
+def test_normalizar():
+    assert normalizar("  Usaquén, Calle-100 ") == "usaquen calle 100"
+
+
+def test_busqueda_difusa_tolera_errores():
+    total, datos = _indice().buscar("portal nrte")
+    assert total >= 1
+    assert _claves(datos)[0] == ("estaciones", 1)
+
+
+def test_busqueda_por_localidad_sin_tildes():
+    _, datos = _indice().buscar("usaquen")
+    assert _claves(datos) == [("estaciones", 1)]
+
+
+def test_prefijo():
+    indice = _indice()
+    _, datos = indice.buscar("port", prefijo=True)
+    assert sorted(_claves(datos)) == [("estaciones", 1), ("estaciones", 3)]
+    _, datos = indice.buscar("port su", prefijo=True)
+    assert _claves(datos) == [("estaciones", 3)]
+
+
+def test_filtros():
+    indice = _indice()
+    _, datos = indice.buscar("sur", entidad="buses")
+    assert _claves(datos) == [("buses", 2)]
+    _, datos = indice.buscar("sur", entidad="buses", esta_activo=True)
+    assert datos == []
+
+
+def test_paginas_sin_solapamiento():
+    indice = _indice()
+    total, todos = indice.buscar("portal norte sur", limite=10)
+    primera = indice.buscar("portal norte sur", limite=1)[1]
+    segunda = indice.buscar("portal norte sur", desplazamiento=1, limite=10)[1]
+    assert _claves(primera + segunda) == _claves(todos)
+    assert len(todos) == total
+
+
+def test_actualizar_y_eliminar():
+    indice = _indice()
+    asyncio.run(indice.actualizar("estaciones", {"id": 2, "nombre": "Museo Nacional", "localidad": "Santa Fe"}))
+    assert indice.buscar("calle 100")[0] == 0
+    assert _claves(indice.buscar("museo")[1]) == [("estaciones", 2)]
+    asyncio.run(indice.eliminar("estaciones", 2))
+    assert indice.buscar("museo")[0] == 0
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.cache import CacheMemoria
+
+
+class Cargador:
+    """`cargar()` que cuenta las llamadas y espera a `liberar` para terminar"""
+
+    def __init__(self, valor="v", error=None):
+        self.valor = valor
+        self.error = error
+        self.llamadas = 0
+        self.liberar = asyncio.Event()
+
+    async def __call__(self):
+        self.llamadas += 1
+        await self.liberar.wait()
+        if self.error:
+            raise self.error
+        return f"{self.valor}{self.llamadas}"
+
+
+async def _concurrentes(cache, clave, cargar, n):
+    tareas = [asyncio.create_task(cache.obtener_o_cargar(clave, cargar)) for _ in range(n)]
+    await asyncio.sleep(0)
+    cargar.liberar.set()
+    return await asyncio.gather(*tareas, return_exceptions=True)
+
+
+def test_lecturas_concurrentes_comparten_una_carga():
+    async def prueba():
+        cache = CacheMemoria("buses", ttl=60)
+        cargar = Cargador()
+        assert await _concurrentes(cache, ("lista",), cargar, 5) == ["v1"] * 5
+        assert cargar.llamadas == 1
+        assert (cache.fallos, cache.coalescidas) == (1, 4)
+        assert await cache.obtener_o_cargar(("lista",), cargar) == "v1"
+        assert cache.aciertos == 1
+    asyncio.run(prueba())
+
+
+def test_error_de_carga_llega_a_todos_y_no_se_guarda():
+    async def prueba():
+        cache = CacheMemoria("buses", ttl=60)
+        resultados = await _concurrentes(cache, ("lista",), Cargador(error=ConnectionError("caído")), 3)
+        assert all(isinstance(r, ConnectionError) for r in resultados)
+
+        cargar = Cargador()
+        cargar.liberar.set()
+        assert await cache.obtener_o_cargar(("lista",), cargar) == "v1"
+    asyncio.run(prueba())
+
+
+def test_invalidar_por_prefijo():
+    async def prueba():
+        cache = CacheMemoria("buses", ttl=60)
+        cargar = Cargador()
+        cargar.liberar.set()
+        for clave in [("lista", 1), ("lista", 2), ("detalle", 7)]:
+            await cache.obtener_o_cargar(clave, cargar)
+
+        version = cache.version
+        cache.invalidar("lista")
+        assert cache.version == version + 1
+        assert cache.estadisticas()["entradas"] == 1
+        assert await cache.obtener_o_cargar(("detalle", 7), cargar) == "v3"
+        assert await cache.obtener_o_cargar(("lista", 1), cargar) == "v4"
+    asyncio.run(prueba())
+
+
+def test_invalidar_durante_la_carga_no_guarda_el_valor_viejo():
+    async def prueba():
+        cache = CacheMemoria("buses", ttl=60)
+        vieja = Cargador()
+        tarea = asyncio.create_task(cache.obtener_o_cargar(("lista",), vieja))
+        await asyncio.sleep(0)
+        cache.invalidar("lista")
+        vieja.liberar.set()
+        # Quien ya esperaba recibe el valor que se estaba cargando...
+        assert await tarea == "v1"
+
+        # ...pero no queda en caché: la siguiente lectura vuelve a cargar
+        nueva = Cargador(valor="n")
+        nueva.liberar.set()
+        assert await cache.obtener_o_cargar(("lista",), nueva) == "n1"
+    asyncio.run(prueba())
+
+
+@pytest.mark.parametrize("max_entradas", [1, 2])
+def test_lru_expulsa_la_menos_usada(max_entradas):
+    async def prueba():
+        cache = CacheMemoria("buses", ttl=60, max_entradas=max_entradas)
+        cargar = Cargador()
+        cargar.liberar.set()
+        for clave in [("a",), ("b",), ("c",)]:
+            await cache.obtener_o_cargar(clave, cargar)
+        assert cache.estadisticas()["entradas"] == max_entradas
+        assert cache.expulsiones == 3 - max_entradas
+        assert await cache.obtener_o_cargar(("c",), cargar) == "v3"
+    asyncio.run(prueba())
+
+
+def test_ttl_vencido_vuelve_a_cargar(monkeypatch):
+    async def prueba():
+        cache = CacheMemoria("buses", ttl=5)
+        cargar = Cargador()
+        cargar.liberar.set()
+        ahora = [1000.0]
+        monkeypatch.setattr("app.cache.time.monotonic", lambda: ahora[0])
+        assert await cache.obtener_o_cargar(("lista",), cargar) == "v1"
+        ahora[0] += 6
+        assert await cache.obtener_o_cargar(("lista",), cargar) == "v2"
+    asyncio.run(prueba())
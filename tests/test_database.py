@@ -0,0 +1,83 @@
+import asyncio
+
+from app.database import RegistroClientes
+
+
+class SubClienteFalso:
+    def __init__(self):
+        self.cerrado = False
+
+    async def aclose(self):
+        self.cerrado = True
+
+
+class ClienteFalso:
+    """Imita `cliente.table(t).select(...).limit(n).execute()` del cliente asíncrono"""
+
+    def __init__(self, falla=False):
+        self.falla = falla
+        self._postgrest = SubClienteFalso()
+        self._storage = None
+
+    def table(self, tabla):
+        return self
+
+    def select(self, columnas):
+        return self
+
+    def limit(self, n):
+        return self
+
+    async def execute(self):
+        if self.falla:
+            raise ConnectionError("sin conexión")
+
+
+def _registro(*clientes):
+    registro = RegistroClientes("https://falso.supabase.co", "clave", timeout=0.01)
+    pendientes = list(clientes)
+
+    async def crear():
+        return pendientes.pop(0)
+
+    registro._crear_cliente_async = crear
+    return registro
+
+
+def test_salud_con_cliente_async_sano():
+    registro = _registro(ClienteFalso())
+    resultado = asyncio.run(registro.verificar_salud_async())
+    assert resultado["estado"] == "ok"
+    assert resultado["saludables"] == 1 and resultado["reemplazados"] == 0
+    assert not registro.pool_iniciado
+
+
+def test_cliente_async_que_falla_se_reemplaza():
+    roto, nuevo = ClienteFalso(falla=True), ClienteFalso()
+    registro = _registro(roto, nuevo)
+
+    async def prueba():
+        resultado = await registro.verificar_salud_async()
+        assert resultado["estado"] == "degradado"
+        assert resultado["reemplazados"] == 1
+        assert await registro.obtener_async() is nuevo
+        # El anterior se cierra después del margen, no de inmediato
+        assert not roto._postgrest.cerrado
+        await asyncio.sleep(0.05)
+        assert roto._postgrest.cerrado
+        assert (await registro.verificar_salud_async())["estado"] == "ok"
+
+    asyncio.run(prueba())
+
+
+def test_cerrar_cierra_tambien_los_reemplazados_pendientes():
+    roto, nuevo = ClienteFalso(falla=True), ClienteFalso()
+    registro = _registro(roto, nuevo)
+    registro.timeout = 60
+
+    async def prueba():
+        await registro.verificar_salud_async()
+        await registro.cerrar_async()
+
+    asyncio.run(prueba())
+    assert roto._postgrest.cerrado and nuevo._postgrest.cerrado
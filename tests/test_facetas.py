@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from app.repositorios import RepositorioFacetas
+from supabase_falso import crear_app
+
+# Como el db-max-rows por defecto de Supabase
+MAX_FILAS = 1000
+
+
+def facetas(entidad, filas):
+    """Facetas de `entidad` calculadas por el camino alternativo (el falso no tiene tabla facetas)"""
+    app = crear_app(max_filas=MAX_FILAS)
+    app.state.base.insertar(entidad, filas)
+
+    async def calcular():
+        cliente = AsyncPostgrestClient("http://falso/rest/v1")
+        cliente.session = httpx.AsyncClient(
+            base_url="http://falso/rest/v1", transport=httpx.ASGITransport(app=app)
+        )
+        try:
+            return await RepositorioFacetas(cliente).listar(entidad)
+        finally:
+            await cliente.session.aclose()
+
+    return {f["valor"]: (f["activos"], f["inactivos"]) for f in asyncio.run(calcular())}
+
+
+def test_el_limite_de_filas_no_recorta_los_conteos():
+    filas = [
+        {"nombre": f"B{i}", "tipo": "troncal" if i % 2 else "zonal", "esta_activo": i % 5 != 0}
+        for i in range(2 * MAX_FILAS + 500)
+    ]
+    resultado = facetas("buses", filas)
+    assert sum(a + i for a, i in resultado.values()) == len(filas)
+    assert resultado == {"zonal": (1000, 250), "troncal": (1000, 250)}
+
+
+def test_valores_nulos_se_omiten():
+    resultado = facetas("estaciones", [
+        {"nombre": "E1", "localidad": "Bosa", "esta_activo": True},
+        {"nombre": "E2", "localidad": None, "esta_activo": True},
+        {"nombre": "E3", "localidad": "Bosa", "esta_activo": False},
+        {"nombre": "E4", "localidad": "Suba", "esta_activo": None},
+    ])
+    assert resultado == {"Bosa": (1, 1), "Suba": (1, 0)}
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.grafo import GrafoBusEstacion
+from app.repositorios import get_repos
+from app.routers import trayectos
+
+# Bus 1: 10-20, bus 2: 20-30, bus 3: 30-40; la estación 50 está aislada
+PARES = [(1, 10), (1, 20), (2, 20), (2, 30), (3, 30), (3, 40), (4, 50)]
+
+
+def _grafo(pares=PARES, **opciones):
+    grafo = GrafoBusEstacion(**opciones)
+
+    async def cargar():
+        return list(pares)
+
+    asyncio.run(grafo.asegurar(cargar))
+    return grafo
+
+
+def _buses(tramos):
+    return None if tramos is None else [t["bus_id"] for t in tramos]
+
+
+def test_minimo_de_transbordos():
+    grafo = _grafo()
+    assert _buses(grafo.trayecto(10, 20)) == [1]
+    assert _buses(grafo.trayecto(10, 40)) == [1, 2, 3]
+    assert grafo.trayecto(10, 10) == []
+    assert grafo.trayecto(10, 50) is None
+    assert grafo.trayecto(10, 999) is None
+
+
+def test_tramos_encadenados():
+    tramos = _grafo().trayecto(10, 30)
+    assert [(t["desde"], t["hasta"]) for t in tramos] == [(10, 20), (20, 30)]
+
+
+def test_max_transbordos():
+    grafo = _grafo()
+    assert grafo.trayecto(10, 40, max_transbordos=1) is None
+    assert _buses(grafo.trayecto(10, 40, max_transbordos=2)) == [1, 2, 3]
+
+
+def test_agregar_arista_acorta_el_trayecto():
+    grafo = _grafo()
+    asyncio.run(grafo.aplicar(agregar=[(5, 10), (5, 40)]))
+    assert _buses(grafo.trayecto(10, 40)) == [5]
+    asyncio.run(grafo.aplicar(quitar=[(5, 40)]))
+    assert _buses(grafo.trayecto(10, 40)) == [1, 2, 3]
+
+
+def test_quitar_arista_de_los_arreglos_compactos():
+    grafo = _grafo()
+    asyncio.run(grafo.aplicar(quitar=[(2, 30)]))
+    assert grafo.trayecto(10, 40) is None
+    # Volver a agregarla la saca de las quitadas
+    asyncio.run(grafo.aplicar(agregar=[(2, 30)]))
+    assert _buses(grafo.trayecto(10, 40)) == [1, 2, 3]
+
+
+def test_estacion_y_bus_nuevos_tras_la_carga():
+    grafo = _grafo()
+    asyncio.run(grafo.aplicar(agregar=[(9, 40), (9, 60)]))
+    assert _buses(grafo.trayecto(10, 60)) == [1, 2, 3, 9]
+    assert grafo.alcanzables(60, max_transbordos=0) == {40: 0}
+
+
+def test_eliminar_bus_y_estacion():
+    grafo = _grafo()
+    asyncio.run(grafo.eliminar_bus(2))
+    assert grafo.trayecto(10, 30) is None
+    grafo = _grafo()
+    asyncio.run(grafo.eliminar_estacion(20))
+    assert grafo.trayecto(10, 30) is None
+
+
+def test_alcanzables():
+    assert _grafo().alcanzables(10, max_transbordos=1) == {20: 0, 30: 1}
+
+
+@pytest.mark.parametrize("max_cambios", [0, 1, 1000])
+def test_compactar_no_cambia_los_resultados(max_cambios):
+    grafo = _grafo(max_cambios=max_cambios)
+    asyncio.run(grafo.aplicar(agregar=[(5, 10), (5, 40), (6, 50), (6, 40)], quitar=[(1, 20)]))
+    assert sorted(grafo.pares()) == sorted(
+        [p for p in PARES if p != (1, 20)] + [(5, 10), (5, 40), (6, 50), (6, 40)]
+    )
+    assert _buses(grafo.trayecto(10, 50)) == [5, 6]
+    # Sin (1, 20) el único camino de 10 a 20 da la vuelta por 40 y 30
+    assert _buses(grafo.trayecto(10, 20)) == [5, 3, 2]
+    if max_cambios < 5:
+        assert grafo.compactaciones == 1
+        assert grafo.estado()["agregadas_pendientes"] == 0
+
+
+@pytest.mark.parametrize("ruta, params", [
+    ("/api/trayectos", {"origen": 10, "destino": 40, "max_transbordos": -1}),
+    ("/api/estaciones/10/alcanzables", {"max_transbordos": -1}),
+])
+def test_max_transbordos_negativo(ruta, params):
+    app = FastAPI()
+    app.include_router(trayectos.router)
+    app.dependency_overrides[get_repos] = lambda: None
+    assert TestClient(app).get(ruta, params=params).status_code == 400
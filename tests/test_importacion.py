@@ -0,0 +1,244 @@
+import asyncio
+import json
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.importacion import (
+    IMPORTACION_TAMANO_LOTE, IMPORTACION_TAMANO_LOTE_MAXIMO, FilaInvalida, Importador, lineas_de_bloques,
+    registros, registros_csv, registros_ndjson
+)
+
+
+async def _flujo(bloques):
+    for bloque in bloques:
+        yield bloque
+
+
+async def _lista(iterador):
+    return [x async for x in iterador]
+
+
+def lineas(bloques, **opciones):
+    return asyncio.run(_lista(lineas_de_bloques(_flujo(bloques), **opciones)))
+
+
+def csv(texto, **opciones):
+    async def leer():
+        return await _lista(registros_csv(lineas_de_bloques(_flujo([texto.encode()])), **opciones))
+    return asyncio.run(leer())
+
+
+# --- lineas_de_bloques ---
+
+def test_caracter_multibyte_partido_entre_bloques():
+    datos = "nombre\nEstación Ñuñoa\n".encode()
+    corte = datos.index("ó".encode()) + 1
+    assert lineas([datos[:corte], datos[corte:]]) == ["nombre", "Estación Ñuñoa"]
+
+
+def test_bloques_de_un_byte():
+    datos = "é€😀\nfin".encode()
+    assert lineas([datos[i:i + 1] for i in range(len(datos))]) == ["é€😀", "fin"]
+
+
+def test_bom_y_ultima_linea_sin_salto():
+    assert lineas(["﻿a\r\nb".encode("utf-8")]) == ["a", "b"]
+
+
+def test_linea_demasiado_larga_se_descarta_sin_acumularla():
+    resultado = lineas([b"a" * 10] * 10 + [b"\nok\n"], max_linea=25)
+    assert isinstance(resultado[0], FilaInvalida)
+    assert resultado[1:] == ["ok"]
+
+
+def test_linea_demasiado_larga_dentro_de_un_bloque():
+    resultado = lineas([b"corta\n" + b"x" * 50 + b"\notra\n"], max_linea=20)
+    assert resultado[0] == "corta"
+    assert isinstance(resultado[1], FilaInvalida)
+    assert resultado[2] == "otra"
+
+
+def test_archivo_sin_saltos_de_linea():
+    resultado = lineas([b"z" * 100] * 5, max_linea=50)
+    assert len(resultado) == 1 and isinstance(resultado[0], FilaInvalida)
+
+
+# --- registros_csv ---
+
+def test_campo_entre_comillas_con_saltos_de_linea():
+    filas = csv('nombre,tipo\n"Bus\nde dos líneas",dual\nB2,zonal\n')
+    assert filas == [
+        {"nombre": "Bus\nde dos líneas", "tipo": "dual"},
+        {"nombre": "B2", "tipo": "zonal"},
+    ]
+
+
+def test_comillas_escapadas():
+    assert csv('nombre,tipo\n"Dice ""hola""",dual\n') == [{"nombre": 'Dice "hola"', "tipo": "dual"}]
+
+
+def test_crlf():
+    filas = csv('nombre,tipo\r\nA,dual\r\n"multi\r\nlínea",zonal\r\n')
+    assert filas == [
+        {"nombre": "A", "tipo": "dual"},
+        {"nombre": "multi\nlínea", "tipo": "zonal"},
+    ]
+
+
+def test_comillas_sin_cerrar_al_final():
+    filas = csv('nombre,tipo\nA,dual\n"sin cerrar,zonal\nB,dual\n')
+    assert filas[0] == {"nombre": "A", "tipo": "dual"}
+    assert len(filas) == 2
+    assert isinstance(filas[1], FilaInvalida)
+    assert "Comillas" in str(filas[1])
+
+
+def test_comillas_sin_cerrar_no_acumulan_el_resto_del_archivo():
+    texto = 'nombre,tipo\n"abierta,dual\nrelleno relleno\nmás relleno\nB,zonal\n'
+    filas = csv(texto, max_registro=20)
+    assert isinstance(filas[0], FilaInvalida)
+    assert "comillas" in str(filas[0])
+    assert filas[-1] == {"nombre": "B", "tipo": "zonal"}
+
+
+def test_numero_de_columnas_incorrecto():
+    filas = csv("nombre,tipo\nA\n")
+    assert len(filas) == 1 and isinstance(filas[0], FilaInvalida)
+
+
+def test_ndjson_invalido():
+    async def leer():
+        texto = '{"nombre": "A"}\nno es json\n[1]\n\n'
+        return await _lista(registros_ndjson(lineas_de_bloques(_flujo([texto.encode()]))))
+    filas = asyncio.run(leer())
+    assert filas[0] == {"nombre": "A"}
+    assert all(isinstance(f, FilaInvalida) for f in filas[1:])
+    assert len(filas) == 3
+
+
+# --- Importador y reanudación con desde_fila ---
+
+class Interrupcion(Exception):
+    pass
+
+
+class ClienteFalso:
+    """Imita `cliente.table(t).insert(x).execute()` guardando las filas en memoria.
+
+    Un insert en lote con algún nombre de `rechazados` falla completo (como
+    en Postgres); `interrumpir_en` lanza Interrupcion al llegar a ese
+    número de inserts de una sola fila, como si el proceso se detuviera.
+    """
+
+    def __init__(self, filas=None, rechazados=(), interrumpir_en=None):
+        self.filas = [] if filas is None else filas
+        self.rechazados = set(rechazados)
+        self.interrumpir_en = interrumpir_en
+        self.inserts_de_una_fila = 0
+        self._pendiente = None
+
+    def table(self, tabla):
+        return self
+
+    def insert(self, datos):
+        self._pendiente = datos
+        return self
+
+    async def execute(self):
+        datos, self._pendiente = self._pendiente, None
+        nuevas = datos if isinstance(datos, list) else [datos]
+        if not isinstance(datos, list):
+            self.inserts_de_una_fila += 1
+            if self.inserts_de_una_fila == self.interrumpir_en:
+                raise Interrupcion()
+        if any(f["nombre"] in self.rechazados for f in nuevas):
+            raise APIError({"message": "duplicate key value", "code": "23505"})
+        self.filas += nuevas
+
+
+def _ndjson(nombres):
+    return "".join(json.dumps({"nombre": n, "tipo": "dual"}) + "\n" for n in nombres).encode()
+
+
+def importar(cliente, contenido, desde_fila=0, tamano_lote=3):
+    importador = Importador(cliente, "buses", tamano_lote=tamano_lote)
+    confirmadas = []
+
+    async def al_confirmar(fila):
+        confirmadas.append(fila)
+
+    async def ejecutar():
+        flujo = registros(lineas_de_bloques(_flujo([contenido])), "ndjson")
+        return await importador.importar(flujo, desde_fila=desde_fila, al_confirmar=al_confirmar)
+
+    return importador, confirmadas, ejecutar
+
+
+def test_importa_por_lotes():
+    cliente = ClienteFalso()
+    importador, confirmadas, ejecutar = importar(cliente, _ndjson(["A", "B", "C", "D"]))
+    resumen = asyncio.run(ejecutar())
+    assert [f["nombre"] for f in cliente.filas] == ["A", "B", "C", "D"]
+    assert resumen["insertadas"] == 4 and resumen["lotes"] == 2
+    assert confirmadas == [3, 4]
+
+
+@pytest.mark.parametrize("pedido, usado", [
+    (0, IMPORTACION_TAMANO_LOTE), (-5, IMPORTACION_TAMANO_LOTE), (7, 7),
+    (10 ** 9, IMPORTACION_TAMANO_LOTE_MAXIMO),
+])
+def test_tamano_lote_acotado(pedido, usado):
+    assert Importador(ClienteFalso(), "buses", tamano_lote=pedido).tamano_lote == usado
+
+
+def test_desde_fila_omite_las_ya_importadas():
+    cliente = ClienteFalso()
+    _, _, ejecutar = importar(cliente, _ndjson(["A", "B", "C", "D"]), desde_fila=2)
+    resumen = asyncio.run(ejecutar())
+    assert [f["nombre"] for f in cliente.filas] == ["C", "D"]
+    assert resumen["procesadas"] == 2 and resumen["ultima_fila"] == 4
+
+
+def test_errores_de_fila_numerados():
+    contenido = _ndjson(["A"]) + b"{roto\n" + _ndjson(["C"])
+    _, _, ejecutar = importar(ClienteFalso(), contenido)
+    resumen = asyncio.run(ejecutar())
+    assert resumen["insertadas"] == 2
+    assert [e["fila"] for e in resumen["errores"]] == [2]
+
+
+def test_reanudar_tras_interrupcion_en_el_insert_fila_a_fila():
+    filas = []
+    contenido = _ndjson(["A", "B", "C", "D", "E"])
+
+    # El lote A-C falla por B y se reintenta fila a fila; el proceso se
+    # detiene en el insert de C
+    cliente = ClienteFalso(filas, rechazados={"B"}, interrumpir_en=3)
+    importador, confirmadas, ejecutar = importar(cliente, contenido)
+    with pytest.raises(Interrupcion):
+        asyncio.run(ejecutar())
+    assert [f["nombre"] for f in filas] == ["A"]
+    assert importador.ultima_fila == 2
+    assert confirmadas == [1, 2]
+
+    _, _, ejecutar = importar(ClienteFalso(filas, rechazados={"B"}), contenido,
+                              desde_fila=importador.ultima_fila)
+    resumen = asyncio.run(ejecutar())
+    assert [f["nombre"] for f in filas] == ["A", "C", "D", "E"]
+    assert resumen["ultima_fila"] == 5
+
+
+@pytest.mark.parametrize("interrumpir_en", [1, 2, 3, 4])
+def test_reanudar_desde_ultima_fila_no_duplica(interrumpir_en):
+    filas = []
+    contenido = _ndjson(["A", "B", "C", "D", "E", "F"])
+    cliente = ClienteFalso(filas, rechazados={"C"}, interrumpir_en=interrumpir_en)
+    importador, _, ejecutar = importar(cliente, contenido, tamano_lote=4)
+    with pytest.raises(Interrupcion):
+        asyncio.run(ejecutar())
+
+    _, _, ejecutar = importar(ClienteFalso(filas, rechazados={"C"}), contenido,
+                              desde_fila=importador.ultima_fila, tamano_lote=4)
+    asyncio.run(ejecutar())
+    assert sorted(f["nombre"] for f in filas) == ["A", "B", "D", "E", "F"]
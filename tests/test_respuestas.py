@@ -0,0 +1,139 @@
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.respuestas import MiddlewareCompresion, RespuestaJSON, negociar_codificacion, serializar_json
+
+GRANDE = {"datos": [{"id": i, "nombre": f"Bus {i}"} for i in range(200)]}
+
+
+# --- Negociación ---
+
+@pytest.mark.parametrize("accept_encoding, esperado", [
+    (None, None),
+    ("", None),
+    ("gzip", "gzip"),
+    ("br", "br"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "br"),
+    ("*;q=0.1, br;q=0", "gzip"),
+    ("GZIP; q=1.0", "gzip"),
+    ("gzip;q=abc", None),
+])
+def test_negociar_codificacion(accept_encoding, esperado):
+    assert negociar_codificacion(accept_encoding, ["br", "gzip"]) == esperado
+
+
+def test_sin_brotli_solo_gzip():
+    assert negociar_codificacion("br, gzip;q=0.1", ["gzip"]) == "gzip"
+    assert negociar_codificacion("br", ["gzip"]) is None
+
+
+# --- Serialización ---
+
+def test_serializar_tipos_no_nativos():
+    fecha = datetime(2024, 1, 2, 3, 4, 5)
+    assert json.loads(serializar_json({"fecha": fecha, "ñ": "Usaquén"})) == {
+        "fecha": "2024-01-02T03:04:05", "ñ": "Usaquén"
+    }
+
+
+# --- Middleware ---
+
+def _cliente(minimo=100):
+    app = FastAPI()
+
+    @app.get("/json")
+    async def grande():
+        return RespuestaJSON(GRANDE, headers={"ETag": '"abc"'})
+
+    @app.get("/corto")
+    async def corto():
+        return RespuestaJSON({"ok": True})
+
+    @app.get("/stream")
+    async def stream():
+        async def lineas():
+            for i in range(50):
+                yield (json.dumps({"id": i, "relleno": "x" * 40}) + "\n").encode()
+        return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
+    @app.get("/binario")
+    async def binario():
+        return Response(b"\x89PNG" + b"\0" * 5000, media_type="image/png")
+
+    @app.get("/texto")
+    async def texto():
+        return PlainTextResponse("hola " * 500, headers={"Vary": "Origin"})
+
+    @app.get("/no-modificado")
+    async def no_modificado():
+        return Response(status_code=304, headers={"ETag": '"abc"'})
+
+    return TestClient(MiddlewareCompresion(app, minimo=minimo))
+
+
+def _crudo(cliente, ruta, accept_encoding):
+    """Cuerpo tal como llega por la red, sin que httpx lo descomprima"""
+    with cliente.stream("GET", ruta, headers={"Accept-Encoding": accept_encoding}) as respuesta:
+        return respuesta, b"".join(respuesta.iter_raw())
+
+
+def test_gzip_con_content_length_y_etag_debil():
+    respuesta, cuerpo = _crudo(_cliente(), "/json", "gzip")
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert int(respuesta.headers["content-length"]) == len(cuerpo)
+    assert respuesta.headers["etag"] == 'W/"abc"'
+    assert respuesta.headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(cuerpo)) == GRANDE
+
+
+def test_sin_accept_encoding_no_se_comprime():
+    respuesta, cuerpo = _crudo(_cliente(), "/json", "identity")
+    assert "content-encoding" not in respuesta.headers
+    assert respuesta.headers["etag"] == '"abc"'
+    assert json.loads(cuerpo) == GRANDE
+
+
+def test_cuerpo_menor_al_minimo_no_se_comprime_pero_lleva_vary():
+    respuesta, cuerpo = _crudo(_cliente(), "/corto", "gzip")
+    assert "content-encoding" not in respuesta.headers
+    assert respuesta.headers["vary"] == "Accept-Encoding"
+    assert json.loads(cuerpo) == {"ok": True}
+
+
+def test_streaming_se_comprime_por_bloques():
+    respuesta, cuerpo = _crudo(_cliente(), "/stream", "gzip")
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert "content-length" not in respuesta.headers
+    lineas = gzip.decompress(cuerpo).decode().splitlines()
+    assert [json.loads(l)["id"] for l in lineas] == list(range(50))
+
+
+def test_tipos_no_comprimibles_pasan_sin_tocar():
+    respuesta, cuerpo = _crudo(_cliente(), "/binario", "gzip")
+    assert "content-encoding" not in respuesta.headers
+    assert "vary" not in respuesta.headers
+    assert cuerpo.startswith(b"\x89PNG")
+
+
+def test_vary_existente_se_extiende():
+    respuesta, _ = _crudo(_cliente(), "/texto", "gzip")
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert respuesta.headers["vary"] == "Origin, Accept-Encoding"
+
+
+def test_304_no_se_comprime():
+    respuesta, cuerpo = _crudo(_cliente(), "/no-modificado", "gzip")
+    assert respuesta.status_code == 304
+    assert "content-encoding" not in respuesta.headers
+    assert cuerpo == b""
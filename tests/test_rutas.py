@@ -0,0 +1,153 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+
+from app.indice_rutas import IndiceRutas
+from app.repositorios import RepositorioRutas, get_repos
+from app.routers import rutas
+from supabase_falso import crear_app
+
+
+class Entorno:
+    """RepositorioRutas sobre el Supabase falso en memoria (sin red)"""
+
+    def __init__(self):
+        app = crear_app()
+        self.base = app.state.base
+        self.cliente = AsyncPostgrestClient("http://falso/rest/v1")
+        self.cliente.session = httpx.AsyncClient(
+            base_url="http://falso/rest/v1", transport=httpx.ASGITransport(app=app)
+        )
+        self.rutas = RepositorioRutas(self.cliente)
+        self.base.insertar("estaciones", [{"nombre": f"E{i}"} for i in range(1, 4)])
+        self.base.insertar("buses", [{"nombre": f"B{i}"} for i in range(1, 3)])
+
+
+def ejecutar(prueba):
+    async def envolver():
+        entorno = Entorno()
+        try:
+            await prueba(entorno)
+        finally:
+            await entorno.cliente.session.aclose()
+    asyncio.run(envolver())
+
+
+def test_crear_ruta_completa():
+    async def prueba(entorno):
+        ruta = await entorno.rutas.crear_completa({"nombre": "T1"}, [3, 1, 2], [1, 2])
+        guardada = await entorno.rutas.obtener(ruta["id"])
+        assert [p["estacion_id"] for p in guardada["ruta_paradas"]] == [3, 1, 2]
+        assert sorted(b["bus_id"] for b in guardada["bus_ruta"]) == [1, 2]
+    ejecutar(prueba)
+
+
+@pytest.mark.parametrize("paradas, buses", [([1, 999], [1]), ([1, 2], [1, 999])])
+def test_crear_ruta_con_referencia_inexistente_no_deja_ruta_huerfana(paradas, buses):
+    async def prueba(entorno):
+        with pytest.raises(APIError):
+            await entorno.rutas.crear_completa({"nombre": "Mala"}, paradas, buses)
+        assert entorno.base.tablas["rutas"] == []
+        assert entorno.base.tablas["ruta_paradas"] == []
+        assert entorno.base.tablas["bus_ruta"] == []
+    ejecutar(prueba)
+
+
+def test_actualizacion_fallida_restaura_la_ruta():
+    async def prueba(entorno):
+        ruta = await entorno.rutas.crear_completa({"nombre": "T1"}, [1, 2], [1])
+        with pytest.raises(APIError):
+            await entorno.rutas.actualizar_completa(
+                ruta["id"], {"nombre": "Cambiada"}, paradas=[3, 2, 1], buses=[2, 999]
+            )
+        guardada = await entorno.rutas.obtener(ruta["id"])
+        assert guardada["nombre"] == "T1"
+        assert [p["estacion_id"] for p in guardada["ruta_paradas"]] == [1, 2]
+        assert [b["bus_id"] for b in guardada["bus_ruta"]] == [1]
+    ejecutar(prueba)
+
+
+def test_actualizar_ruta_inexistente():
+    async def prueba(entorno):
+        assert await entorno.rutas.actualizar_completa(99, {"nombre": "X"}, paradas=[1]) is None
+    ejecutar(prueba)
+
+
+def test_actualizar_solo_buses_conserva_paradas():
+    async def prueba(entorno):
+        ruta = await entorno.rutas.crear_completa({"nombre": "T1"}, [1, 2], [1])
+        await entorno.rutas.actualizar_completa(ruta["id"], {"nombre": "T1"}, buses=[2])
+        guardada = await entorno.rutas.obtener(ruta["id"])
+        assert [p["estacion_id"] for p in guardada["ruta_paradas"]] == [1, 2]
+        assert [b["bus_id"] for b in guardada["bus_ruta"]] == [2]
+    ejecutar(prueba)
+
+
+def test_cargar_todo_recorre_todos_los_lotes():
+    async def prueba(entorno):
+        for i in range(5):
+            await entorno.rutas.crear_completa({"nombre": f"R{i}"}, [1, 2], [1])
+        rutas = await entorno.rutas.cargar_todo(tamano_lote=2)
+        assert [r["nombre"] for r in rutas] == [f"R{i}" for i in range(5)]
+        assert all(len(r["ruta_paradas"]) == 2 for r in rutas)
+    ejecutar(prueba)
+
+
+def test_crear_ruta_sin_fila_devuelta_no_es_type_error():
+    class RutasSinFila:
+        async def crear_completa(self, datos, paradas, buses):
+            return None
+
+    class Repos:
+        rutas = RutasSinFila()
+
+    app = FastAPI()
+    app.include_router(rutas.router)
+    app.dependency_overrides[get_repos] = lambda: Repos()
+    respuesta = TestClient(app).post("/api/rutas", json={"nombre": "T1", "paradas": [1, 2]})
+    assert respuesta.status_code == 500
+    assert respuesta.json()["detail"] == "No se pudo crear la ruta"
+
+
+# --- Índice en memoria ---
+
+def _fila(ruta_id, paradas, buses=(), esta_activa=True):
+    return {
+        "id": ruta_id,
+        "nombre": f"R{ruta_id}",
+        "esta_activa": esta_activa,
+        "ruta_paradas": [{"estacion_id": e, "orden": o} for o, e in enumerate(paradas)],
+        "bus_ruta": [{"bus_id": b} for b in buses],
+    }
+
+
+def _indice(*filas):
+    indice = IndiceRutas()
+
+    async def cargar():
+        return list(filas)
+
+    asyncio.run(indice.asegurar(cargar))
+    return indice
+
+
+def test_siguientes_paradas():
+    indice = _indice(_fila(1, [10, 20, 30, 40]))
+    assert indice.siguientes_paradas(1, 20, n=2) == [30, 40]
+    assert indice.siguientes_paradas(1, 40) == []
+    assert indice.siguientes_paradas(1, 99) is None
+
+
+def test_rutas_de_estacion_y_actualizacion():
+    indice = _indice(_fila(1, [10, 20]), _fila(2, [20, 30], esta_activa=False))
+    assert [r["ruta_id"] for r in indice.rutas_de_estacion(20)] == [1]
+    assert [r["ruta_id"] for r in indice.rutas_de_estacion(20, solo_activas=False)] == [1, 2]
+
+    asyncio.run(indice.actualizar_ruta(_fila(1, [30, 10])))
+    assert indice.rutas_de_estacion(20) == []
+    assert [r["ruta_id"] for r in indice.rutas_de_estacion(30)] == [1]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app import subidas
+
+
+class ImagenFalsa:
+    def __init__(self, filename):
+        self.filename = filename
+        self.extension = ".png"
+
+
+class RepoImagenesFalso:
+    def __init__(self):
+        self.filas = None
+        self.eliminados = []
+
+    async def subir_en_bloques(self, bucket_name, file_path, imagen):
+        return f"https://storage/{bucket_name}/{file_path}"
+
+    async def crear_varias(self, filas):
+        self.filas = filas
+
+    async def eliminar_archivos(self, bucket_name, paths):
+        self.eliminados += paths
+
+
+@pytest.fixture
+def variantes(monkeypatch):
+    """Solo la imagen "con_variantes.png" produce miniatura y WebP"""
+    async def subir_derivadas(repo, bucket_name, file_path, imagen):
+        if imagen.filename != "con_variantes.png":
+            return {}
+        return {"miniatura_url": f"{file_path}.min", "webp_url": f"{file_path}.webp"}
+
+    monkeypatch.setattr(subidas, "subir_derivadas", subir_derivadas)
+
+
+def _subir(repo, *nombres):
+    imagenes = [ImagenFalsa(n) for n in nombres]
+    return asyncio.run(subidas.subir_imagenes(repo, "bucket", "3", imagenes, {"estacion_id": 3}))
+
+
+def test_sin_variantes_no_se_envian_sus_columnas(variantes):
+    repo = RepoImagenesFalso()
+    resultados = _subir(repo, "a.png", "b.png")
+    assert all(r["ok"] for r in resultados)
+    assert [sorted(f) for f in repo.filas] == [["created_at", "estacion_id", "url"]] * 2
+
+
+def test_columnas_de_variantes_solo_donde_se_generaron(variantes):
+    repo = RepoImagenesFalso()
+    _subir(repo, "con_variantes.png", "b.png")
+    assert repo.filas[0]["miniatura_url"].endswith(".min")
+    assert repo.filas[0]["webp_url"].endswith(".webp")
+    assert "miniatura_url" not in repo.filas[1] and "webp_url" not in repo.filas[1]
+    assert len({f["url"] for f in repo.filas}) == 2
@@ -0,0 +1,94 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.cache import cache_buses
+from app.repositorios import get_repos
+from app.validadores import calcular_etag, coincide_etag, validadores
+
+ORIGEN = {"Origin": "http://otro.example"}
+
+
+class BusesFalsos:
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = 0
+
+    async def listar(self, **_):
+        self.consultas += 1
+        return [dict(f) for f in self.filas], None
+
+    async def eliminar(self, bus_id):
+        eliminados = [f for f in self.filas if f["id"] == bus_id]
+        self.filas = [f for f in self.filas if f["id"] != bus_id]
+        return eliminados
+
+
+class Vacio:
+    """bus_estacion e imágenes: el bus de prueba no tiene relaciones"""
+
+    async def eliminar_por_bus(self, bus_id):
+        return []
+
+    async def limpiar_archivos(self, bucket_name, filas):
+        pass
+
+
+class ReposFalsos:
+    def __init__(self, filas):
+        self.buses = BusesFalsos(filas)
+        self.bus_estacion = Vacio()
+        self.imagenes = Vacio()
+
+
+@pytest.fixture
+def cliente():
+    # Nombres largos para que el listado supere COMPRESION_MINIMO y se comprima
+    repos = ReposFalsos([{"id": i, "nombre": f"Bus {i} " + "x" * 1000, "imagenes": []} for i in (1, 2)])
+    main.app.dependency_overrides[get_repos] = lambda: repos
+    cache_buses.invalidar()
+    try:
+        yield TestClient(main.app), repos
+    finally:
+        main.app.dependency_overrides.pop(get_repos, None)
+        cache_buses.invalidar()
+
+
+def test_etag_debil_y_comparacion_debil():
+    etag = calcular_etag(b"{}")
+    assert etag.startswith('W/"')
+    assert coincide_etag(etag, etag)
+    assert coincide_etag(etag.removeprefix("W/"), etag)
+    assert coincide_etag('"otro", *', etag)
+    assert not coincide_etag('"otro"', etag)
+
+
+@pytest.mark.parametrize("codificacion", ["identity", "gzip"])
+def test_304_directo_con_cors_y_el_mismo_etag(cliente, codificacion):
+    cliente, repos = cliente
+    cabeceras = {**ORIGEN, "Accept-Encoding": codificacion}
+    primera = cliente.get("/api/buses", headers=cabeceras)
+    assert primera.status_code == 200
+    etag = primera.headers["etag"]
+    assert primera.headers.get("content-encoding", "identity") == codificacion
+
+    directas = validadores.respuestas_304_directas
+    segunda = cliente.get("/api/buses", headers={**cabeceras, "If-None-Match": etag})
+    assert segunda.status_code == 304
+    assert validadores.respuestas_304_directas == directas + 1
+    assert segunda.headers["etag"] == etag
+    assert segunda.headers["access-control-allow-origin"] == primera.headers["access-control-allow-origin"]
+    assert segunda.content == b""
+    assert repos.buses.consultas == 1
+
+
+def test_escritura_renueva_el_etag(cliente):
+    cliente, repos = cliente
+    etag = cliente.get("/api/buses").headers["etag"]
+
+    assert cliente.delete("/api/buses/2").status_code == 200
+    respuesta = cliente.get("/api/buses", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+    assert [b["id"] for b in respuesta.json()["datos"]] == [1]
+    assert repos.buses.consultas == 2